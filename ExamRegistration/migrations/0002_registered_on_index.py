@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ExamRegistration', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examregistration',
+            index=models.Index(fields=['-registered_on', '-id'], name='examreg_registered_on_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='examregistration',
+            constraint=models.CheckConstraint(condition=models.Q(('year__gt', 0)), name='year_positive'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ExamRegistration', '0002_registered_on_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examregistration',
+            index=models.Index(fields=['student', 'year', 'semester'], name='examreg_student_sitting_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examregistration',
+            index=models.Index(fields=['course_code'], name='examreg_course_code_idx'),
+        ),
+        # Drop the single-column foreign key index only once the index replacing it exists.
+        migrations.AlterField(
+            model_name='examregistration',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
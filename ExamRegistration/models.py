@@ -5,7 +5,8 @@ from django.db.models import Q, CheckConstraint
 # This class represents an exam registration with fields for student, course details, semester, year,
 # registration timestamp, and verification status.
 class ExamRegistration(models.Model):
-    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Indexed by `examreg_student_sitting_idx` below, which starts with the student.
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     course_code = models.CharField(max_length=20)
     course_title = models.CharField(max_length=100)
     semester = models.CharField(max_length=20)
@@ -17,6 +18,13 @@ class ExamRegistration(models.Model):
         constraints = [
             CheckConstraint(check=Q(year__gt=0), name='year_positive')
         ]
+        indexes = [
+            # Backs the keyset used by `ExamRegistrationPagination`.
+            models.Index(fields=['-registered_on', '-id'], name='examreg_registered_on_idx'),
+            # A student's registrations for a given exam sitting.
+            models.Index(fields=['student', 'year', 'semester'], name='examreg_student_sitting_idx'),
+            models.Index(fields=['course_code'], name='examreg_course_code_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.course_code}"
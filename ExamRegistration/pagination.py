@@ -0,0 +1,7 @@
+from edu_hub.pagination import KeysetPagination
+
+
+# Exam registrations are listed newest first, so the keyset is `registered_on` with the primary key
+# as a tie-breaker. Both columns are covered by the `examreg_registered_on_idx` index.
+class ExamRegistrationPagination(KeysetPagination):
+    ordering = ('-registered_on', '-id')
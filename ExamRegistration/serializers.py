@@ -1,9 +1,10 @@
 from rest_framework import serializers
+from edu_hub.serializers import SparseFieldsMixin
 from .models import ExamRegistration
 
 # The `ExamRegistrationSerializer` class is a Django REST framework serializer for the
 # `ExamRegistration` model with specified read-only fields.
-class ExamRegistrationSerializer(serializers.ModelSerializer):
+class ExamRegistrationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ExamRegistration
         fields = '__all__'
@@ -1,11 +1,16 @@
+from unittest import mock, skipUnless
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db import IntegrityError, DataError
 from ExamRegistration.models import ExamRegistration
+from ExamRegistration.views import ExamRegistrationViewSet
 from django.core.exceptions import ValidationError
 from django.db.utils import DataError, IntegrityError
-from django.db import transaction
+from django.db import connection, transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+from edu_hub.testing import QueryPlanAssertionsMixin
 
 User = get_user_model()
 
@@ -193,3 +198,81 @@ class ExamRegistrationModelTests(TestCase):
         with self.assertRaises(ValidationError):
             reg.full_clean()
             reg.save()
+
+
+class ExamRegistrationPaginationTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='pagedstudent', password='testpass', student_id='S2001')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def test_registrations_are_paged_newest_first(self):
+        """
+        The function tests that exam registrations are returned newest first and that the `next` link
+        continues from the last registration seen.
+        """
+        regs = [
+            ExamRegistration.objects.create(
+                student=self.student,
+                course_code=f'CS2{i:02d}',
+                course_title='Paged Course',
+                semester='Fall',
+                year=2024
+            )
+            for i in range(5)
+        ]
+        response = self.client.get(reverse('exam-registration-list'), {'page_size': 3})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertNotIn('count', body)
+        ids = [row['id'] for row in body['results']]
+        ids += [row['id'] for row in self.client.get(body['next']).json()['results']]
+        self.assertEqual(ids, [reg.pk for reg in reversed(regs)])
+
+    def test_fields_parameter_limits_registration_fields(self):
+        """
+        The function tests that `?fields=` returns only the requested registration fields and still
+        pages by registration time.
+        """
+        for i in range(3):
+            ExamRegistration.objects.create(student=self.student, course_code=f'CS3{i:02d}', course_title='Sparse', semester='Fall', year=2024)
+        body = self.client.get(reverse('exam-registration-list'), {'fields': 'course_code', 'page_size': 2}).json()
+        self.assertEqual(body['results'], [{'course_code': 'CS302'}, {'course_code': 'CS301'}])
+        self.assertEqual(self.client.get(body['next']).json()['results'], [{'course_code': 'CS300'}])
+
+    def test_fast_list_matches_the_serializer(self):
+        """
+        The function tests that the fast list path renders registrations exactly like the serializer,
+        including timestamps.
+        """
+        for i in range(3):
+            ExamRegistration.objects.create(student=self.student, course_code=f'CS4{i:02d}', course_title='Fast', semester='Fall', year=2024)
+        fast = self.client.get(reverse('exam-registration-list'), {'page_size': 2})
+        with mock.patch.object(ExamRegistrationViewSet, 'fast_list', False):
+            regular = self.client.get(reverse('exam-registration-list'), {'page_size': 2})
+        self.assertEqual(fast.content, regular.content)
+
+
+@skipUnless(connection.vendor == 'postgresql', "Query plans are checked on PostgreSQL")
+class ExamRegistrationQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        students = User.objects.bulk_create(User(username=f'examplan{i}', student_id=f'EP{i}') for i in range(500))
+        ExamRegistration.objects.bulk_create(
+            ExamRegistration(
+                student=student, course_code=f'CS{s * 7 + c:04d}', course_title='Planned',
+                semester=('Fall', 'Spring')[c % 2], year=2020 + c % 5,
+            )
+            for s, student in enumerate(students) for c in range(20)
+        )
+        cls.analyze(User, ExamRegistration)
+        cls.student = students[42]
+
+    def test_registration_lookups_use_indexes(self):
+        """
+        The function tests that a student's registrations for an exam sitting and registrations for a
+        course code are served by their indexes.
+        """
+        sitting = ExamRegistration.objects.filter(student=self.student, year=2021, semester='Spring')
+        self.assertIndexScan(sitting, 'examreg_student_sitting_idx')
+        self.assertIndexScan(ExamRegistration.objects.filter(course_code='CS0300'), 'examreg_course_code_idx')
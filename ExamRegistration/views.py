@@ -1,15 +1,18 @@
 # exams/views.py
 
 from rest_framework import viewsets, permissions
+from edu_hub.mixins import FastListMixin, SparseQuerysetMixin
 from .models import ExamRegistration
 from .serializers import ExamRegistrationSerializer
+from .pagination import ExamRegistrationPagination
 
 # This class defines a view set for exam registration with permissions for authenticated users and a
 # method to save the student information when creating a new registration.
-class ExamRegistrationViewSet(viewsets.ModelViewSet):
+class ExamRegistrationViewSet(SparseQuerysetMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = ExamRegistration.objects.all()
     serializer_class = ExamRegistrationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ExamRegistrationPagination
 
     def perform_create(self, serializer):
         serializer.save(student=self.request.user)
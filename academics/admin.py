@@ -1,31 +1,52 @@
 from django.contrib import admin
+from edu_hub.pagination import EstimatedCountPaginator
 from .models import Institution, Program, Course, Unit, Fee
 
 # Register your models here.
 
+# The `CatalogAdmin` class holds the changelist settings shared by the catalog admin classes. Catalog
+# tables can hold millions of rows, so the changelist pages with `EstimatedCountPaginator` and skips
+# the second COUNT(*) Django runs to show the unfiltered total next to filtered results.
+class CatalogAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 # The `InstitutionAdmin` class defines a Django admin model with fields for name, code, and website.
-class InstitutionAdmin(admin.ModelAdmin):
+class InstitutionAdmin(CatalogAdmin):
     list_display = ('name', 'code', 'website')
+    search_fields = ('name', 'code')
 
 # The `ProgramAdmin` class defines a Django admin model with fields for institution, name, and
 # duration in years.
-class ProgramAdmin(admin.ModelAdmin):
+class ProgramAdmin(CatalogAdmin):
     list_display = ('institution', 'name', 'duration_years')
+    list_select_related = ('institution',)
+    search_fields = ('name', 'institution__name')
+    autocomplete_fields = ('institution',)
 
 # The `CourseAdmin` class defines a Django admin model with specified fields for display in the admin
-# interface.
-class CourseAdmin(admin.ModelAdmin):
+# interface. A program is displayed with its institution's name, so both are joined in.
+class CourseAdmin(CatalogAdmin):
     list_display = ('program', 'title', 'semester')
+    list_select_related = ('program__institution',)
+    search_fields = ('title', 'program__name')
+    autocomplete_fields = ('program',)
 
 # The `UnitAdmin` class in Python defines a Django admin model with specified fields for display in
-# the admin interface.
-class UnitAdmin(admin.ModelAdmin):
+# the admin interface. A course is displayed with its program's name, so both are joined in.
+class UnitAdmin(CatalogAdmin):
     list_display = ('course', 'code', 'name')
+    list_select_related = ('course__program',)
+    search_fields = ('code', 'name')
+    autocomplete_fields = ('course',)
 
 # The `FeeAdmin` class defines the display fields for a fee administration panel in a Python Django
 # project.
-class FeeAdmin(admin.ModelAdmin):
+class FeeAdmin(CatalogAdmin):
     list_display = ('program', 'fee_type', 'amount', 'currency')
+    list_select_related = ('program__institution',)
+    search_fields = ('fee_type', 'program__name')
+    autocomplete_fields = ('program',)
 
 admin.site.register(Institution, InstitutionAdmin)
 admin.site.register(Program, ProgramAdmin)
@@ -0,0 +1,101 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .catalog import get_catalog_state, catalog_stamp
+from .models import Program, Course, Unit
+
+
+def autocomplete_key(text):
+    return ' '.join(text.casefold().split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of normalized keys with a parallel array of results. The entries starting with a
+    prefix are contiguous, so a lookup is one binary search followed by reading at most `limit`
+    entries. Results come back in key order, which puts exact and shorter matches first.
+    """
+
+    def __init__(self, entries):
+        entries = sorted(entries, key=lambda entry: (entry[0], entry[1]['id']))
+        self.keys = [key for key, _ in entries]
+        self.results = [result for _, result in entries]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, prefix, limit):
+        start = bisect_left(self.keys, prefix)
+        results = []
+        for index in range(start, min(start + limit, len(self.keys))):
+            if not self.keys[index].startswith(prefix):
+                break
+            results.append(self.results[index])
+        return results
+
+
+def build_indexes():
+    """
+    Builds the unit code and course title indexes from the catalog. Entries with the same code or
+    title are ordered by primary key.
+    """
+    units = PrefixIndex(
+        (autocomplete_key(code), {'id': pk, 'code': code, 'name': name, 'course': course_id})
+        for pk, code, name, course_id in Unit.objects.values_list('id', 'code', 'name', 'course_id').iterator(chunk_size=5000)
+    )
+    courses = PrefixIndex(
+        (autocomplete_key(title), {
+            'id': pk, 'title': title, 'semester': semester, 'program': {'id': program_id, 'name': program_name},
+        })
+        for pk, title, semester, program_id, program_name in Course.objects.values_list(
+            'id', 'title', 'semester', 'program_id', 'program__name'
+        ).iterator(chunk_size=5000)
+    )
+    return {'unit': units, 'course': courses}
+
+
+class AutocompleteIndex:
+    """
+    Per-process prefix indexes over unit codes and course titles, so that autocomplete requests are
+    answered from memory without querying the database.
+
+    The indexes are rebuilt when the `CatalogVersion` stamp of the models they cover changes. The
+    stamp is read at most once every `CATALOG_AUTOCOMPLETE_CHECK_SECONDS`, or on the next request
+    after a catalog write in this process (see `invalidate`), so changes made by other processes show
+    up within that interval and every other request only reads memory.
+    """
+    catalog_models = (Program, Course, Unit)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked = None
+        self._indexes = None
+
+    def invalidate(self):
+        self._checked = None
+
+    def ensure_current(self):
+        interval = getattr(settings, 'CATALOG_AUTOCOMPLETE_CHECK_SECONDS', 5)
+        checked = self._checked
+        if checked is not None and time.monotonic() - checked < interval:
+            return
+        with self._lock:
+            if self._checked is not checked:
+                return
+            now = time.monotonic()
+            stamp = catalog_stamp(get_catalog_state(*self.catalog_models))
+            if stamp != self._stamp:
+                self._indexes = build_indexes()
+                self._stamp = stamp
+            self._checked = now
+
+    def search(self, kind, prefix, limit):
+        self.ensure_current()
+        return self._indexes[kind].search(autocomplete_key(prefix), limit)
+
+
+autocomplete_index = AutocompleteIndex()
@@ -0,0 +1,214 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from edu_hub.serializers import RowSerializer
+from .catalog import get_catalog_state, catalog_stamp
+from .export import catalog_snapshot
+from .models import CatalogChange
+from .serializers import InstitutionSerializer, ProgramSerializer, CourseSerializer, UnitSerializer, FeeSerializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLE_FORMAT = 1
+HASH_LENGTH = 16
+BUNDLE_NAME_RE = re.compile(rf'^catalog\.[0-9a-f]{{{HASH_LENGTH}}}\.json$')
+
+# The sections of a bundle, parents before children, and the serializers that render their rows. The
+# rows are the same as the ones returned by the list endpoints and the sync feed.
+BUNDLE_SECTIONS = (
+    ('institutions', InstitutionSerializer),
+    ('programs', ProgramSerializer),
+    ('courses', CourseSerializer),
+    ('units', UnitSerializer),
+    ('fees', FeeSerializer),
+)
+
+
+def bundle_dir():
+    return os.path.join(settings.STATIC_ROOT, settings.CATALOG_BUNDLE_PREFIX)
+
+
+def bundle_url(name):
+    return f"{settings.STATIC_URL.rstrip('/')}/{settings.CATALOG_BUNDLE_PREFIX}/{name}"
+
+
+def bundle_sync_token():
+    """
+    Returns the sync token a client holding the bundle continues from: the newest change log entry
+    old enough to be returned by the sync feed. Entries after it may already be in the bundle, which
+    is harmless since the feed sends the current data of each row.
+    """
+    settled = timezone.now() - timedelta(seconds=getattr(settings, 'CATALOG_CHANGES_SETTLE_SECONDS', 5))
+    return CatalogChange.objects.filter(changed_at__lte=settled).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def section_rows(serializer_class, chunk_size):
+    serializer = serializer_class()
+    row_serializer = RowSerializer.compile(serializer)
+    queryset = serializer_class.Meta.model.objects.order_by('id')
+    if row_serializer is None:
+        for obj in queryset.iterator(chunk_size=chunk_size):
+            yield serializer.to_representation(obj)
+        return
+    for row in row_serializer.values(queryset).iterator(chunk_size=chunk_size):
+        yield row_serializer(row)
+
+
+def bundle_chunks(chunk_size=2000):
+    """
+    Yields the bundle as JSON text: the catalog stamp, the sync token and one array of rows per
+    section. Everything is read from one database snapshot (see `export.catalog_snapshot`), so the
+    rows and the sync token agree with each other.
+    """
+    with catalog_snapshot():
+        header = {
+            'format': BUNDLE_FORMAT,
+            'stamp': catalog_stamp(get_catalog_state()),
+            'sync_token': str(bundle_sync_token()),
+        }
+        yield json.dumps(header, separators=(',', ':'))[:-1]
+        for section, serializer_class in BUNDLE_SECTIONS:
+            yield f',"{section}":['
+            chunk = []
+            for index, data in enumerate(section_rows(serializer_class, chunk_size)):
+                chunk.append((',' if index else '') + json.dumps(data, separators=(',', ':'), ensure_ascii=False))
+                if len(chunk) >= chunk_size:
+                    yield ''.join(chunk)
+                    chunk = []
+            yield ''.join(chunk) + ']'
+        yield '}'
+
+
+class BundleWriter:
+    """
+    Writes the bundle and its compressed variants to temporary files in the bundle directory while
+    hashing it, so the content hash is known without holding the bundle in memory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.digest = hashlib.sha256()
+        self.files = {}
+        for suffix in ('', '.gz') + (('.br',) if brotli is not None else ()):
+            fd, path = tempfile.mkstemp(dir=directory, prefix='.bundle-', suffix=suffix)
+            self.files[suffix] = (os.fdopen(fd, 'wb'), path)
+        # `mtime=0` keeps the gzip output identical for identical content.
+        self.gzip = gzip.GzipFile(fileobj=self.files['.gz'][0], mode='wb', compresslevel=9, mtime=0)
+        self.brotli = brotli.Compressor(quality=11) if brotli is not None else None
+        self.size = 0
+
+    def write(self, text):
+        data = text.encode()
+        self.digest.update(data)
+        self.size += len(data)
+        self.files[''][0].write(data)
+        self.gzip.write(data)
+        if self.brotli is not None:
+            self.files['.br'][0].write(self.brotli.process(data))
+
+    def finish(self):
+        """
+        Moves the files to their content-addressed names and returns the bundle's name. A bundle
+        that already exists is left as it is, so a rebuild of an unchanged catalog writes nothing.
+        """
+        self.gzip.close()
+        if self.brotli is not None:
+            self.files['.br'][0].write(self.brotli.finish())
+        name = f"catalog.{self.digest.hexdigest()[:HASH_LENGTH]}.json"
+        for suffix, (file, path) in self.files.items():
+            file.close()
+            target = os.path.join(self.directory, name + suffix)
+            if os.path.exists(target):
+                os.unlink(path)
+            else:
+                os.chmod(path, 0o644)
+                os.replace(path, target)
+        return name
+
+    def discard(self):
+        for file, path in self.files.values():
+            file.close()
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+def write_manifest(manifest):
+    path = settings.CATALOG_BUNDLE_MANIFEST
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.manifest-')
+    with os.fdopen(fd, 'w') as file:
+        json.dump(manifest, file)
+    os.replace(tmp_path, path)
+
+
+def load_manifest():
+    """
+    Returns the manifest of the current bundle, or None when no bundle has been built.
+    """
+    try:
+        with open(settings.CATALOG_BUNDLE_MANIFEST) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def remove_old_bundles(directory, current, keep):
+    """
+    Deletes all but the `keep` most recently built bundles, never the current one. Older bundles are
+    kept for a while so that clients who read the previous manifest can still download them.
+    """
+    names = sorted(
+        (name for name in os.listdir(directory) if BUNDLE_NAME_RE.match(name) and name != current),
+        key=lambda name: os.stat(os.path.join(directory, name)).st_mtime,
+        reverse=True,
+    )
+    for name in names[max(keep - 1, 0):]:
+        for suffix in ('', '.gz', '.br'):
+            try:
+                os.unlink(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def build_bundle(chunk_size=2000, keep=3):
+    """
+    Builds the offline catalog bundle, writes it and its gzip (and brotli, when the `brotli` package
+    is installed) variants under a name holding the hash of the content, then points the manifest at
+    it. Returns the new manifest.
+    """
+    directory = bundle_dir()
+    os.makedirs(directory, exist_ok=True)
+    writer = BundleWriter(directory)
+    try:
+        header = None
+        for text in bundle_chunks(chunk_size):
+            if header is None:
+                header = json.loads(text + '}')
+            writer.write(text)
+        name = writer.finish()
+    except BaseException:
+        writer.discard()
+        raise
+    os.utime(os.path.join(directory, name))
+    manifest = {
+        'hash': name.split('.')[1],
+        'url': bundle_url(name),
+        'size': writer.size,
+        'encodings': ['gzip'] + (['br'] if brotli is not None else []),
+        'stamp': header['stamp'],
+        'sync_token': header['sync_token'],
+        'built_at': timezone.now().isoformat(),
+    }
+    write_manifest(manifest)
+    remove_old_bundles(directory, name, keep)
+    return manifest
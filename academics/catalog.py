@@ -0,0 +1,71 @@
+import calendar
+from collections import namedtuple
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Institution, Program, Course, Unit, Fee, CatalogVersion
+
+# The catalog models whose changes are tracked by `CatalogVersion`.
+CATALOG_MODELS = (Institution, Program, Course, Unit, Fee)
+
+CatalogState = namedtuple('CatalogState', ['versions', 'updated_at'])
+
+
+def catalog_label(model):
+    return model._meta.label_lower
+
+
+def bump_catalog_version(*models):
+    """
+    Increments the version counter of each given catalog model. The update is done in the database so
+    that every worker process sees the new version immediately.
+    """
+    now = timezone.now()
+    for model in models:
+        label = catalog_label(model)
+        updated = CatalogVersion.objects.filter(label=label).update(
+            version=F('version') + 1, updated_at=now
+        )
+        if not updated:
+            CatalogVersion.objects.get_or_create(label=label, defaults={'version': 1, 'updated_at': now})
+
+
+def get_catalog_state(*models):
+    """
+    Returns a `CatalogState` for the given catalog models (all of them when none are given) using a
+    single query. `versions` is a tuple with one counter per model and `updated_at` is the most recent
+    change among them.
+    """
+    models = models or CATALOG_MODELS
+    labels = [catalog_label(model) for model in models]
+    rows = dict(
+        (label, (version, updated_at))
+        for label, version, updated_at in CatalogVersion.objects.filter(label__in=labels).values_list(
+            'label', 'version', 'updated_at'
+        )
+    )
+    versions = tuple(rows.get(label, (0, None))[0] for label in labels)
+    timestamps = [updated_at for _, updated_at in rows.values() if updated_at is not None]
+    return CatalogState(versions, max(timestamps) if timestamps else None)
+
+
+def catalog_stamp(state):
+    """
+    Returns a short string identifying a `CatalogState`. The change time is included alongside the
+    counters so that a stamp is never reused, even if the version table is restored from a backup.
+    """
+    stamp = '.'.join(str(version) for version in state.versions)
+    if state.updated_at is not None:
+        stamp = f"{stamp}.{int(state.updated_at.timestamp() * 1000000):x}"
+    return stamp
+
+
+def catalog_timestamp(state):
+    """
+    Returns the `updated_at` of a `CatalogState` as seconds since the epoch, as expected by
+    `django.utils.cache.get_conditional_response`.
+    """
+    if state.updated_at is None:
+        return None
+    return calendar.timegm(state.updated_at.utctimetuple())
@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import CatalogChange
+
+
+def record_changes(model, pks, deleted=False):
+    """
+    Appends one change log entry per primary key in `pks` for `model`. Deletions are logged as
+    tombstones so that clients can drop rows they hold.
+    """
+    now = timezone.now()
+    CatalogChange.objects.bulk_create(
+        CatalogChange(model=model._meta.model_name, object_id=pk, deleted=deleted, changed_at=now) for pk in pks
+    )
+
+
+def changes_since(token, limit):
+    """
+    Returns up to `limit` change log entries after `token`, oldest first, as (entries, next_token,
+    has_more). Only the latest entry for each object is kept, so an object changed many times is sent
+    once.
+
+    Ids are assigned when a change is written but become visible when its transaction commits, so an
+    entry can appear below a token a client already holds. Entries younger than
+    `CATALOG_CHANGES_SETTLE_SECONDS` are therefore held back until transactions writing them have
+    committed; `has_more` is then true, so clients poll again once they have.
+    """
+    settled = timezone.now() - timedelta(seconds=getattr(settings, 'CATALOG_CHANGES_SETTLE_SECONDS', 5))
+    entries = CatalogChange.objects.filter(id__gt=token).order_by('id').values_list(
+        'id', 'model', 'object_id', 'deleted', 'changed_at'
+    )[:limit + 1]
+    latest, next_token, has_more = {}, token, False
+    for count, (change_id, model, object_id, deleted, changed_at) in enumerate(entries):
+        if count == limit:
+            has_more = True
+            break
+        if changed_at > settled:
+            has_more = True
+            break
+        latest.pop((model, object_id), None)
+        latest[(model, object_id)] = deleted
+        next_token = change_id
+    return [(model, object_id, deleted) for (model, object_id), deleted in latest.items()], next_token, has_more
@@ -0,0 +1,97 @@
+import csv
+import json
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+from .models import Institution, Program, Course, Unit, Fee
+
+# The columns of a CSV export, in the record format read by the `import_catalog` command. Each record
+# only fills the columns of its type.
+EXPORT_FIELDS = (
+    'type', 'institution', 'program', 'course', 'code', 'name', 'title', 'website', 'duration_years',
+    'semester', 'amount', 'currency', 'fee_type', 'description',
+)
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# For each record type: the queryset columns read, in export order, and the record fields they fill.
+EXPORT_QUERIES = (
+    ('institution', Institution, ('code', 'name', 'website'), ('code', 'name', 'website')),
+    ('program', Program, ('institution__code', 'name', 'duration_years'), ('institution', 'name', 'duration_years')),
+    ('course', Course, ('program__institution__code', 'program__name', 'title', 'semester'),
+     ('institution', 'program', 'title', 'semester')),
+    ('unit', Unit, ('course__program__institution__code', 'course__program__name', 'course__title', 'code', 'name',
+                    'description'),
+     ('institution', 'program', 'course', 'code', 'name', 'description')),
+    ('fee', Fee, ('program__institution__code', 'program__name', 'fee_type', 'amount', 'currency', 'description'),
+     ('institution', 'program', 'fee_type', 'amount', 'currency', 'description')),
+)
+
+
+@contextmanager
+def catalog_snapshot():
+    """
+    Runs the export queries in one read-only REPEATABLE READ transaction on PostgreSQL, so that every
+    record type is read from the same snapshot and children never refer to parents added or removed
+    while the export runs. Inside an existing transaction, that transaction is used as it is.
+    """
+    if connection.in_atomic_block or connection.vendor != 'postgresql':
+        yield
+        return
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        yield
+
+
+def export_records(chunk_size=2000):
+    """
+    Yields every catalog record as a dict, parents before children, in the format read by
+    `import_catalog`. Rows are read with `iterator()`, which uses a server-side cursor on PostgreSQL,
+    so memory use does not grow with the size of the catalog.
+    """
+    with catalog_snapshot():
+        for kind, model, columns, fields in EXPORT_QUERIES:
+            rows = model.objects.order_by('id').values_list(*columns).iterator(chunk_size=chunk_size)
+            for row in rows:
+                record = {'type': kind}
+                for field, value in zip(fields, row):
+                    if value is not None and value != '':
+                        record[field] = str(value) if field == 'amount' else value
+                yield record
+
+
+class Echo:
+    """
+    File-like object whose `write` returns what it is given, so that `csv.writer` produces strings
+    instead of writing them anywhere.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_lines(fmt, chunk_size=2000):
+    """
+    Yields the catalog as CSV or JSON Lines text, one chunk of up to `chunk_size` records at a time.
+    For CSV the header line is yielded on its own first, before any query runs.
+    """
+    if fmt == 'csv':
+        writer = csv.DictWriter(Echo(), fieldnames=EXPORT_FIELDS)
+        yield writer.writeheader()
+        encode = writer.writerow
+    else:
+        def encode(record):
+            return json.dumps(record, ensure_ascii=False) + '\n'
+    chunk = []
+    for record in export_records(chunk_size):
+        chunk.append(encode(record))
+        if len(chunk) >= chunk_size:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
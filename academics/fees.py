@@ -0,0 +1,75 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Fee, ProgramFeeSummary
+
+
+def fee_key(fee):
+    return fee.program_id, fee.currency, fee.fee_type
+
+
+def apply_fee_change(key, amount, count):
+    """
+    Adds `amount` and `count` (negative when a fee is removed) to the summary row for
+    (program_id, currency, fee_type). The row is created on the first fee of its kind and removed
+    again when its last fee goes away.
+    """
+    program_id, currency, fee_type = key
+    rows = ProgramFeeSummary.objects.filter(program_id=program_id, currency=currency, fee_type=fee_type)
+    if rows.update(total=F('total') + amount, fee_count=F('fee_count') + count):
+        if count < 0:
+            rows.filter(fee_count__lte=0).delete()
+        return
+    if count <= 0:
+        return
+    try:
+        with transaction.atomic():
+            rows.create(program_id=program_id, currency=currency, fee_type=fee_type, total=amount, fee_count=count)
+    except IntegrityError:
+        # Another request created the row first; add to it instead.
+        rows.update(total=F('total') + amount, fee_count=F('fee_count') + count)
+
+
+def remember_fee(instance):
+    """
+    Stores the saved state of a fee on the instance before it is updated, so that `fee_saved` can
+    take its old amount out of the summary.
+    """
+    if instance.pk is None:
+        instance._summary_previous = None
+        return
+    instance._summary_previous = Fee.objects.filter(pk=instance.pk).values_list(
+        'program_id', 'currency', 'fee_type', 'amount'
+    ).first()
+
+
+def fee_saved(instance):
+    previous = getattr(instance, '_summary_previous', None)
+    if previous is not None:
+        apply_fee_change(previous[:3], -previous[3], -1)
+    apply_fee_change(fee_key(instance), Decimal(str(instance.amount)), 1)
+
+
+def fee_deleted(instance):
+    apply_fee_change(fee_key(instance), -Decimal(str(instance.amount)), -1)
+
+
+def rebuild_fee_summaries(program_ids):
+    """
+    Recomputes the summary rows of the given programs from their fees. Used after bulk writes, which
+    do not send the signals that keep summaries up to date.
+    """
+    program_ids = set(program_ids)
+    if not program_ids:
+        return
+    rows = (
+        Fee.objects.filter(program_id__in=program_ids)
+        .values('program_id', 'currency', 'fee_type')
+        .annotate(total=Sum('amount'), fee_count=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        ProgramFeeSummary.objects.filter(program_id__in=program_ids).delete()
+        ProgramFeeSummary.objects.bulk_create([ProgramFeeSummary(**row) for row in rows])
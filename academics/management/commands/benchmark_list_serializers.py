@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from academics.serializers import InstitutionSerializer, ProgramSerializer, CourseSerializer, UnitSerializer, FeeSerializer
+from edu_hub.serializers import RowSerializer
+
+SERIALIZERS = {
+    'institution': InstitutionSerializer,
+    'program': ProgramSerializer,
+    'course': CourseSerializer,
+    'unit': UnitSerializer,
+    'fee': FeeSerializer,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the throughput of the regular ModelSerializer list path with the fast values_list() "
+        "path used by list endpoints, on existing catalog rows, and checks that both render the same JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=SERIALIZERS, default='unit', help="Catalog model to serialize.")
+        parser.add_argument('--rows', type=int, default=100000, help="Number of rows to serialize.")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per path; the best one is reported.")
+
+    def handle(self, *args, **options):
+        serializer_class = SERIALIZERS[options['model']]
+        queryset = serializer_class.Meta.model.objects.order_by('id')[:options['rows']]
+        rows = queryset.count()
+        if not rows:
+            raise CommandError(f"There are no {options['model']} rows to serialize; import a catalog first.")
+        row_serializer = RowSerializer.compile(serializer_class())
+        if row_serializer is None:
+            raise CommandError(f"{serializer_class.__name__} cannot be served by the fast path.")
+
+        def regular():
+            return serializer_class(queryset, many=True).data
+
+        def fast():
+            return [row_serializer(row) for row in row_serializer.values(queryset)]
+
+        renderer = JSONRenderer()
+        results = {}
+        for name, path in (('ModelSerializer', regular), ('values_list', fast)):
+            best, output = None, None
+            for _ in range(max(options['repeat'], 1)):
+                started = time.perf_counter()
+                output = renderer.render(path())
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = (best, output)
+            self.stdout.write(f"{name:>16}: {rows} rows in {best:.2f}s ({rows / best:,.0f} rows/sec)")
+
+        (regular_time, regular_output), (fast_time, fast_output) = results.values()
+        if regular_output != fast_output:
+            raise CommandError("The fast path rendered different JSON from the serializer.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Identical output ({len(fast_output):,} bytes); the fast path is {regular_time / fast_time:.1f}x faster."
+        ))
@@ -0,0 +1,117 @@
+import random
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from academics.models import Institution, Program, Course, CoursePrerequisite, CoursePrerequisiteClosure
+from academics.prerequisites import add_prerequisite
+
+RECURSIVE_SQL = """
+    WITH RECURSIVE required(id) AS (
+        SELECT prerequisite_id FROM {edges} WHERE course_id = %s
+        UNION
+        SELECT e.prerequisite_id FROM {edges} e JOIN required r ON e.course_id = r.id
+    )
+    SELECT id FROM required
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds a random prerequisite graph of the given size inside a transaction that is rolled back "
+        "afterwards, and reports the cost of adding and removing edges with the incrementally maintained "
+        "closure, and of prerequisite lookups from the closure compared with a recursive query."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=2000, help="Number of courses in the graph.")
+        parser.add_argument('--edges', type=int, default=3, help="Prerequisites per course, at most.")
+        parser.add_argument('--program-size', type=int, default=40, help="Courses per program; prerequisites stay within a program.")
+        parser.add_argument('--lookups', type=int, default=500, help="Number of prerequisite lookups to time.")
+        parser.add_argument('--removals', type=int, default=200, help="Number of edges to remove at the end.")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['courses'] < 2:
+            raise CommandError("--courses must be at least 2.")
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.run(rng, options)
+            transaction.set_rollback(True)
+
+    def run(self, rng, options):
+        size = max(options['program_size'], 2)
+        institution = Institution.objects.create(name="Prerequisite benchmark", code="PRQ-BENCH")
+        programs = Program.objects.bulk_create(
+            Program(institution=institution, name=f"Benchmark program {p}", duration_years=4)
+            for p in range((options['courses'] + size - 1) // size)
+        )
+        courses = Course.objects.bulk_create(
+            Course(program=programs[i // size], title=f"Course {i}", semester=1 + (i % size) * 8 // size)
+            for i in range(options['courses'])
+        )
+        ids = [course.pk for course in courses]
+
+        # Like a curriculum, courses only require earlier courses of their own program.
+        started, added = time.perf_counter(), 0
+        for index in range(1, len(ids)):
+            earlier = ids[index - index % size:index]
+            for prerequisite in set(rng.choices(earlier, k=rng.randint(0, options['edges']))) if earlier else ():
+                add_prerequisite(ids[index], prerequisite)
+                added += 1
+        elapsed = time.perf_counter() - started
+        # Edges from a course to a later course that requires it would close a cycle and are refused.
+        refused = 0
+        for index in rng.sample(range(len(ids)), min(50, len(ids))):
+            later = CoursePrerequisiteClosure.objects.filter(prerequisite_id=ids[index]).values_list('course_id', flat=True).first()
+            if later is None:
+                continue
+            try:
+                add_prerequisite(ids[index], later)
+            except ValidationError:
+                refused += 1
+        rows = CoursePrerequisiteClosure.objects.count()
+        self.stdout.write(
+            f"Added {added} edges in {elapsed:.2f}s ({elapsed / max(added, 1) * 1000:.2f} ms/edge); "
+            f"closure has {rows} rows; refused {refused} edges that would close a cycle."
+        )
+
+        sample = rng.choices(ids, k=options['lookups'])
+        sql = RECURSIVE_SQL.format(edges=connection.ops.quote_name(CoursePrerequisite._meta.db_table))
+        with connection.cursor() as cursor:
+            started = time.perf_counter()
+            recursive = {}
+            for course_id in sample:
+                cursor.execute(sql, [course_id])
+                recursive[course_id] = {row[0] for row in cursor.fetchall()}
+            recursive_time = time.perf_counter() - started
+        started = time.perf_counter()
+        closure = {
+            course_id: set(CoursePrerequisiteClosure.objects.filter(course_id=course_id).values_list('prerequisite_id', flat=True))
+            for course_id in sample
+        }
+        closure_time = time.perf_counter() - started
+        if closure != recursive:
+            raise CommandError("The closure differs from the recursive query.")
+        count = len(sample)
+        self.stdout.write(
+            f"Lookups: recursive query {recursive_time / count * 1000:.2f} ms, closure {closure_time / count * 1000:.2f} ms "
+            f"({recursive_time / closure_time:.1f}x faster)."
+        )
+
+        edges = list(CoursePrerequisite.objects.order_by('?')[:options['removals']])
+        started = time.perf_counter()
+        for edge in edges:
+            edge.delete()
+        elapsed = time.perf_counter() - started
+        for course_id in sample[:50]:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [course_id])
+                expected = {row[0] for row in cursor.fetchall()}
+            if expected != set(CoursePrerequisiteClosure.objects.filter(course_id=course_id).values_list('prerequisite_id', flat=True)):
+                raise CommandError("The closure is wrong after removing edges.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {len(edges)} edges in {elapsed:.2f}s ({elapsed / max(len(edges), 1) * 1000:.2f} ms/edge); closure verified."
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.bundle import build_bundle
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds the offline catalog bundle: the whole catalog as one JSON file, gzip (and brotli) "
+        "compressed and named by the hash of its content, under STATIC_ROOT where WhiteNoise serves it "
+        "with immutable cache headers. Then points the manifest served at /api/academics/bundle/ at it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=3, help=(
+            "Number of bundles to keep, including the new one. Workers index static files when they "
+            "start, so prune only bundles that are no longer in use by running workers."
+        ))
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        if options['keep'] < 1:
+            raise CommandError("--keep must be at least 1.")
+        started = time.monotonic()
+        manifest = build_bundle(options['chunk_size'], options['keep'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Built catalog bundle {manifest['hash']} ({manifest['size']} bytes, sync token "
+            f"{manifest['sync_token']}) in {time.monotonic() - started:.1f}s: {manifest['url']}"
+        ))
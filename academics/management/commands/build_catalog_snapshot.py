@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.catalog import get_catalog_state, catalog_stamp
+from academics.snapshot import build_snapshot, load_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Compiles the catalog into the binary snapshot that workers memory-map to serve catalog tree "
+        "reads, and atomically replaces the previous snapshot. With --watch, keeps running and rebuilds "
+        "the snapshot whenever the catalog version changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Snapshot file to write. Defaults to the CATALOG_SNAPSHOT_PATH setting.")
+        parser.add_argument('--watch', action='store_true', help="Rebuild whenever the catalog changes.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between version checks with --watch.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.CATALOG_SNAPSHOT_PATH
+        if not path:
+            raise CommandError("Pass --path or set CATALOG_SNAPSHOT_PATH.")
+        if not options['watch']:
+            self.build(path, options['chunk_size'])
+            return
+        while True:
+            snapshot = load_snapshot(path)
+            if snapshot is None or snapshot.stamp != catalog_stamp(get_catalog_state()):
+                self.build(path, options['chunk_size'])
+            time.sleep(options['interval'])
+
+    def build(self, path, chunk_size):
+        started = time.monotonic()
+        stamp = build_snapshot(path, chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Built catalog snapshot {stamp} at {path} in {time.monotonic() - started:.1f}s."
+        ))
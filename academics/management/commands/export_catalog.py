@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.export import export_lines
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports the whole catalog (institutions, programs, courses, units and fees) as CSV or JSON Lines "
+        "in the record format read by `import_catalog`, streaming rows so that memory use stays constant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to write, or '-' to write to standard output.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help="Output format. Defaults to the file extension.")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv' if path.endswith('.csv') else None)
+        if fmt is None:
+            raise CommandError("Cannot tell the output format; pass --format csv or --format jsonl.")
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size must be a positive integer.")
+
+        if path == '-':
+            for chunk in export_lines(fmt, options['chunk_size']):
+                self.stdout.write(chunk, ending='')
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            for chunk in export_lines(fmt, options['chunk_size']):
+                stream.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported the catalog to {path}."))
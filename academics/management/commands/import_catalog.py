@@ -0,0 +1,244 @@
+import csv
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, transaction
+
+from academics.models import Institution, Program, Course, Unit, Fee
+from academics.signals import catalog_bulk_changed
+
+RECORD_TYPES = ('institution', 'program', 'course', 'unit', 'fee')
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def read_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+class CatalogImporter:
+    """
+    Streams catalog records into the database. Records are buffered per model and written with
+    `bulk_create`, one transaction per batch. Parents are referenced by natural key and resolved
+    through in-memory maps: institutions by code, programs by (institution, name) and courses by
+    (program, title). Programs and courses are loaded per parent the first time they are needed, so
+    memory grows with the number of parents and not with the number of units or fees.
+
+    A record whose natural key already exists is skipped, so an import can safely be run again. The
+    natural keys are the institution code, (institution, program name), (program, course title),
+    (course, unit code) and (program, fee type).
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.institutions = dict(Institution.objects.values_list('code', 'id'))
+        self.programs, self.loaded_institutions = {}, set()
+        self.courses, self.loaded_programs = {}, set()
+        self.pending = {model: {} for model in (Institution, Program, Course, Unit, Fee)}
+        self.created = dict.fromkeys(RECORD_TYPES, 0)
+        self.skipped = 0
+
+    # Natural key lookups. Each one flushes the parent buffer if the key is still pending.
+
+    def institution_id(self, code):
+        if code in self.pending[Institution]:
+            self.flush(Institution)
+        if code not in self.institutions:
+            raise ValueError(f"unknown institution '{code}'")
+        return self.institutions[code]
+
+    def program_id(self, institution_code, name):
+        key = (self.institution_id(institution_code), name)
+        if key in self.pending[Program]:
+            self.flush(Program)
+        if key[0] not in self.loaded_institutions:
+            self.programs.update(
+                ((key[0], program_name), pk)
+                for program_name, pk in Program.objects.filter(institution_id=key[0]).values_list('name', 'id')
+            )
+            self.loaded_institutions.add(key[0])
+        if key not in self.programs:
+            raise ValueError(f"unknown program '{name}' at institution '{institution_code}'")
+        return self.programs[key]
+
+    def course_id(self, institution_code, program, title):
+        key = (self.program_id(institution_code, program), title)
+        if key in self.pending[Course]:
+            self.flush(Course)
+        if key[0] not in self.loaded_programs:
+            self.courses.update(
+                ((key[0], course_title), pk)
+                for course_title, pk in Course.objects.filter(program_id=key[0]).values_list('title', 'id')
+            )
+            self.loaded_programs.add(key[0])
+        if key not in self.courses:
+            raise ValueError(f"unknown course '{title}' in program '{program}'")
+        return self.courses[key]
+
+    # Record handlers.
+
+    def add(self, record):
+        kind = record.get('type')
+        if kind not in RECORD_TYPES:
+            raise ValueError(f"unknown record type '{kind}'")
+        getattr(self, f'add_{kind}')(record)
+
+    def buffer(self, model, key, obj):
+        if key in self.pending[model]:
+            self.skipped += 1
+            return
+        self.pending[model][key] = obj
+        if len(self.pending[model]) >= self.batch_size:
+            self.flush(model)
+
+    def add_institution(self, record):
+        code = record['code']
+        if code in self.institutions:
+            self.skipped += 1
+            return
+        self.buffer(Institution, code, Institution(code=code, name=record['name'], website=record.get('website') or None))
+
+    def add_program(self, record):
+        institution_id = self.institution_id(record['institution'])
+        key = (institution_id, record['name'])
+        try:
+            self.program_id(record['institution'], record['name'])
+        except ValueError:
+            duration = int(record['duration_years'])
+            if duration <= 0:
+                raise ValueError('duration_years must be greater than zero')
+            self.buffer(Program, key, Program(institution_id=institution_id, name=record['name'], duration_years=duration))
+        else:
+            self.skipped += 1
+
+    def add_course(self, record):
+        program_id = self.program_id(record['institution'], record['program'])
+        key = (program_id, record['title'])
+        try:
+            self.course_id(record['institution'], record['program'], record['title'])
+        except ValueError:
+            self.buffer(Course, key, Course(program_id=program_id, title=record['title'], semester=int(record['semester'])))
+        else:
+            self.skipped += 1
+
+    def add_unit(self, record):
+        course_id = self.course_id(record['institution'], record['program'], record['course'])
+        self.buffer(Unit, (course_id, record['code']), Unit(
+            course_id=course_id, code=record['code'], name=record['name'],
+            description=record.get('description') or '',
+        ))
+
+    def add_fee(self, record):
+        program_id = self.program_id(record['institution'], record['program'])
+        try:
+            amount = Decimal(record['amount'])
+        except (InvalidOperation, TypeError):
+            raise ValueError(f"invalid amount '{record['amount']}'")
+        self.buffer(Fee, (program_id, record['fee_type']), Fee(
+            program_id=program_id, amount=amount, currency=record.get('currency') or 'KSH',
+            fee_type=record['fee_type'], description=record.get('description') or None,
+        ))
+
+    # Writing.
+
+    def existing_keys(self, model, keys):
+        """
+        Returns the keys of a unit or fee batch that already exist, using one query per batch.
+        """
+        if model is Unit:
+            parent, field = 'course_id', 'code'
+        else:
+            parent, field = 'program_id', 'fee_type'
+        return keys & set(model.objects.filter(
+            **{f'{parent}__in': {key[0] for key in keys}, f'{field}__in': {key[1] for key in keys}}
+        ).values_list(parent, field))
+
+    def flush(self, model):
+        pending = self.pending[model]
+        if not pending:
+            return
+        if model in (Unit, Fee):
+            for key in self.existing_keys(model, pending.keys()):
+                del pending[key]
+                self.skipped += 1
+        with transaction.atomic():
+            created = model.objects.bulk_create(pending.values(), batch_size=self.batch_size)
+            catalog_bulk_changed(model, [obj.pk for obj in created])
+        if model is Institution:
+            self.institutions.update((obj.code, obj.pk) for obj in created)
+        elif model is Program:
+            self.programs.update(((obj.institution_id, obj.name), obj.pk) for obj in created)
+        elif model is Course:
+            self.courses.update(((obj.program_id, obj.title), obj.pk) for obj in created)
+        self.created[model._meta.model_name] += len(created)
+        pending.clear()
+
+    def flush_all(self):
+        for model in self.pending:
+            self.flush(model)
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports catalog records (institutions, programs, courses, units and fees) from a CSV or JSON "
+        "Lines file. Every record has a `type` and refers to its parents by natural key: "
+        "`institution` (code), `program` (name) and `course` (title). Parents must appear before "
+        "their children. Records that already exist are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' to read from standard input.")
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help="Input format. Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Rows per bulk insert and transaction.")
+        parser.add_argument('--progress-every', type=int, default=100000, help="Report progress every N rows.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv' if path.endswith('.csv') else None)
+        if fmt is None:
+            raise CommandError("Cannot tell the input format; pass --format csv or --format jsonl.")
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be a positive integer.")
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        reader = read_jsonl(stream) if fmt == 'jsonl' else read_csv(stream)
+        importer = CatalogImporter(options['batch_size'])
+        started = time.monotonic()
+        rows = 0
+        try:
+            for rows, record in enumerate(reader, start=1):
+                try:
+                    importer.add(record)
+                except KeyError as e:
+                    raise CommandError(f"Record {rows}: missing field {e}")
+                except ValueError as e:
+                    raise CommandError(f"Record {rows}: {e}")
+                if rows % options['progress_every'] == 0:
+                    self.report(rows, started)
+            importer.flush_all()
+        except ValueError as e:
+            raise CommandError(f"Record {rows + 1}: {e}")
+        except DatabaseError as e:
+            raise CommandError(f"Database error near record {rows}: {e}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = self.report(rows, started)
+        created = ', '.join(f"{count} {kind}s" for kind, count in importer.created.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {rows} records in {elapsed:.1f}s: created {created}; skipped {importer.skipped}."
+        ))
+
+    def report(self, rows, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"{rows} records processed ({rows / elapsed if elapsed else 0:.0f} rows/sec)")
+        return elapsed
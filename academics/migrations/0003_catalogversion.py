@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+CATALOG_LABELS = ('academics.institution', 'academics.program', 'academics.course', 'academics.unit', 'academics.fee')
+
+
+def create_catalog_versions(apps, schema_editor):
+    CatalogVersion = apps.get_model('academics', 'CatalogVersion')
+    CatalogVersion.objects.bulk_create([CatalogVersion(label=label) for label in CATALOG_LABELS])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0002_fee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('label', models.CharField(max_length=100, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='program',
+            name='duration_years',
+            field=models.PositiveIntegerField(help_text='Enter number of years. Must be at least 1.', verbose_name='Duration (Years)'),
+        ),
+        migrations.RunPython(create_catalog_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:34
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    # The GIN index and the initial documents are PostgreSQL only; other databases search through
+    # the in-process index in `academics.search`. Documents are built with the configuration searches
+    # use, `CATALOG_SEARCH_CONFIG`.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX academics_unitsearchdocument_gin ON academics_unitsearchdocument USING gin (document)"
+    )
+    schema_editor.execute("""
+        INSERT INTO academics_unitsearchdocument (unit_id, document)
+        SELECT u.id,
+            setweight(to_tsvector(%(config)s, u.code || ' ' || u.name), 'A') ||
+            setweight(to_tsvector(%(config)s, c.title), 'B') ||
+            setweight(to_tsvector(%(config)s, p.name), 'B') ||
+            setweight(to_tsvector(%(config)s, u.description), 'C')
+        FROM academics_unit u
+        JOIN academics_course c ON c.id = u.course_id
+        JOIN academics_program p ON p.id = c.program_id
+    """, {'config': getattr(settings, 'CATALOG_SEARCH_CONFIG', 'english')})
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS academics_unitsearchdocument_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0003_catalogversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UnitSearchDocument',
+            fields=[
+                ('unit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='academics.unit')),
+                ('document', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
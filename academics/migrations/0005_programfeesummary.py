@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_fee_summaries(apps, schema_editor):
+    Fee = apps.get_model('academics', 'Fee')
+    ProgramFeeSummary = apps.get_model('academics', 'ProgramFeeSummary')
+    rows = Fee.objects.values('program_id', 'currency', 'fee_type').annotate(total=Sum('amount'), fee_count=Count('id'))
+    ProgramFeeSummary.objects.bulk_create([ProgramFeeSummary(**row) for row in rows.order_by()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0004_unitsearchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgramFeeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=10)),
+                ('fee_type', models.CharField(max_length=50)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fee_count', models.PositiveIntegerField(default=0)),
+                ('program', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fee_summaries', to='academics.program')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('program', 'currency', 'fee_type'), name='unique_program_fee_summary')],
+            },
+        ),
+        migrations.RunPython(build_fee_summaries, migrations.RunPython.noop),
+    ]
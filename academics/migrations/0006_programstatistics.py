@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:41
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_program_statistics(apps, schema_editor):
+    Program = apps.get_model('academics', 'Program')
+    Course = apps.get_model('academics', 'Course')
+    Unit = apps.get_model('academics', 'Unit')
+    ProgramStatistics = apps.get_model('academics', 'ProgramStatistics')
+    courses = dict(Course.objects.values_list('program_id').annotate(count=Count('id')).order_by())
+    units = dict(Unit.objects.values_list('course__program_id').annotate(count=Count('id')).order_by())
+    rows = (
+        ProgramStatistics(
+            program_id=pk, name_key=' '.join(name.casefold().split()),
+            course_count=courses.get(pk, 0), unit_count=units.get(pk, 0),
+        )
+        for pk, name in Program.objects.values_list('id', 'name').iterator(chunk_size=2000)
+    )
+    ProgramStatistics.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0005_programfeesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgramStatistics',
+            fields=[
+                ('program', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='academics.program')),
+                ('name_key', models.CharField(db_index=True, max_length=255)),
+                ('course_count', models.PositiveIntegerField(default=0)),
+                ('unit_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'program statistics',
+            },
+        ),
+        migrations.RunPython(build_program_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0006_programstatistics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['program', 'semester'], name='course_program_semester_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fee',
+            index=models.Index(fields=['program', 'fee_type'], name='fee_program_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['code'], name='unit_code_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        # Drop the single-column foreign key indexes only once the indexes replacing them exist.
+        migrations.AlterField(
+            model_name='course',
+            name='program',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='academics.program'),
+        ),
+        migrations.AlterField(
+            model_name='fee',
+            name='program',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='academics.program'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def log_existing_rows(apps, schema_editor):
+    # Every existing row starts the change log as an upsert, parents first, so that a client syncing
+    # from token 0 receives the whole catalog.
+    CatalogChange = apps.get_model('academics', 'CatalogChange')
+    quote = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        for name in ('institution', 'program', 'course', 'unit', 'fee'):
+            table = apps.get_model('academics', name)._meta.db_table
+            cursor.execute(
+                f"INSERT INTO {quote(CatalogChange._meta.db_table)} (model, object_id, deleted, changed_at) "
+                f"SELECT %s, id, %s, updated_at FROM {quote(table)} ORDER BY id",
+                [name, False],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0007_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='fee',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='institution',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='program',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='unit',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(log_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0008_catalog_changes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='unit',
+            index=models.Index(fields=['course', 'code'], name='unit_course_code_idx'),
+        ),
+        # Drop the single-column foreign key index only once the index replacing it exists.
+        migrations.AlterField(
+            model_name='unit',
+            name='course',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='academics.course'),
+        ),
+    ]
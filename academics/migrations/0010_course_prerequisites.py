@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0009_unit_course_code_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoursePrerequisite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='prerequisite_links', to='academics.course')),
+                ('prerequisite', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dependent_links', to='academics.course')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'prerequisite'), name='unique_course_prerequisite'), models.CheckConstraint(condition=models.Q(('course', models.F('prerequisite')), _negated=True), name='prerequisite_not_self')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CoursePrerequisiteClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academics.course')),
+                ('prerequisite', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='academics.course')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['prerequisite', 'course'], name='closure_prerequisite_idx')],
+                'constraints': [models.UniqueConstraint(fields=('course', 'prerequisite'), name='unique_prerequisite_closure')],
+            },
+        ),
+    ]
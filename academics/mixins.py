@@ -0,0 +1,299 @@
+import copy
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import UniqueConstraint
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .catalog import get_catalog_state, catalog_stamp, catalog_timestamp
+from .signals import catalog_bulk_changed, catalog_bulk_delete
+from .snapshot import load_snapshot
+
+
+class CatalogStateMixin:
+    """
+    Gives a view access to the `CatalogState` of the models it reads, loaded at most once per request.
+
+    `catalog_models` lists the models a view depends on and defaults to the model of its queryset.
+    Relations nested with `?expand=` (see `SparseQuerysetMixin`) add their models, so that responses
+    embedding them change when they do, and so do the models that the `indexed_filters` given in the
+    request go through, so that filtered lists change when a row moves to another parent.
+    """
+    catalog_models = None
+
+    def get_catalog_models(self):
+        models = tuple(self.catalog_models or (self.queryset.model,))
+        related = []
+        if hasattr(self, 'get_sparse_fieldset'):
+            _, expand = self.get_sparse_fieldset()
+            opts = self.queryset.model._meta
+            related.extend(opts.get_field(name).related_model for name in sorted(expand))
+        params = self.request.query_params
+        for name, declared in getattr(self, 'indexed_filters', {}).items():
+            if params.get(name, '').strip():
+                related.extend(declared.models)
+        for model in related:
+            if model not in models:
+                models += (model,)
+        return models
+
+    def get_catalog_state(self):
+        if not hasattr(self, '_catalog_state'):
+            self._catalog_state = get_catalog_state(*self.get_catalog_models())
+        return self._catalog_state
+
+
+class CatalogConditionalMixin(CatalogStateMixin):
+    """
+    Adds strong `ETag` and `Last-Modified` headers to list and retrieve responses, derived from the
+    `CatalogVersion` counters of the models the view reads. A request carrying a matching
+    `If-None-Match` (or an `If-Modified-Since` that is not older than the last change) gets a
+    `304 Not Modified` after a single query on the version table, without reading the catalog.
+    """
+
+    def get_catalog_validators(self, request):
+        state = self.get_catalog_state()
+        etag = quote_etag(f"{catalog_stamp(state)}-{request.accepted_renderer.format}")
+        return etag, catalog_timestamp(state)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_catalog_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+
+class CatalogCacheMixin(CatalogStateMixin):
+    """
+    Read-through cache for list and retrieve responses. Entries live in the cache configured by
+    `CATALOG_CACHE_ALIAS` and are keyed on the request path, the sorted query parameters and the
+    catalog stamp of the models the view reads.
+
+    The `post_save`/`post_delete` handlers in `academics.signals` bump the version of the model that
+    changed, which moves every view reading that model onto new keys. Views over other models keep
+    their entries, and the orphaned ones expire after `CATALOG_CACHE_TIMEOUT` seconds.
+    """
+
+    def get_cache_key(self, request):
+        params = '&'.join(
+            f"{name}={value}"
+            for name, values in sorted(request.query_params.lists())
+            for value in values
+        )
+        digest = hashlib.md5(
+            f"{request.get_host()}{request.path}?{params}".encode(), usedforsecurity=False
+        ).hexdigest()
+        return f"catalog:{catalog_stamp(self.get_catalog_state())}:{request.accepted_renderer.format}:{digest}"
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+
+class CatalogSnapshotMixin(CatalogStateMixin):
+    """
+    Serves list requests from the memory-mapped catalog snapshot (see `academics.snapshot`) when one
+    is configured and was built from the current catalog version, without querying the catalog
+    tables. Otherwise, e.g. while a rebuild is pending, the view reads the database as usual.
+
+    Views implement `snapshot_data(snapshot)` to return the response data from the snapshot.
+    """
+
+    def list(self, request, *args, **kwargs):
+        snapshot = load_snapshot()
+        if snapshot is not None and snapshot.stamp == catalog_stamp(self.get_catalog_state()):
+            return Response(self.snapshot_data(snapshot))
+        return super().list(request, *args, **kwargs)
+
+    def snapshot_data(self, snapshot):
+        raise NotImplementedError
+
+
+class BatchWriteMixin:
+    """
+    Adds a `batch/` endpoint to a catalog viewset for writing many objects in one request:
+
+    - `POST` takes an array of objects and creates them all.
+    - `PATCH` takes an array of partial objects, each with its `id`, and updates them.
+    - `DELETE` takes `{"ids": [...]}` and deletes those objects.
+
+    The whole array is validated before anything is written. If any item is invalid the response is a
+    400 with one error entry per item (empty for valid items) and nothing is written. Otherwise the
+    batch is applied in one transaction with `bulk_create`, `bulk_update` or a single delete, and the
+    response lists the result of each item in request order.
+    """
+    batch_max_size = 500
+
+    def get_batch_items(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'non_field_errors': ['Expected a non-empty list of items.']})
+        if len(items) > self.batch_max_size:
+            raise ValidationError({'non_field_errors': [f'A batch may contain at most {self.batch_max_size} items.']})
+        return items
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='batch')
+    def batch(self, request):
+        if request.method == 'POST':
+            return self.batch_create(request)
+        if request.method == 'PATCH':
+            return self.batch_update(request)
+        return self.batch_delete(request)
+
+    def batch_create(self, request):
+        items = self.get_batch_items(request)
+        serializer = self.get_serializer(data=items, many=True)
+        if not serializer.is_valid():
+            errors = serializer.errors
+            # Depending on the DRF version, list errors are a list or a dict keyed by item index.
+            if isinstance(errors, dict) and all(isinstance(index, int) for index in errors):
+                errors = [errors.get(index, {}) for index in range(len(items))]
+            raise ValidationError(errors)
+        model = self.queryset.model
+        objs = [model(**attrs) for attrs in serializer.validated_data]
+        # Items are validated one by one against the database, so values repeated within the batch
+        # are only caught here.
+        errors = self.batch_duplicate_errors(model, objs)
+        if any(errors):
+            raise ValidationError(errors)
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(objs)
+                catalog_bulk_changed(model, [obj.pk for obj in objs])
+        except IntegrityError as e:
+            raise ValidationError({'non_field_errors': [f'The batch conflicts with existing data: {e}']})
+        results = [
+            {'index': index, 'status': 'created', 'id': obj.pk, 'data': data}
+            for index, (obj, data) in enumerate(zip(objs, self.get_serializer(objs, many=True).data))
+        ]
+        return Response({'results': results}, status=status.HTTP_201_CREATED)
+
+    def batch_unique_sets(self, model):
+        """
+        Returns the field name tuples whose values must be unique: unique fields, `unique_together`
+        and unconditional unique constraints.
+        """
+        opts = model._meta
+        sets = [(field.name,) for field in opts.concrete_fields if field.unique and not field.primary_key]
+        sets += [tuple(fields) for fields in opts.unique_together]
+        sets += [
+            tuple(constraint.fields) for constraint in opts.constraints
+            if isinstance(constraint, UniqueConstraint) and constraint.fields and constraint.condition is None
+        ]
+        return sets
+
+    def batch_duplicate_errors(self, model, objs):
+        """
+        Returns one error entry per object, flagging the objects that repeat the unique values of an
+        earlier object of the batch.
+        """
+        errors = [{} for _ in objs]
+        for names in self.batch_unique_sets(model):
+            attnames = [model._meta.get_field(name).attname for name in names]
+            seen = {}
+            for index, obj in enumerate(objs):
+                values = tuple(getattr(obj, attname) for attname in attnames)
+                if None in values:
+                    continue
+                if values in seen:
+                    key = names[0] if len(names) == 1 else 'non_field_errors'
+                    errors[index].setdefault(key, []).append(
+                        f"Same {', '.join(names)} as item {seen[values]} of the batch."
+                    )
+                else:
+                    seen[values] = index
+        return errors
+
+    def batch_update(self, request):
+        items = self.get_batch_items(request)
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        model = self.queryset.model
+        instances = model.objects.in_bulk([pk for pk in ids if isinstance(pk, int)])
+
+        errors, serializers = [], []
+        for item, pk in zip(items, ids):
+            if pk not in instances:
+                errors.append({'id': ['An existing id is required.']})
+                continue
+            if ids.count(pk) > 1:
+                errors.append({'id': ['Duplicate id in batch.']})
+                continue
+            serializer = self.get_serializer(instances[pk], data=item, partial=True)
+            errors.append({} if serializer.is_valid() else serializer.errors)
+            serializers.append(serializer)
+        if any(errors):
+            raise ValidationError(errors)
+
+        previous = [copy.copy(serializer.instance) for serializer in serializers]
+        fields = set()
+        for serializer in serializers:
+            for attr, value in serializer.validated_data.items():
+                setattr(serializer.instance, attr, value)
+                fields.add(attr)
+        objs = [serializer.instance for serializer in serializers]
+        if fields:
+            # `bulk_update` does not run `auto_now`, so stamp the rows here.
+            now = timezone.now()
+            for obj in objs:
+                obj.updated_at = now
+            fields.add('updated_at')
+        try:
+            with transaction.atomic():
+                if fields:
+                    model.objects.bulk_update(objs, sorted(fields))
+                catalog_bulk_changed(model, [obj.pk for obj in objs], previous=previous)
+        except IntegrityError as e:
+            raise ValidationError({'non_field_errors': [f'The batch conflicts with existing data: {e}']})
+        results = [
+            {'index': index, 'status': 'updated', 'id': obj.pk, 'data': data}
+            for index, (obj, data) in enumerate(zip(objs, self.get_serializer(objs, many=True).data))
+        ]
+        return Response({'results': results})
+
+    def batch_delete(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not ids or not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({'ids': ['Expected a non-empty list of ids.']})
+        if len(ids) > self.batch_max_size:
+            raise ValidationError({'ids': [f'A batch may contain at most {self.batch_max_size} ids.']})
+        model = self.queryset.model
+        with transaction.atomic():
+            found = set(model.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            catalog_bulk_delete(model.objects.filter(pk__in=found))
+        results = [
+            {'index': index, 'status': 'deleted' if pk in found else 'not_found', 'id': pk}
+            for index, pk in enumerate(ids)
+        ]
+        return Response({'results': results})
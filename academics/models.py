@@ -1,4 +1,6 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.utils import timezone
 
 from django.core.exceptions import ValidationError
 
@@ -8,6 +10,7 @@ class Institution(models.Model):
     name = models.CharField(max_length=255)
     code = models.CharField(max_length=20, unique=True)
     website = models.URLField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -22,6 +25,7 @@ class Program(models.Model):
         verbose_name="Duration (Years)",
         help_text="Enter number of years. Must be at least 1."
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} - {self.institution.name}"
@@ -36,9 +40,17 @@ class Program(models.Model):
 # The `Course` class represents a course with a title, semester, and a foreign key reference to a
 # `Program` object.
 class Course(models.Model):
-    program = models.ForeignKey(Program, on_delete=models.CASCADE)
+    # Indexed by `course_program_semester_idx` below, which starts with the program.
+    program = models.ForeignKey(Program, on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length=255)
     semester = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Courses are listed per program and semester.
+            models.Index(fields=['program', 'semester'], name='course_program_semester_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.program.name}"
@@ -47,10 +59,21 @@ class Course(models.Model):
 # The `Unit` class represents a unit within a course with attributes such as code, name, and
 # description.
 class Unit(models.Model):
-    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    # Indexed by `unit_course_code_idx` below, which starts with the course.
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, db_index=False)
     code = models.CharField(max_length=10)
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves exact and prefix (`startswith`) lookups by unit code. The pattern operator class
+            # lets PostgreSQL use the index for LIKE 'ABC%' whatever the database collation.
+            models.Index(fields=['code'], name='unit_code_idx', opclasses=['varchar_pattern_ops']),
+            # Units are listed per course, ordered by code.
+            models.Index(fields=['course', 'code'], name='unit_course_code_idx'),
+        ]
 
     def __str__(self):
         return f"{self.code} - {self.name}"
@@ -59,12 +82,147 @@ class Unit(models.Model):
 # The `Fee` class represents a fee associated with a program, including details such as amount,
 # currency, fee type, and description.
 class Fee(models.Model):
-    program = models.ForeignKey(Program, on_delete=models.CASCADE)
+    # Indexed by `fee_program_type_idx` below, which starts with the program.
+    program = models.ForeignKey(Program, on_delete=models.CASCADE, db_index=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     currency = models.CharField(max_length=10, default='KSH')
     fee_type = models.CharField(max_length=50)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Fees are looked up by program and fee type, e.g. by the catalog import.
+            models.Index(fields=['program', 'fee_type'], name='fee_program_type_idx'),
+        ]
 
     def __str__(self):
         return f"{self.fee_type} - {self.amount} {self.currency} for {self.program.name}"
-    
+
+
+# The `CatalogVersion` class keeps one change counter per catalog model (e.g. `academics.unit`). The
+# counters are bumped by the signal handlers in `academics.signals` whenever a catalog row is saved or
+# deleted, and are used to answer conditional requests without reading the catalog tables.
+class CatalogVersion(models.Model):
+    label = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.label} v{self.version}"
+
+
+# The `UnitSearchDocument` class stores the full-text search vector of a unit, built from the unit's
+# code, name and description and the titles of its course and program. It is kept in its own table so
+# that regular unit queries do not read it, and is refreshed by `academics.search`. On PostgreSQL the
+# `document` column is covered by a GIN index created in migration 0004.
+class UnitSearchDocument(models.Model):
+    unit = models.OneToOneField(Unit, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    document = SearchVectorField(null=True)
+
+    def __str__(self):
+        return f"Search document for unit {self.unit_id}"
+
+
+# The `ProgramFeeSummary` class holds the total and number of a program's fees for each currency and
+# fee type. Rows are kept up to date incrementally by `academics.fees` whenever a fee changes, so the
+# cost of a program is read with one indexed lookup instead of summing its fees.
+class ProgramFeeSummary(models.Model):
+    program = models.ForeignKey(Program, on_delete=models.CASCADE, related_name='fee_summaries')
+    currency = models.CharField(max_length=10)
+    fee_type = models.CharField(max_length=50)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fee_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['program', 'currency', 'fee_type'], name='unique_program_fee_summary')
+        ]
+
+    def __str__(self):
+        return f"{self.fee_type} - {self.total} {self.currency} for program {self.program_id}"
+
+
+# The `ProgramStatistics` class holds precomputed figures about a program used to compare programs
+# across institutions: its course and unit counts and a normalized form of its name, so that programs
+# called the same thing at different institutions are found with one indexed lookup. Rows are
+# refreshed by `academics.statistics` whenever a program, course or unit changes.
+class ProgramStatistics(models.Model):
+    program = models.OneToOneField(Program, on_delete=models.CASCADE, primary_key=True, related_name='statistics')
+    name_key = models.CharField(max_length=255, db_index=True)
+    course_count = models.PositiveIntegerField(default=0)
+    unit_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = 'program statistics'
+
+    def __str__(self):
+        return f"Statistics for program {self.program_id}"
+
+
+# The `CatalogChange` class is the change log behind the catalog sync feed. A row is appended for
+# every catalog object that is created, updated or deleted (a tombstone, with `deleted` set), and
+# its auto-incrementing id is the sync token handed to clients, so changes since a token are read
+# with a primary key range scan.
+class CatalogChange(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        action = 'deleted' if self.deleted else 'saved'
+        return f"{self.model} {self.object_id} {action}"
+
+
+# The `CoursePrerequisite` class records that a course can only be taken after another one. Edges
+# must not form cycles: the `post_save` handler extending the closure refuses an edge that closes one
+# by raising `ValidationError`. `save()` and `delete()` therefore run in their own transaction, so
+# that a refused edge is rolled back, and the closure stays in step with the edges, whether or not
+# the caller is in a transaction. Bulk operations skip the handlers and must not be used.
+class CoursePrerequisite(models.Model):
+    # Indexed by `unique_course_prerequisite` below, which starts with the course.
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='prerequisite_links', db_index=False)
+    prerequisite = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='dependent_links')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'prerequisite'], name='unique_course_prerequisite'),
+            models.CheckConstraint(condition=~models.Q(course=models.F('prerequisite')), name='prerequisite_not_self'),
+        ]
+
+    def __str__(self):
+        return f"Course {self.course_id} requires course {self.prerequisite_id}"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            return super().delete(*args, **kwargs)
+
+
+# The `CoursePrerequisiteClosure` class is the transitive closure of `CoursePrerequisite`: one row for
+# every course and each course it requires directly or through other prerequisites. It is kept up to
+# date incrementally by `academics.prerequisites` whenever an edge is added or removed, so the full
+# set of a course's prerequisites, or of the courses it unlocks, is read with one indexed lookup
+# instead of a recursive query.
+class CoursePrerequisiteClosure(models.Model):
+    # Indexed by `unique_prerequisite_closure` below, which starts with the course.
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+', db_index=False)
+    prerequisite = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+', db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'prerequisite'], name='unique_prerequisite_closure'),
+        ]
+        indexes = [
+            # The courses a course unlocks.
+            models.Index(fields=['prerequisite', 'course'], name='closure_prerequisite_idx'),
+        ]
+
+    def __str__(self):
+        return f"Course {self.course_id} needs course {self.prerequisite_id}"
@@ -0,0 +1,168 @@
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .catalog import bump_catalog_version
+from .models import Course, CoursePrerequisite, CoursePrerequisiteClosure
+
+
+def lock_prerequisite_graph():
+    """
+    Bumps the prerequisite graph's `CatalogVersion` counter. The update keeps the counter's row locked
+    until the transaction ends, and every change to the graph takes this lock first, so changes are
+    applied one at a time and the cycle check of one always sees the edges added by the others.
+    """
+    bump_catalog_version(CoursePrerequisite)
+
+
+def requires(course_id, prerequisite_id):
+    """
+    Tells whether a course requires another one, directly or through other prerequisites.
+    """
+    return CoursePrerequisiteClosure.objects.filter(course_id=course_id, prerequisite_id=prerequisite_id).exists()
+
+
+def closure_dependents(course_id):
+    return set(CoursePrerequisiteClosure.objects.filter(prerequisite_id=course_id).values_list('course_id', flat=True))
+
+
+def check_not_self(course_id, prerequisite_id):
+    if course_id == prerequisite_id:
+        raise ValidationError({'prerequisite': 'A course cannot be its own prerequisite.'})
+
+
+def check_prerequisite(course_id, prerequisite_id):
+    check_not_self(course_id, prerequisite_id)
+    if requires(prerequisite_id, course_id):
+        raise ValidationError({'prerequisite': 'This prerequisite would create a cycle.'})
+
+
+def add_prerequisite(course_id, prerequisite_id):
+    """
+    Adds a prerequisite edge, refusing edges that already exist and edges from a course to itself
+    (before the database's check constraint would reject them) as well as edges closing a cycle,
+    which `prerequisite_added` refuses and `CoursePrerequisite.save()` rolls back.
+    """
+    check_not_self(course_id, prerequisite_id)
+    with transaction.atomic():
+        if CoursePrerequisite.objects.filter(course_id=course_id, prerequisite_id=prerequisite_id).exists():
+            raise ValidationError({'prerequisite': 'This course already requires that course.'})
+        return CoursePrerequisite.objects.create(course_id=course_id, prerequisite_id=prerequisite_id)
+
+
+def prerequisite_added(edge):
+    """
+    Extends the closure with a new edge: every course that needs `edge.course` (and the course itself)
+    now needs `edge.prerequisite` and everything it needs. This is one insert of the product of the two
+    sets, both read with an indexed lookup. Raises `ValidationError` if the edge closes a cycle, which
+    rolls the edge back since `CoursePrerequisite.save()` runs in a transaction.
+    """
+    lock_prerequisite_graph()
+    check_prerequisite(edge.course_id, edge.prerequisite_id)
+    upstream = closure_dependents(edge.course_id) | {edge.course_id}
+    downstream = set(CoursePrerequisiteClosure.objects.filter(course_id=edge.prerequisite_id).values_list(
+        'prerequisite_id', flat=True
+    )) | {edge.prerequisite_id}
+    CoursePrerequisiteClosure.objects.bulk_create(
+        (CoursePrerequisiteClosure(course_id=course_id, prerequisite_id=prerequisite_id)
+         for course_id in upstream for prerequisite_id in downstream),
+        ignore_conflicts=True, batch_size=5000,
+    )
+
+
+def rebuild_closures(course_ids):
+    """
+    Recomputes the closure rows of the given courses from the remaining edges and removes the rows
+    that no longer hold (or adds missing ones). The closure of a course is the union of its direct
+    prerequisites and their closures, so courses are processed prerequisites first, and closures of
+    courses outside `course_ids` are read as stored. `course_ids` must therefore hold every course
+    whose closure may have changed: after an edge is removed, its course and all the courses that
+    needed it.
+    """
+    course_ids = set(Course.objects.filter(pk__in=course_ids).values_list('pk', flat=True))
+    if not course_ids:
+        return
+    direct = defaultdict(set)
+    for course_id, prerequisite_id in CoursePrerequisite.objects.filter(course_id__in=course_ids).values_list(
+        'course_id', 'prerequisite_id'
+    ):
+        direct[course_id].add(prerequisite_id)
+    closures = defaultdict(set)
+    outside = {pk for prerequisites in direct.values() for pk in prerequisites} - course_ids
+    for course_id, prerequisite_id in CoursePrerequisiteClosure.objects.filter(course_id__in=outside).values_list(
+        'course_id', 'prerequisite_id'
+    ):
+        closures[course_id].add(prerequisite_id)
+
+    # Depth-first, post-order walk so that each course is computed after its prerequisites.
+    done = set()
+    for root in course_ids:
+        stack = [(root, False)]
+        while stack:
+            course_id, expanded = stack.pop()
+            if course_id in done:
+                continue
+            if not expanded:
+                stack.append((course_id, True))
+                stack.extend((pk, False) for pk in direct[course_id] if pk in course_ids and pk not in done)
+                continue
+            closure = set()
+            for pk in direct[course_id]:
+                closure.add(pk)
+                closure |= closures[pk]
+            closures[course_id] = closure
+            done.add(course_id)
+
+    current = defaultdict(set)
+    for course_id, prerequisite_id in CoursePrerequisiteClosure.objects.filter(course_id__in=course_ids).values_list(
+        'course_id', 'prerequisite_id'
+    ):
+        current[course_id].add(prerequisite_id)
+    for course_id in course_ids:
+        removed = current[course_id] - closures[course_id]
+        if removed:
+            CoursePrerequisiteClosure.objects.filter(course_id=course_id, prerequisite_id__in=removed).delete()
+    CoursePrerequisiteClosure.objects.bulk_create(
+        (CoursePrerequisiteClosure(course_id=course_id, prerequisite_id=prerequisite_id)
+         for course_id in course_ids for prerequisite_id in closures[course_id] - current[course_id]),
+        ignore_conflicts=True, batch_size=5000,
+    )
+
+
+def prerequisite_removed(edge):
+    """
+    Shrinks the closure after an edge is deleted. Only the edge's course and the courses needing it
+    can have lost prerequisites.
+    """
+    lock_prerequisite_graph()
+    rebuild_closures(closure_dependents(edge.course_id) | {edge.course_id})
+
+
+def remember_dependents(course):
+    """
+    Stores the courses that need `course` on the instance before it is deleted. Its closure rows are
+    deleted with it, so `course_removed` could not find them afterwards.
+    """
+    course._prerequisite_dependents = closure_dependents(course.pk)
+
+
+def course_removed(course):
+    courses_removed(getattr(course, '_prerequisite_dependents', None))
+
+
+def remaining_dependents(course_ids):
+    """
+    Returns the courses outside `course_ids` that need one of them, to be read before they are
+    deleted together and passed to `courses_removed` afterwards.
+    """
+    course_ids = set(course_ids)
+    return set(CoursePrerequisiteClosure.objects.filter(prerequisite_id__in=course_ids).values_list(
+        'course_id', flat=True
+    )) - course_ids
+
+
+def courses_removed(dependents):
+    if dependents:
+        lock_prerequisite_graph()
+        rebuild_closures(dependents)
@@ -0,0 +1,201 @@
+import heapq
+import math
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F
+
+from .catalog import get_catalog_state, catalog_stamp
+from .models import Institution, Program, Course, Unit, UnitSearchDocument
+
+TOKEN_RE = re.compile(r'\w+')
+QUERY_PART_RE = re.compile(r'(-?)(?:"([^"]*)"?|(\S+))')
+
+# The weights PostgreSQL's `ts_rank` gives to the A, B and C labels of a search document. The
+# in-process backend uses the same ones so that both backends rank hits alike.
+UNIT_WEIGHT, PARENT_WEIGHT, DESCRIPTION_WEIGHT = 1.0, 0.4, 0.2
+
+DOCUMENT_SQL = """
+    INSERT INTO {document} (unit_id, document)
+    SELECT u.id,
+        setweight(to_tsvector(%(config)s, u.code || ' ' || u.name), 'A') ||
+        setweight(to_tsvector(%(config)s, c.title), 'B') ||
+        setweight(to_tsvector(%(config)s, p.name), 'B') ||
+        setweight(to_tsvector(%(config)s, u.description), 'C')
+    FROM {unit} u
+    JOIN {course} c ON c.id = u.course_id
+    JOIN {program} p ON p.id = c.program_id
+    WHERE {where}
+    ON CONFLICT (unit_id) DO UPDATE SET document = EXCLUDED.document
+"""
+
+
+def search_config():
+    return getattr(settings, 'CATALOG_SEARCH_CONFIG', 'english')
+
+
+def uses_postgres_search():
+    return connection.vendor == 'postgresql'
+
+
+def refresh_search_documents(unit_ids=None, course_ids=None, program_ids=None):
+    """
+    Rebuilds the search documents of the given units, of every unit in the given courses and of every
+    unit in the given programs with one `INSERT ... SELECT` statement. Does nothing on databases other
+    than PostgreSQL, where searches go through the in-process index instead.
+    """
+    if not uses_postgres_search():
+        return
+    conditions, params = [], {'config': search_config()}
+    for column, ids in (('u.id', unit_ids), ('u.course_id', course_ids), ('c.program_id', program_ids)):
+        if ids:
+            conditions.append(f"{column} = ANY(%({column[2:]})s)")
+            params[column[2:]] = list(ids)
+    if not conditions:
+        return
+    sql = DOCUMENT_SQL.format(
+        document=UnitSearchDocument._meta.db_table,
+        unit=Unit._meta.db_table,
+        course=Course._meta.db_table,
+        program=Program._meta.db_table,
+        where=' OR '.join(conditions),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def search_hit(rank, unit_id, code, name, course_id, title, program_id, program_name,
+               institution_id, institution_name, institution_code):
+    return {
+        'unit': {'id': unit_id, 'code': code, 'name': name},
+        'course': {'id': course_id, 'title': title},
+        'program': {'id': program_id, 'name': program_name},
+        'institution': {'id': institution_id, 'name': institution_name, 'code': institution_code},
+        'rank': rank,
+    }
+
+
+HIT_FIELDS = (
+    'unit__id', 'unit__code', 'unit__name', 'unit__course__id', 'unit__course__title',
+    'unit__course__program__id', 'unit__course__program__name',
+    'unit__course__program__institution__id', 'unit__course__program__institution__name',
+    'unit__course__program__institution__code',
+)
+
+
+class PostgresSearchBackend:
+    """
+    Searches the GIN-indexed `UnitSearchDocument` table with `websearch_to_tsquery` and ranks hits with
+    `ts_rank`. Hits and their parents are fetched with a single query.
+    """
+
+    def search(self, q, limit):
+        query = SearchQuery(q, config=search_config(), search_type='websearch')
+        rows = (
+            UnitSearchDocument.objects.filter(document=query)
+            .annotate(rank=SearchRank(F('document'), query))
+            .order_by('-rank', 'unit_id')
+            .values_list('rank', *HIT_FIELDS)[:limit]
+        )
+        return [search_hit(*row) for row in rows]
+
+
+def parse_websearch(q):
+    """
+    Parses a query in the syntax of `websearch_to_tsquery` into its alternatives, split on `or`. Each
+    alternative is the set of terms a hit must contain and the term sets it must not contain, one per
+    `-term` or `-"quoted phrase"`. The words of a quoted phrase are required, but not that they are
+    next to each other.
+    """
+    alternatives, required, excluded = [], set(), []
+    for negated, phrase, word in QUERY_PART_RE.findall(q.lower()):
+        if word == 'or' and not negated:
+            alternatives.append((required, excluded))
+            required, excluded = set(), []
+            continue
+        terms = TOKEN_RE.findall(phrase or word)
+        if not terms:
+            continue
+        if negated:
+            excluded.append(frozenset(terms))
+        else:
+            required.update(terms)
+    alternatives.append((required, excluded))
+    return [(required, excluded) for required, excluded in alternatives if required]
+
+
+class InvertedIndexSearchBackend:
+    """
+    In-process inverted index used when the database is not PostgreSQL. The index is built from the
+    catalog on first use and rebuilt whenever the `CatalogVersion` stamp of the models it covers
+    changes. Queries are parsed like `websearch_to_tsquery` by `parse_websearch`, and hits are ranked
+    by the weighted term frequency times the inverse document frequency of each term. Terms are only
+    lowercased, not stemmed.
+    """
+    catalog_models = (Institution, Program, Course, Unit)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        # The postings and hits of the same build, replaced together so that readers, which do not
+        # take the lock, never combine the postings of one build with the hits of another.
+        self._index = ({}, {})
+
+    def build(self):
+        postings, hits = {}, {}
+        rows = Unit.objects.values_list(
+            'id', 'code', 'name', 'description', 'course__id', 'course__title', 'course__program__id',
+            'course__program__name', 'course__program__institution__id',
+            'course__program__institution__name', 'course__program__institution__code',
+        ).iterator(chunk_size=2000)
+        for unit_id, code, name, description, course_id, title, program_id, program_name, *institution in rows:
+            weights = {}
+            for text, weight in ((f"{code} {name}", UNIT_WEIGHT), (title, PARENT_WEIGHT),
+                                 (program_name, PARENT_WEIGHT), (description, DESCRIPTION_WEIGHT)):
+                for token in TOKEN_RE.findall(text.lower()):
+                    weights[token] = weights.get(token, 0.0) + weight
+            for token, weight in weights.items():
+                postings.setdefault(token, {})[unit_id] = weight
+            hits[unit_id] = (unit_id, code, name, course_id, title, program_id, program_name, *institution)
+        return postings, hits
+
+    def ensure_current(self):
+        stamp = catalog_stamp(get_catalog_state(*self.catalog_models))
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self._index = self.build()
+                    self._stamp = stamp
+
+    def search(self, q, limit):
+        self.ensure_current()
+        postings, hits = self._index
+        total = len(hits)
+        scores = {}
+        for required, excluded in parse_websearch(q):
+            lists = [postings.get(term) for term in required]
+            if not all(lists):
+                continue
+            lists.sort(key=len)
+            excluded = [[postings.get(term, {}) for term in terms] for terms in excluded]
+            for unit_id in lists[0]:
+                if not all(unit_id in other for other in lists[1:]):
+                    continue
+                if any(all(unit_id in p for p in postings) for postings in excluded):
+                    continue
+                score = sum(p[unit_id] * math.log(1 + total / len(p)) for p in lists)
+                scores[unit_id] = max(score, scores.get(unit_id, 0.0))
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [search_hit(score, *hits[unit_id]) for unit_id, score in best]
+
+
+_inverted_index = InvertedIndexSearchBackend()
+
+
+def get_search_backend():
+    if uses_postgres_search():
+        return PostgresSearchBackend()
+    return _inverted_index
@@ -1,9 +1,10 @@
 from rest_framework import serializers
-from .models import Institution, Program, Course, Unit, Fee
+from edu_hub.serializers import SparseFieldsMixin
+from .models import Institution, Program, Course, Unit, Fee, ProgramFeeSummary, CoursePrerequisite
 
 # The `InstitutionSerializer` class is a Django REST framework serializer for the `Institution` model
 # that includes all fields.
-class InstitutionSerializer(serializers.ModelSerializer):
+class InstitutionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Institution
         fields = '__all__'
@@ -11,32 +12,100 @@ class InstitutionSerializer(serializers.ModelSerializer):
 
 # The `ProgramSerializer` class is a Django REST framework serializer for the `Program` model that
 # includes all fields.
-class ProgramSerializer(serializers.ModelSerializer):
+class ProgramSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Program
         fields = '__all__'
+        expandable_fields = {'institution': InstitutionSerializer}
 
 
 # The `CourseSerializer` class is a Django REST framework serializer for the `Course` model with all
 # fields included.
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = '__all__'
+        expandable_fields = {'program': ProgramSerializer}
 
 
 # The `UnitSerializer` class is a Django REST framework serializer for the `Unit` model with all
 # fields included.
-class UnitSerializer(serializers.ModelSerializer):
+class UnitSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Unit
         fields = '__all__'
+        expandable_fields = {'course': CourseSerializer}
 
 
 # The `FeeSerializer` class is a Django REST framework serializer for the `Fee` model with all fields
 # included.
-class FeeSerializer(serializers.ModelSerializer):
+class FeeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Fee
         fields = '__all__'
+        expandable_fields = {'program': ProgramSerializer}
 
+
+# The `CoursePrerequisiteSerializer` class is a Django REST framework serializer for a prerequisite
+# edge. The course comes from the URL, so only the prerequisite is written.
+class CoursePrerequisiteSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CoursePrerequisite
+        fields = ('id', 'course', 'prerequisite')
+        read_only_fields = ('course',)
+
+
+# The `ProgramFeeSummarySerializer` class is a Django REST framework serializer for one currency and
+# fee type of a program's precomputed fee totals.
+class ProgramFeeSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProgramFeeSummary
+        fields = ('fee_type', 'total', 'fee_count')
+
+
+# The tree serializers below render the nested Institution -> Program -> Course -> Unit catalog
+# returned by `CatalogTreeView`. They read the reverse relations that the view prefetches, so they
+# never trigger per-row queries of their own.
+class UnitTreeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Unit
+        fields = ('id', 'code', 'name', 'description')
+
+
+class CourseTreeSerializer(serializers.ModelSerializer):
+    units = UnitTreeSerializer(source='unit_set', many=True, read_only=True)
+
+    class Meta:
+        model = Course
+        fields = ('id', 'title', 'semester', 'units')
+
+
+class FeeTreeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Fee
+        fields = ('id', 'fee_type', 'amount', 'currency', 'description')
+
+
+# Fees are only included when the view sets `include_fees` in the serializer context, since the
+# view only prefetches them in that case.
+class ProgramTreeSerializer(serializers.ModelSerializer):
+    courses = CourseTreeSerializer(source='course_set', many=True, read_only=True)
+    fees = FeeTreeSerializer(source='fee_set', many=True, read_only=True)
+
+    class Meta:
+        model = Program
+        fields = ('id', 'name', 'duration_years', 'courses', 'fees')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self.context.get('include_fees'):
+            fields.pop('fees')
+        return fields
+
+
+class InstitutionTreeSerializer(serializers.ModelSerializer):
+    programs = ProgramTreeSerializer(source='program_set', many=True, read_only=True)
+
+    class Meta:
+        model = Institution
+        fields = ('id', 'name', 'code', 'website', 'programs')
@@ -0,0 +1,208 @@
+from django.db.models.deletion import Collector
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+
+from .autocomplete import autocomplete_index
+from .catalog import CATALOG_MODELS, bump_catalog_version
+from .changes import record_changes
+from .fees import remember_fee, fee_saved, fee_deleted, rebuild_fee_summaries
+from .models import Program, Course, Unit, Fee, CoursePrerequisite
+from .prerequisites import (
+    prerequisite_added, prerequisite_removed, remember_dependents, course_removed, remaining_dependents,
+    courses_removed,
+)
+from .search import refresh_search_documents
+from .statistics import (
+    refresh_program_statistics, course_program_ids, deleted_directly, remember_program, course_changed,
+    unit_changed, unit_deleted,
+)
+
+
+class BatchDelete:
+    """
+    The `origin` of the deletions made by `catalog_bulk_delete`. The delete handlers below skip the
+    rows it deletes, including the ones deleted by cascade, whose work is done once per model instead.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+
+def batch_deleted(origin):
+    return isinstance(origin, BatchDelete)
+
+
+def catalog_changed(sender, **kwargs):
+    """
+    Signal handler run after any catalog row is saved or deleted.
+    """
+    if batch_deleted(kwargs.get('origin')):
+        return
+    bump_catalog_version(sender)
+    autocomplete_index.invalidate()
+
+
+def catalog_saved(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk])
+
+
+def catalog_deleted(sender, instance, origin=None, **kwargs):
+    if not batch_deleted(origin):
+        record_changes(sender, [instance.pk], deleted=True)
+
+
+def catalog_bulk_changed(model, pks=(), previous=(), deleted=False):
+    """
+    Does the work of the handlers below for rows of `model` written with `bulk_create` or
+    `bulk_update`, which do not send signals, or deleted by `catalog_bulk_delete`. `pks` are the
+    primary keys of the rows written and `previous` holds copies of updated or deleted rows as they
+    were before the write.
+    """
+    bump_catalog_version(model)
+    autocomplete_index.invalidate()
+    record_changes(model, pks, deleted=deleted)
+    # The search documents of deleted rows' units were deleted with them.
+    if model is Unit:
+        if not deleted:
+            refresh_search_documents(unit_ids=pks)
+        program_ids = set(Unit.objects.filter(pk__in=pks).values_list('course__program_id', flat=True))
+        refresh_program_statistics(program_ids | course_program_ids(unit.course_id for unit in previous))
+    elif model is Course:
+        if not deleted:
+            refresh_search_documents(course_ids=pks)
+        refresh_program_statistics(course_program_ids(pks) | {course.program_id for course in previous})
+    elif model is Program:
+        if not deleted:
+            refresh_search_documents(program_ids=pks)
+        refresh_program_statistics(pks)
+    elif model is Fee:
+        program_ids = set(Fee.objects.filter(pk__in=pks).values_list('program_id', flat=True))
+        rebuild_fee_summaries(program_ids | {fee.program_id for fee in previous})
+
+
+def catalog_bulk_delete(queryset):
+    """
+    Deletes the rows of `queryset` and the rows depending on them like `queryset.delete()`, but does
+    the work of the delete handlers below once per catalog model with `catalog_bulk_changed` instead
+    of once per row. Returns the number of rows deleted.
+    """
+    collector = Collector(using=queryset.db, origin=BatchDelete(queryset.model))
+    collector.collect(queryset)
+    # Deleting sets the primary keys of the collected instances to None.
+    deleted = {
+        model: ([obj.pk for obj in instances], list(instances))
+        for model, instances in collector.data.items() if model in CATALOG_MODELS
+    }
+    dependents = remaining_dependents(deleted[Course][0]) if Course in deleted else set()
+    count, _ = collector.delete()
+    courses_removed(dependents)
+    for model, (pks, previous) in deleted.items():
+        catalog_bulk_changed(model, pks, previous=previous, deleted=True)
+    return count
+
+
+def unit_saved(sender, instance, **kwargs):
+    refresh_search_documents(unit_ids=[instance.pk])
+
+
+# A new course or program has no units yet, so only updates need their units' documents rebuilt.
+def course_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(course_ids=[instance.pk])
+
+
+def program_saved(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(program_ids=[instance.pk])
+
+
+def program_statistics_saved(sender, instance, **kwargs):
+    refresh_program_statistics([instance.pk])
+
+
+def course_statistics_pre_save(sender, instance, **kwargs):
+    remember_program(instance, 'program')
+
+
+def course_statistics_saved(sender, instance, **kwargs):
+    course_changed(instance)
+
+
+def course_statistics_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(sender, origin) and not batch_deleted(origin):
+        refresh_program_statistics([instance.program_id])
+
+
+def unit_statistics_pre_save(sender, instance, **kwargs):
+    remember_program(instance, 'course')
+
+
+def unit_statistics_saved(sender, instance, **kwargs):
+    unit_changed(instance)
+
+
+def unit_statistics_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(sender, origin) and not batch_deleted(origin):
+        unit_deleted(instance, origin)
+
+
+def fee_pre_save(sender, instance, **kwargs):
+    remember_fee(instance)
+
+
+def fee_post_save(sender, instance, **kwargs):
+    fee_saved(instance)
+
+
+def fee_post_delete(sender, instance, origin=None, **kwargs):
+    if not batch_deleted(origin):
+        fee_deleted(instance)
+
+
+# Prerequisite edges are only ever added or deleted. A cascade from a deleted course is left to the
+# course handlers, which rebuild the closure of every course that needed it at once.
+def prerequisite_saved(sender, instance, created, **kwargs):
+    if created:
+        prerequisite_added(instance)
+
+
+def prerequisite_deleted(sender, instance, origin=None, **kwargs):
+    if deleted_directly(sender, origin) and not batch_deleted(origin):
+        prerequisite_removed(instance)
+
+
+def course_prerequisites_pre_delete(sender, instance, origin=None, **kwargs):
+    if not batch_deleted(origin):
+        remember_dependents(instance)
+
+
+def course_prerequisites_deleted(sender, instance, origin=None, **kwargs):
+    if not batch_deleted(origin):
+        course_removed(instance)
+
+
+for model in CATALOG_MODELS:
+    post_save.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_saved_{model.__name__}')
+    post_delete.connect(catalog_changed, sender=model, dispatch_uid=f'catalog_deleted_{model.__name__}')
+    post_save.connect(catalog_saved, sender=model, dispatch_uid=f'changes_saved_{model.__name__}')
+    post_delete.connect(catalog_deleted, sender=model, dispatch_uid=f'changes_deleted_{model.__name__}')
+
+post_save.connect(unit_saved, sender=Unit, dispatch_uid='search_unit_saved')
+post_save.connect(course_saved, sender=Course, dispatch_uid='search_course_saved')
+post_save.connect(program_saved, sender=Program, dispatch_uid='search_program_saved')
+
+pre_save.connect(fee_pre_save, sender=Fee, dispatch_uid='fee_summary_pre_save')
+post_save.connect(fee_post_save, sender=Fee, dispatch_uid='fee_summary_saved')
+post_delete.connect(fee_post_delete, sender=Fee, dispatch_uid='fee_summary_deleted')
+
+post_save.connect(program_statistics_saved, sender=Program, dispatch_uid='statistics_program_saved')
+pre_save.connect(course_statistics_pre_save, sender=Course, dispatch_uid='statistics_course_pre_save')
+post_save.connect(course_statistics_saved, sender=Course, dispatch_uid='statistics_course_saved')
+post_delete.connect(course_statistics_deleted, sender=Course, dispatch_uid='statistics_course_deleted')
+pre_save.connect(unit_statistics_pre_save, sender=Unit, dispatch_uid='statistics_unit_pre_save')
+post_save.connect(unit_statistics_saved, sender=Unit, dispatch_uid='statistics_unit_saved')
+post_delete.connect(unit_statistics_deleted, sender=Unit, dispatch_uid='statistics_unit_deleted')
+
+post_save.connect(prerequisite_saved, sender=CoursePrerequisite, dispatch_uid='prerequisite_saved')
+post_delete.connect(prerequisite_deleted, sender=CoursePrerequisite, dispatch_uid='prerequisite_deleted')
+pre_delete.connect(course_prerequisites_pre_delete, sender=Course, dispatch_uid='prerequisites_course_pre_delete')
+post_delete.connect(course_prerequisites_deleted, sender=Course, dispatch_uid='prerequisites_course_deleted')
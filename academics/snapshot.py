@@ -0,0 +1,325 @@
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from decimal import Decimal
+
+from django.conf import settings
+
+from .catalog import get_catalog_state, catalog_stamp
+from .export import catalog_snapshot
+from .models import Institution, Program, Course, Unit, Fee
+
+logger = logging.getLogger(__name__)
+
+# A snapshot file starts with a header and a directory of named sections, followed by the sections:
+#
+# - `stamp`: the `catalog_stamp` of the catalog the file was built from.
+# - `stroff`/`strdata`: the string table. String `i` is `strdata[stroff[i]:stroff[i + 1]]` in UTF-8.
+# - `inst`, `prog`, `crs`, `unit`, `fee`: fixed-width little-endian records, one array per model.
+#   Strings are stored as string table ids (-1 for NULL) and fee amounts as integer cents. Children
+#   are stored contiguously per parent, in the order of the tree endpoint, and each parent holds the
+#   start and length of its children's run, so a tree is read without searching.
+# - `<kind>_ids`/`<kind>_pos`: the record ids in ascending order and the position of each record,
+#   for lookups by primary key with a binary search.
+MAGIC = b'EDUCATSN'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sHH')
+SECTION = struct.Struct('<8sQQ')
+
+RECORDS = {
+    # id, name, code, website, programs start, programs count
+    'inst': struct.Struct('<qiiiii'),
+    # id, institution id, name, duration years, courses start, courses count, fees start, fees count
+    'prog': struct.Struct('<qqiiiiii'),
+    # id, program id, title, semester, units start, units count
+    'crs': struct.Struct('<qqiiii'),
+    # id, course id, code, name, description
+    'unit': struct.Struct('<qqiii'),
+    # id, program id, amount in cents, currency, fee type, description
+    'fee': struct.Struct('<qqqiii'),
+}
+
+NULL = -1
+
+
+class SnapshotError(Exception):
+    """
+    Raised when a file is not a catalog snapshot this version of the code can read.
+    """
+
+
+class SnapshotWriter:
+    """
+    Accumulates the sections of a snapshot while the catalog is read, then writes them to a file.
+    """
+
+    def __init__(self):
+        self.string_ids = {}
+        self.string_offsets = array('Q', [0])
+        self.string_data = bytearray()
+        self.sections = {}
+
+    def string(self, value):
+        if value is None:
+            return NULL
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.string_ids)
+            self.string_data += value.encode('utf-8')
+            self.string_offsets.append(len(self.string_data))
+        return string_id
+
+    def add_records(self, kind, records):
+        """
+        Packs `records` (tuples starting with the id and, below institutions, the parent id, in storage
+        order) into the `kind` section and its id index. Returns the run of records of each parent id
+        as a dict of (start, count).
+        """
+        record = RECORDS[kind]
+        data, ids, runs = bytearray(), array('q'), {}
+        for position, values in enumerate(records):
+            data += record.pack(*values)
+            ids.append(values[0])
+            run = runs.get(values[1])
+            runs[values[1]] = (position, 1) if run is None else (run[0], run[1] + 1)
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+        self.sections[kind] = data
+        self.sections[f'{kind}_ids'] = array('q', (ids[i] for i in order)).tobytes()
+        self.sections[f'{kind}_pos'] = array('q', order).tobytes()
+        return runs
+
+    def write(self, path, stamp):
+        """
+        Writes the snapshot next to `path` and moves it into place with `os.replace`, so readers see
+        either the old file or the complete new one.
+        """
+        self.sections['stamp'] = stamp.encode()
+        self.sections['stroff'] = self.string_offsets.tobytes()
+        self.sections['strdata'] = bytes(self.string_data)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        offset = HEADER.size + SECTION.size * len(self.sections)
+        layout = []
+        for name, data in self.sections.items():
+            offset += -offset % 8
+            layout.append((name, offset, data))
+            offset += len(data)
+
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-snapshot-')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(layout)))
+                for name, offset, data in layout:
+                    f.write(SECTION.pack(name.encode(), offset, len(data)))
+                for name, offset, data in layout:
+                    f.write(b'\0' * (offset - f.tell()))
+                    f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def build_snapshot(path, chunk_size=2000):
+    """
+    Compiles the catalog into a snapshot file at `path`, replacing any previous one atomically. The
+    catalog and its version are read in one snapshot transaction (see `academics.export`), so the
+    stamp stored in the file always describes its content. Returns the stamp.
+    """
+    writer = SnapshotWriter()
+    string = writer.string
+    with catalog_snapshot():
+        stamp = catalog_stamp(get_catalog_state())
+
+        units = Unit.objects.order_by('course_id', 'id').values_list('id', 'course_id', 'code', 'name', 'description')
+        unit_runs = writer.add_records('unit', (
+            (pk, course_id, string(code), string(name), string(description))
+            for pk, course_id, code, name, description in units.iterator(chunk_size=chunk_size)
+        ))
+        fees = Fee.objects.order_by('program_id', 'id').values_list(
+            'id', 'program_id', 'amount', 'currency', 'fee_type', 'description'
+        )
+        fee_runs = writer.add_records('fee', (
+            (pk, program_id, int(amount.scaleb(2)), string(currency), string(fee_type), string(description))
+            for pk, program_id, amount, currency, fee_type, description in fees.iterator(chunk_size=chunk_size)
+        ))
+        courses = Course.objects.order_by('program_id', 'semester', 'id').values_list('id', 'program_id', 'title', 'semester')
+        course_runs = writer.add_records('crs', (
+            (pk, program_id, string(title), semester, *unit_runs.get(pk, (0, 0)))
+            for pk, program_id, title, semester in courses.iterator(chunk_size=chunk_size)
+        ))
+        programs = Program.objects.order_by('institution_id', 'id').values_list('id', 'institution_id', 'name', 'duration_years')
+        program_runs = writer.add_records('prog', (
+            (pk, institution_id, string(name), duration, *course_runs.get(pk, (0, 0)), *fee_runs.get(pk, (0, 0)))
+            for pk, institution_id, name, duration in programs.iterator(chunk_size=chunk_size)
+        ))
+        institutions = Institution.objects.order_by('id').values_list('id', 'name', 'code', 'website')
+        writer.add_records('inst', (
+            (pk, string(name), string(code), string(website), *program_runs.get(pk, (0, 0)))
+            for pk, name, code, website in institutions.iterator(chunk_size=chunk_size)
+        ))
+    writer.write(path, stamp)
+    return stamp
+
+
+def money(cents):
+    """
+    Formats an amount in cents like DRF renders a `DecimalField` with two decimal places.
+    """
+    return str(Decimal(cents).scaleb(-2))
+
+
+class CatalogSnapshot:
+    """
+    Read-only view of a snapshot file. The file is memory-mapped, so its pages live in the OS page
+    cache and are shared by every worker process that maps it, and records are decoded only when
+    they are read.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        try:
+            magic, version, count = HEADER.unpack_from(view, 0)
+        except struct.error:
+            raise SnapshotError(f"{path} is too short to be a catalog snapshot")
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise SnapshotError(f"{path} is not a version {FORMAT_VERSION} catalog snapshot")
+        sections = {}
+        for index in range(count):
+            name, offset, length = SECTION.unpack_from(view, HEADER.size + index * SECTION.size)
+            sections[name.rstrip(b'\0').decode()] = view[offset:offset + length]
+        self.stamp = bytes(sections['stamp']).decode()
+        self._string_offsets = sections['stroff'].cast('Q')
+        self._string_data = sections['strdata']
+        self._records = {kind: sections[kind] for kind in RECORDS}
+        self._ids = {kind: sections[f'{kind}_ids'].cast('q') for kind in RECORDS}
+        self._positions = {kind: sections[f'{kind}_pos'].cast('q') for kind in RECORDS}
+
+    def string(self, string_id):
+        if string_id == NULL:
+            return None
+        return str(self._string_data[self._string_offsets[string_id]:self._string_offsets[string_id + 1]], 'utf-8')
+
+    def count(self, kind):
+        return len(self._ids[kind])
+
+    def record(self, kind, position):
+        record = RECORDS[kind]
+        return record.unpack_from(self._records[kind], position * record.size)
+
+    def records(self, kind, start, count):
+        record = RECORDS[kind]
+        return record.iter_unpack(self._records[kind][start * record.size:(start + count) * record.size])
+
+    def find(self, kind, pk):
+        """
+        Returns the raw record of `kind` with primary key `pk`, or None.
+        """
+        ids = self._ids[kind]
+        index = bisect_left(ids, pk)
+        if index == len(ids) or ids[index] != pk:
+            return None
+        return self.record(kind, self._positions[kind][index])
+
+    # Tree reads. The dicts match `InstitutionTreeSerializer` and the orderings of `CatalogTreeView`.
+
+    def unit_data(self, record):
+        pk, _, code, name, description = record
+        return {'id': pk, 'code': self.string(code), 'name': self.string(name), 'description': self.string(description)}
+
+    def course_data(self, record):
+        pk, _, title, semester, units_start, units_count = record
+        return {
+            'id': pk, 'title': self.string(title), 'semester': semester,
+            'units': [self.unit_data(unit) for unit in self.records('unit', units_start, units_count)],
+        }
+
+    def fee_data(self, record):
+        pk, _, cents, currency, fee_type, description = record
+        return {
+            'id': pk, 'fee_type': self.string(fee_type), 'amount': money(cents),
+            'currency': self.string(currency), 'description': self.string(description),
+        }
+
+    def program_data(self, record, include_fees):
+        pk, _, name, duration, courses_start, courses_count, fees_start, fees_count = record
+        data = {
+            'id': pk, 'name': self.string(name), 'duration_years': duration,
+            'courses': [self.course_data(course) for course in self.records('crs', courses_start, courses_count)],
+        }
+        if include_fees:
+            data['fees'] = [self.fee_data(fee) for fee in self.records('fee', fees_start, fees_count)]
+        return data
+
+    def institution_data(self, record, programs):
+        pk, name, code, website, _, _ = record
+        return {
+            'id': pk, 'name': self.string(name), 'code': self.string(code), 'website': self.string(website),
+            'programs': programs,
+        }
+
+    def tree(self, institution_id=None, program_id=None, include_fees=False):
+        """
+        Returns the nested catalog, optionally limited to one institution and/or one program, as
+        `CatalogTreeView` renders it.
+        """
+        if program_id is not None:
+            program = self.find('prog', program_id)
+            if program is None or (institution_id is not None and program[1] != institution_id):
+                return []
+            institution = self.find('inst', program[1])
+            return [self.institution_data(institution, [self.program_data(program, include_fees)])]
+        if institution_id is not None:
+            institution = self.find('inst', institution_id)
+            institutions = [] if institution is None else [institution]
+        else:
+            institutions = self.records('inst', 0, self.count('inst'))
+        return [
+            self.institution_data(institution, [
+                self.program_data(program, include_fees) for program in self.records('prog', *institution[4:6])
+            ])
+            for institution in institutions
+        ]
+
+
+_lock = threading.Lock()
+_loaded = None
+
+
+def load_snapshot(path=None):
+    """
+    Returns the `CatalogSnapshot` at `path` (by default the `CATALOG_SNAPSHOT_PATH` setting), or None
+    when no snapshot is configured or it cannot be read. The mapped file is kept per process and
+    mapped again only when the file at `path` is replaced, which costs one `stat` per call.
+    """
+    global _loaded
+    path = path or getattr(settings, 'CATALOG_SNAPSHOT_PATH', '')
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (str(path), stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    loaded = _loaded
+    if loaded is None or loaded[0] != key:
+        with _lock:
+            if _loaded is None or _loaded[0] != key:
+                try:
+                    _loaded = (key, CatalogSnapshot(path))
+                except (OSError, SnapshotError, KeyError) as e:
+                    logger.warning("Cannot load catalog snapshot %s: %s", path, e)
+                    return None
+            loaded = _loaded
+    return loaded[1]
@@ -0,0 +1,91 @@
+from django.db.models import Count, QuerySet
+from django.utils import timezone
+
+from .models import Program, Course, Unit, ProgramStatistics
+
+
+def normalize_program_name(name):
+    """
+    Returns the key programs are compared by: the name casefolded with runs of whitespace collapsed,
+    so that "Computer Science" and "computer  science" are treated as the same program.
+    """
+    return ' '.join(name.casefold().split())
+
+
+def refresh_program_statistics(program_ids):
+    """
+    Recomputes the `ProgramStatistics` rows of the given programs with one count query per level and a
+    single upsert. Ids of programs that no longer exist are ignored.
+    """
+    program_ids = set(program_ids)
+    program_ids.discard(None)
+    if not program_ids:
+        return
+    names = Program.objects.filter(pk__in=program_ids).values_list('id', 'name')
+    courses = dict(
+        Course.objects.filter(program_id__in=program_ids)
+        .values_list('program_id').annotate(count=Count('id')).order_by()
+    )
+    units = dict(
+        Unit.objects.filter(course__program_id__in=program_ids)
+        .values_list('course__program_id').annotate(count=Count('id')).order_by()
+    )
+    now = timezone.now()
+    rows = [
+        ProgramStatistics(
+            program_id=pk, name_key=normalize_program_name(name), course_count=courses.get(pk, 0),
+            unit_count=units.get(pk, 0), updated_at=now,
+        )
+        for pk, name in names
+    ]
+    ProgramStatistics.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['program'],
+        update_fields=['name_key', 'course_count', 'unit_count', 'updated_at'],
+    )
+
+
+def course_program_ids(course_ids):
+    course_ids = set(course_ids)
+    if not course_ids:
+        return set()
+    return set(Course.objects.filter(pk__in=course_ids).values_list('program_id', flat=True))
+
+
+def deleted_directly(sender, origin):
+    """
+    Tells whether a `post_delete` for `sender` comes from deleting `sender` rows themselves rather than
+    from a cascade. Cascades are left to the handler of the parent that was deleted, which refreshes its
+    program once instead of once per child.
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is sender
+
+
+def remember_program(instance, parent):
+    """
+    Stores the program a course or unit belonged to before it is updated, so that moving it to another
+    program refreshes both.
+    """
+    instance._statistics_program = None
+    if instance.pk is not None:
+        lookup = 'program_id' if parent == 'program' else 'course__program_id'
+        instance._statistics_program = type(instance).objects.filter(pk=instance.pk).values_list(lookup, flat=True).first()
+
+
+def course_changed(instance):
+    refresh_program_statistics({instance.program_id, getattr(instance, '_statistics_program', None)})
+
+
+def unit_changed(instance):
+    program_ids = course_program_ids([instance.course_id])
+    program_ids.add(getattr(instance, '_statistics_program', None))
+    refresh_program_statistics(program_ids)
+
+
+def unit_deleted(instance, origin):
+    # A queryset delete sends one signal per unit after all of them are gone, so each program only
+    # needs refreshing once per delete.
+    refreshed = origin.__dict__.setdefault('_statistics_refreshed', set())
+    if instance.course_id not in refreshed:
+        refreshed.add(instance.course_id)
+        refresh_program_statistics(course_program_ids([instance.course_id]))
@@ -1,6 +1,35 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+import random
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command, CommandError
 from django.test import TestCase
-from django.db import IntegrityError, DataError
-from academics.models import Institution, Program
+from django.test.utils import CaptureQueriesContext
+from django.db import IntegrityError, DataError, connection
+from django.urls import reverse
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from academics.models import (
+    Institution, Program, Course, Unit, Fee, CoursePrerequisite, CoursePrerequisiteClosure, CatalogChange, ProgramStatistics,
+)
+from academics.autocomplete import autocomplete_index
+from academics.catalog import bump_catalog_version, get_catalog_state, catalog_stamp
+from academics.prerequisites import add_prerequisite, requires
+from academics.search import InvertedIndexSearchBackend
+from academics.snapshot import load_snapshot
+from academics.serializers import UnitSerializer, InstitutionTreeSerializer
+from academics.views import UnitViewSet, CourseViewSet, FeeViewSet, catalog_bundle_file
+from edu_hub.pagination import EstimatedCountPaginator
+from edu_hub.serializers import RowSerializer
+from edu_hub.testing import QueryPlanAssertionsMixin
 from django.core.exceptions import ValidationError
 # Create your tests here.
 
@@ -235,4 +264,1181 @@ class ProgramModelTest(TestCase):
             program.full_clean()
 
 
-   
\ No newline at end of file
+def create_catalog(institutions=1, programs=2, courses=2, units=2, prefix="INST"):
+    """
+    Creates a small nested catalog with fees and returns the created institutions.
+    """
+    created = []
+    for i in range(institutions):
+        institution = Institution.objects.create(name=f"{prefix} {i}", code=f"{prefix}{i}")
+        for p in range(programs):
+            program = Program.objects.create(institution=institution, name=f"Program {p}", duration_years=4)
+            Fee.objects.create(program=program, amount="1500.00", fee_type="Tuition")
+            for c in range(courses):
+                course = Course.objects.create(program=program, title=f"Course {c}", semester=c + 1)
+                for u in range(units):
+                    Unit.objects.create(course=course, code=f"U{p}{c}{u}", name=f"Unit {u}")
+        created.append(institution)
+    return created
+
+
+class CatalogTreeViewTest(TestCase):
+    def test_tree_is_nested_down_to_units(self):
+        """
+        The function tests that the tree endpoint nests programs, courses and units under each
+        institution and leaves fees out unless asked for.
+        """
+        create_catalog()
+        response = self.client.get(reverse('catalog-tree'))
+        self.assertEqual(response.status_code, 200)
+        institution = response.json()[0]
+        self.assertEqual(len(institution['programs']), 2)
+        program = institution['programs'][0]
+        self.assertNotIn('fees', program)
+        self.assertEqual(len(program['courses']), 2)
+        self.assertEqual(len(program['courses'][0]['units']), 2)
+
+    def test_tree_query_count_is_constant(self):
+        """
+        The function tests that the number of queries issued by the tree endpoint does not grow with
+        the size of the catalog.
+        """
+        create_catalog(institutions=1, prefix="SMALL")
+        with self.assertNumQueries(6):
+            self.client.get(reverse('catalog-tree'), {'include_fees': 'true'})
+        create_catalog(institutions=5, programs=3, courses=3, units=3, prefix="LARGE")
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('catalog-tree'), {'include_fees': 'true'})
+        self.assertEqual(len(response.json()), 6)
+        self.assertEqual(response.json()[0]['programs'][0]['fees'][0]['amount'], '1500.00')
+
+    def test_tree_filters_by_institution_and_program(self):
+        """
+        The function tests filtering the tree down to a single institution or a single program.
+        """
+        first, second = create_catalog(institutions=2)
+        response = self.client.get(reverse('catalog-tree'), {'institution': second.pk})
+        self.assertEqual([i['id'] for i in response.json()], [second.pk])
+
+        program = first.program_set.order_by('id').last()
+        response = self.client.get(reverse('catalog-tree'), {'program': program.pk})
+        self.assertEqual([i['id'] for i in response.json()], [first.pk])
+        self.assertEqual([p['id'] for p in response.json()[0]['programs']], [program.pk])
+
+    def test_tree_rejects_invalid_filter(self):
+        """
+        The function tests that a non-numeric filter value is rejected with a 400 response.
+        """
+        response = self.client.get(reverse('catalog-tree'), {'institution': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class KeysetPaginationTest(TestCase):
+    def test_list_pages_follow_primary_key_without_count(self):
+        """
+        The function tests that list endpoints page through rows by primary key and that following the
+        `next` link never repeats or skips a row.
+        """
+        institutions = [Institution.objects.create(name=f"Paged {i}", code=f"PG{i}") for i in range(5)]
+        url = reverse('institution-list')
+        seen = []
+        response = self.client.get(url, {'page_size': 2})
+        self.assertNotIn('count', response.json())
+        while True:
+            body = response.json()
+            seen.extend(row['id'] for row in body['results'])
+            if not body['next']:
+                break
+            response = self.client.get(body['next'])
+        self.assertEqual(seen, [i.pk for i in institutions])
+
+    def test_deep_page_query_count_matches_first_page(self):
+        """
+        The function tests that fetching a later page issues the same number of queries as the first.
+        """
+        for i in range(6):
+            Institution.objects.create(name=f"Deep {i}", code=f"DP{i}")
+        url = reverse('institution-list')
+        with self.assertNumQueries(2):
+            first = self.client.get(url, {'page_size': 2}).json()
+        with self.assertNumQueries(2):
+            self.client.get(first['next'])
+
+
+class CatalogConditionalRequestTest(TestCase):
+    def test_matching_etag_returns_not_modified_without_catalog_queries(self):
+        """
+        The function tests that repeating a request with the returned ETag gets a 304 response after
+        only the version lookup.
+        """
+        create_catalog()
+        url = reverse('unit-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_changes_only_for_the_modified_model(self):
+        """
+        The function tests that saving a unit changes the ETag of unit responses while institution
+        responses keep theirs.
+        """
+        create_catalog()
+        unit_etag = self.client.get(reverse('unit-list'))['ETag']
+        institution_etag = self.client.get(reverse('institution-list'))['ETag']
+        tree_etag = self.client.get(reverse('catalog-tree'))['ETag']
+
+        unit = Unit.objects.first()
+        unit.name = "Renamed"
+        unit.save()
+
+        self.assertNotEqual(self.client.get(reverse('unit-list'))['ETag'], unit_etag)
+        self.assertNotEqual(self.client.get(reverse('catalog-tree'))['ETag'], tree_etag)
+        self.assertEqual(self.client.get(reverse('institution-list'))['ETag'], institution_etag)
+
+        response = self.client.get(reverse('unit-detail', args=[unit.pk]), HTTP_IF_NONE_MATCH=unit_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['name'], "Renamed")
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        create_catalog()
+
+    def test_repeated_reads_are_served_from_cache(self):
+        """
+        The function tests that a repeated list request only reads the version table and returns the
+        same body as the first request.
+        """
+        url = reverse('unit-list')
+        first = self.client.get(url, {'page_size': 3})
+        with self.assertNumQueries(1):
+            second = self.client.get(url, {'page_size': 3})
+        self.assertEqual(first.json(), second.json())
+        with self.assertNumQueries(2):
+            self.client.get(url, {'page_size': 4})
+
+    def test_cache_is_invalidated_by_catalog_changes(self):
+        """
+        The function tests that saving or deleting a row makes the next read of that model return
+        fresh data.
+        """
+        course = Course.objects.first()
+        url = reverse('course-detail', args=[course.pk])
+        self.assertEqual(self.client.get(url).json()['title'], course.title)
+        course.title = "Updated Title"
+        course.save()
+        self.assertEqual(self.client.get(url).json()['title'], "Updated Title")
+        course.delete()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class CatalogSearchTest(TestCase):
+    def setUp(self):
+        institution = Institution.objects.create(name="Search University", code="SU001")
+        self.program = Program.objects.create(institution=institution, name="Computer Science", duration_years=4)
+        course = Course.objects.create(program=self.program, title="Databases", semester=2)
+        self.by_name = Unit.objects.create(course=course, code="CS201", name="Database Systems")
+        self.by_description = Unit.objects.create(
+            course=course, code="CS202", name="Storage Engines", description="Internals of database storage."
+        )
+        other = Program.objects.create(institution=institution, name="History", duration_years=3)
+        other_course = Course.objects.create(program=other, title="Ancient World", semester=1)
+        Unit.objects.create(course=other_course, code="HI101", name="Rome")
+
+    def assert_ranked_hits(self, results):
+        self.assertEqual([hit['unit']['id'] for hit in results], [self.by_name.pk, self.by_description.pk])
+        self.assertEqual(results[0]['program']['name'], "Computer Science")
+        self.assertEqual(results[0]['institution']['code'], "SU001")
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Uses the PostgreSQL search index.')
+    def test_search_endpoint_ranks_name_matches_first(self):
+        """
+        The function tests that the search endpoint ranks a unit whose name matches above a unit whose
+        description matches, and includes the parent program and institution.
+        """
+        response = self.client.get(reverse('catalog-search'), {'q': 'database'})
+        self.assertEqual(response.status_code, 200)
+        self.assert_ranked_hits(response.json()['results'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Uses the PostgreSQL search index.')
+    def test_search_documents_follow_parent_renames(self):
+        """
+        The function tests that renaming a program updates the search documents of its units.
+        """
+        self.assertEqual(self.client.get(reverse('catalog-search'), {'q': 'informatics'}).json()['results'], [])
+        self.program.name = "Informatics"
+        self.program.save()
+        results = self.client.get(reverse('catalog-search'), {'q': 'informatics'}).json()['results']
+        self.assertEqual(len(results), 2)
+
+    def test_inverted_index_ranks_like_postgres(self):
+        """
+        The function tests the in-process fallback index, including its rebuild after a catalog
+        change.
+        """
+        backend = InvertedIndexSearchBackend()
+        self.assert_ranked_hits(backend.search('database', 10))
+        self.assertEqual(backend.search('database rome', 10), [])
+        Unit.objects.filter(pk=self.by_description.pk).delete()
+        self.assertEqual([hit['unit']['id'] for hit in backend.search('database', 10)], [self.by_name.pk])
+
+    def test_inverted_index_supports_websearch_syntax(self):
+        """
+        The function tests that the in-process fallback index handles `or`, `-term` exclusions and
+        quoted phrases like `websearch_to_tsquery`.
+        """
+        backend = InvertedIndexSearchBackend()
+
+        def ids(q):
+            return sorted(hit['unit']['id'] for hit in backend.search(q, 10))
+
+        rome = Unit.objects.get(code="HI101").pk
+        self.assertEqual(ids('storage or rome'), sorted([self.by_description.pk, rome]))
+        self.assertEqual(ids('database -storage'), [self.by_name.pk])
+        self.assertEqual(ids('database -"storage engines"'), [self.by_name.pk])
+        self.assertEqual(ids('"database systems"'), [self.by_name.pk])
+        self.assertEqual(ids('-database or'), [])
+
+    def test_search_requires_query(self):
+        """
+        The function tests that a search without `q` is rejected.
+        """
+        self.assertEqual(self.client.get(reverse('catalog-search')).status_code, 400)
+
+
+class ImportCatalogCommandTest(TestCase):
+    def write_file(self, suffix, content):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_jsonl_resolves_parents_by_natural_key(self):
+        """
+        The function tests importing a JSON Lines file whose records refer to their parents by code,
+        name and title, and that running the import again creates nothing new.
+        """
+        records = [
+            {"type": "institution", "code": "IMP1", "name": "Import University"},
+            {"type": "program", "institution": "IMP1", "name": "Law", "duration_years": 4},
+            {"type": "course", "institution": "IMP1", "program": "Law", "title": "Torts", "semester": 1},
+            {"type": "fee", "institution": "IMP1", "program": "Law", "fee_type": "Tuition", "amount": "1200.50"},
+        ] + [
+            {"type": "unit", "institution": "IMP1", "program": "Law", "course": "Torts", "code": f"LAW{i}", "name": f"Unit {i}"}
+            for i in range(7)
+        ]
+        path = self.write_file('.jsonl', '\n'.join(json.dumps(r) for r in records))
+        out = StringIO()
+        call_command('import_catalog', path, '--batch-size', '3', stdout=out)
+        self.assertIn('rows/sec', out.getvalue())
+
+        course = Course.objects.get(title="Torts", program__institution__code="IMP1")
+        self.assertEqual(course.unit_set.count(), 7)
+        self.assertEqual(str(Fee.objects.get(program=course.program).amount), "1200.50")
+
+        call_command('import_catalog', path, stdout=StringIO())
+        self.assertEqual(Unit.objects.filter(course=course).count(), 7)
+        self.assertEqual(Program.objects.filter(name="Law").count(), 1)
+
+    def test_import_csv_uses_existing_parents(self):
+        """
+        The function tests importing units from CSV into a course that already exists in the database.
+        """
+        create_catalog(institutions=1, programs=1, courses=1, units=0, prefix="CSV")
+        path = self.write_file('.csv', (
+            "type,institution,program,course,code,name,description\n"
+            "unit,CSV0,Program 0,Course 0,NEW1,New Unit,Imported from CSV\n"
+        ))
+        call_command('import_catalog', path, stdout=StringIO())
+        unit = Unit.objects.get(code="NEW1")
+        self.assertEqual(unit.course.title, "Course 0")
+        self.assertEqual(unit.description, "Imported from CSV")
+
+    def test_import_reports_unknown_parent(self):
+        """
+        The function tests that a record referring to a missing parent stops the import with its
+        record number.
+        """
+        path = self.write_file('.jsonl', json.dumps({"type": "program", "institution": "NOPE", "name": "X", "duration_years": 1}))
+        with self.assertRaisesMessage(CommandError, "Record 1: unknown institution 'NOPE'"):
+            call_command('import_catalog', path, stdout=StringIO())
+
+
+class BatchWriteTest(TestCase):
+    def setUp(self):
+        institution = create_catalog(institutions=1, programs=1, courses=1, units=0, prefix="BATCH")[0]
+        self.course = Course.objects.get(program__institution=institution)
+        self.url = reverse('unit-batch')
+
+    def test_batch_create_returns_per_item_results(self):
+        """
+        The function tests creating several units in one request and that each item gets its result.
+        """
+        items = [{'course': self.course.pk, 'code': f'B{i}', 'name': f'Batch {i}'} for i in range(3)]
+        response = self.client.post(self.url, items, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        results = response.json()['results']
+        self.assertEqual([r['index'] for r in results], [0, 1, 2])
+        self.assertEqual([r['data']['code'] for r in results], ['B0', 'B1', 'B2'])
+        self.assertEqual(self.course.unit_set.count(), 3)
+
+    def test_batch_create_is_all_or_nothing(self):
+        """
+        The function tests that one invalid item rejects the whole batch with per-item errors.
+        """
+        items = [{'course': self.course.pk, 'code': 'OK1', 'name': 'Valid'}, {'course': self.course.pk, 'code': 'BAD'}]
+        response = self.client.post(self.url, items, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn('name', errors[1])
+        self.assertFalse(Unit.objects.filter(code='OK1').exists())
+
+    def test_batch_create_rejects_repeated_unique_values(self):
+        """
+        The function tests that items repeating a unique value of another item of the batch are
+        rejected with a 400 and per-item errors instead of failing in the database.
+        """
+        items = [{'name': 'First', 'code': 'DUP'}, {'name': 'Second', 'code': 'UNIQUE'}, {'name': 'Third', 'code': 'DUP'}]
+        response = self.client.post(reverse('institution-batch'), items, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertEqual(errors[:2], [{}, {}])
+        self.assertIn('code', errors[2])
+        self.assertFalse(Institution.objects.filter(code__in=['DUP', 'UNIQUE']).exists())
+
+    def test_batch_update_and_delete(self):
+        """
+        The function tests updating and then deleting units in batches.
+        """
+        units = [Unit.objects.create(course=self.course, code=f'U{i}', name=f'Unit {i}') for i in range(3)]
+        items = [{'id': unit.pk, 'name': f'Renamed {unit.pk}'} for unit in units[:2]]
+        response = self.client.patch(self.url, items, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Unit.objects.get(pk=units[0].pk).name, f'Renamed {units[0].pk}')
+        self.assertEqual(Unit.objects.get(pk=units[2].pk).name, 'Unit 2')
+
+        response = self.client.patch(self.url, [{'id': 0, 'name': 'Missing'}], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.delete(self.url, {'ids': [units[0].pk, 0]}, content_type='application/json')
+        self.assertEqual([r['status'] for r in response.json()['results']], ['deleted', 'not_found'])
+        self.assertFalse(Unit.objects.filter(pk=units[0].pk).exists())
+
+    def test_batch_delete_does_the_handlers_work_once_per_model(self):
+        """
+        The function tests that a batch delete takes the same number of queries however many rows it
+        deletes, and still logs the rows deleted by cascade, refreshes the program statistics and
+        rebuilds the prerequisites of the remaining courses.
+        """
+        program = self.course.program
+        courses = [Course.objects.create(program=program, title=f'Batch course {i}', semester=1) for i in range(6)]
+        for course in courses:
+            Unit.objects.bulk_create(Unit(course=course, code=f'D{course.pk}-{i}', name='Doomed') for i in range(2))
+        add_prerequisite(self.course.pk, courses[0].pk)
+        add_prerequisite(courses[0].pk, courses[1].pk)
+        url, token = reverse('course-batch'), CatalogChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+        def delete(deleted):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.delete(url, {'ids': [c.pk for c in deleted]}, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            return len(queries)
+
+        self.assertEqual(delete(courses[2:3]), delete(courses[3:6]))
+        tombstones = set(CatalogChange.objects.filter(id__gt=token, deleted=True).values_list('model', 'object_id'))
+        self.assertEqual(len(tombstones), 4 * 3)
+        self.assertEqual(sum(model == 'unit' for model, _ in tombstones), 8)
+        self.assertEqual(ProgramStatistics.objects.get(program=program).course_count, 3)
+
+        self.assertTrue(requires(self.course.pk, courses[1].pk))
+        delete(courses[:1])
+        self.assertFalse(requires(self.course.pk, courses[1].pk))
+
+    def test_batch_writes_invalidate_cached_reads(self):
+        """
+        The function tests that batch writes, which bypass model signals, still invalidate cached
+        list responses.
+        """
+        list_url = reverse('unit-list')
+        self.assertEqual(self.client.get(list_url).json()['results'], [])
+        self.client.post(self.url, [{'course': self.course.pk, 'code': 'C1', 'name': 'Cached'}], content_type='application/json')
+        self.assertEqual(len(self.client.get(list_url).json()['results']), 1)
+
+
+class ProgramFeeSummaryTest(TestCase):
+    def setUp(self):
+        institution = Institution.objects.create(name="Fee University", code="FEE1")
+        self.program = Program.objects.create(institution=institution, name="Medicine", duration_years=5)
+        self.other = Program.objects.create(institution=institution, name="Nursing", duration_years=4)
+
+    def cost(self, program):
+        return self.client.get(reverse('program-cost', args=[program.pk])).json()
+
+    def test_summary_follows_fee_changes(self):
+        """
+        The function tests that the program cost is kept up to date as fees are created, updated,
+        moved between programs and deleted.
+        """
+        tuition = Fee.objects.create(program=self.program, amount="1000.00", fee_type="Tuition")
+        Fee.objects.create(program=self.program, amount="250.50", fee_type="Library")
+        Fee.objects.create(program=self.program, amount="40.00", fee_type="Tuition", currency="USD")
+
+        cost = self.cost(self.program)
+        ksh, usd = cost['currencies']
+        self.assertEqual((ksh['currency'], ksh['total'], ksh['estimated_total']), ('KSH', '1250.50', '6252.50'))
+        self.assertEqual([f['fee_type'] for f in ksh['fee_types']], ['Library', 'Tuition'])
+        self.assertEqual(usd['total'], '40.00')
+
+        tuition.amount = "1500.00"
+        tuition.save()
+        self.assertEqual(self.cost(self.program)['currencies'][0]['total'], '1750.50')
+
+        tuition.program = self.other
+        tuition.save()
+        self.assertEqual(self.cost(self.program)['currencies'][0]['total'], '250.50')
+        self.assertEqual(self.cost(self.other)['currencies'][0]['total'], '1500.00')
+
+        tuition.delete()
+        self.assertEqual(self.cost(self.other)['currencies'], [])
+
+    def test_cost_is_a_single_lookup(self):
+        """
+        The function tests that the cost endpoint reads the program and its summary rows only.
+        """
+        for i in range(5):
+            Fee.objects.create(program=self.program, amount="100.00", fee_type=f"Fee {i}")
+        with self.assertNumQueries(2):
+            cost = self.cost(self.program)
+        self.assertEqual(cost['currencies'][0]['total'], '500.00')
+
+    def test_fee_endpoint_batch_writes_rebuild_summaries(self):
+        """
+        The function tests that fees written through the batch endpoint are reflected in the summary.
+        """
+        items = [{'program': self.program.pk, 'amount': '300.00', 'fee_type': 'Exam'} for _ in range(2)]
+        response = self.client.post(reverse('fee-batch'), items, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.cost(self.program)['currencies'][0]['fee_types'][0]['fee_count'], 2)
+
+        fee_id = response.json()['results'][0]['id']
+        self.client.patch(reverse('fee-batch'), [{'id': fee_id, 'program': self.other.pk}], content_type='application/json')
+        self.assertEqual(self.cost(self.program)['currencies'][0]['total'], '300.00')
+        self.assertEqual(self.cost(self.other)['currencies'][0]['total'], '300.00')
+
+
+class ProgramComparisonTest(TestCase):
+    def setUp(self):
+        self.programs = []
+        for i, (duration, fee) in enumerate([(4, "90000.00"), (3, "120000.00"), (5, None)]):
+            institution = Institution.objects.create(name=f"Compare University {i}", code=f"CMP{i}")
+            program = Program.objects.create(institution=institution, name="Computer  Science", duration_years=duration)
+            if fee:
+                Fee.objects.create(program=program, amount=fee, fee_type="Tuition")
+            self.programs.append(program)
+        Program.objects.create(institution=institution, name="Law", duration_years=4)
+
+    def compare(self, **params):
+        response = self.client.get(reverse('program-compare'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['results']
+
+    def test_statistics_follow_catalog_changes(self):
+        """
+        The function tests that course and unit counts are refreshed as courses and units are added,
+        moved and deleted.
+        """
+        first, second, _ = self.programs
+        course = Course.objects.create(program=first, title="Algorithms", semester=1)
+        Unit.objects.create(course=course, code="ALG1", name="Sorting")
+        Unit.objects.create(course=course, code="ALG2", name="Graphs")
+        self.assertEqual((first.statistics.course_count, first.statistics.unit_count), (1, 2))
+
+        course.program = second
+        course.save()
+        first.statistics.refresh_from_db()
+        second.statistics.refresh_from_db()
+        self.assertEqual((first.statistics.course_count, first.statistics.unit_count), (0, 0))
+        self.assertEqual((second.statistics.course_count, second.statistics.unit_count), (1, 2))
+
+        Unit.objects.filter(code="ALG1").delete()
+        second.statistics.refresh_from_db()
+        self.assertEqual(second.statistics.unit_count, 1)
+
+        course.delete()
+        second.statistics.refresh_from_db()
+        self.assertEqual((second.statistics.course_count, second.statistics.unit_count), (0, 0))
+
+    def test_compare_ranks_programs_with_one_query(self):
+        """
+        The function tests that programs with the same name are ranked by the requested metric, that
+        programs without fees come last, and that the comparison takes a single query.
+        """
+        with self.assertNumQueries(1):
+            results = self.compare(name="computer science")
+        self.assertEqual([r['program']['id'] for r in results], [p.pk for p in self.programs])
+        self.assertEqual((results[0]['total_fees'], results[0]['estimated_total']), ('90000.00', '360000.00'))
+        self.assertIsNone(results[2]['total_fees'])
+
+        results = self.compare(name="Computer Science", order="-duration")
+        self.assertEqual([r['duration_years'] for r in results], [5, 4, 3])
+
+    def test_compare_validates_parameters(self):
+        """
+        The function tests that a missing name or an unknown ordering is rejected.
+        """
+        self.assertEqual(self.client.get(reverse('program-compare')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('program-compare'), {'name': 'Law', 'order': 'rank'}).status_code, 400)
+
+
+class SparseFieldsetTest(TestCase):
+    def setUp(self):
+        create_catalog(institutions=1, programs=1, courses=2, units=3)
+
+    def test_fields_narrow_the_response_and_the_select(self):
+        """
+        The function tests that `?fields=` limits both the serialized fields and the selected columns.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('unit-list'), {'fields': 'id,code'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'code'})
+        sql = queries.captured_queries[-1]['sql']
+        self.assertIn('"code"', sql)
+        self.assertNotIn('"description"', sql)
+
+    def test_expand_nests_the_relation_with_one_query(self):
+        """
+        The function tests that `?expand=` replaces a foreign key with the related object, loaded with
+        a join, and that dotted fields narrow the nested object.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('unit-list'), {'fields': 'code,course.title', 'expand': 'course'})
+        self.assertEqual(len(queries), 2)
+        row = response.json()['results'][0]
+        self.assertEqual(set(row), {'code', 'course'})
+        self.assertEqual(set(row['course']), {'title'})
+
+    def test_expanded_relations_follow_their_changes(self):
+        """
+        The function tests that cached and conditional responses nesting a relation with `?expand=`
+        change when the related object does.
+        """
+        url, params = reverse('unit-list'), {'expand': 'course', 'fields': 'id,course.title'}
+        course = Course.objects.get(pk=Unit.objects.order_by('pk').first().course_id)
+        course.title = "Old"
+        course.save()
+        first = self.client.get(url, params)
+        self.assertEqual(first.json()['results'][0]['course']['title'], "Old")
+        course.title = "New"
+        course.save()
+        second = self.client.get(url, params)
+        self.assertEqual(second.json()['results'][0]['course']['title'], "New")
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_unknown_names_are_rejected(self):
+        """
+        The function tests that unknown fields, unknown relations and dotted fields of relations that
+        are not expanded are rejected.
+        """
+        for params in ({'fields': 'secret'}, {'expand': 'program'}, {'fields': 'course.title'}):
+            self.assertEqual(self.client.get(reverse('unit-list'), params).status_code, 400)
+
+
+class FastListTest(TestCase):
+    def setUp(self):
+        create_catalog(institutions=1, programs=2, courses=2, units=3)
+        for program in Program.objects.all():
+            Fee.objects.create(program=program, amount="1234.50", fee_type="Tuition", description=None)
+
+    def assertSameAsSerializer(self, viewset, url, params):
+        caches['default'].clear()
+        fast = self.client.get(url, params)
+        caches['default'].clear()
+        with mock.patch.object(viewset, 'fast_list', False):
+            regular = self.client.get(url, params)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, regular.content)
+
+    def test_fast_list_matches_the_serializer(self):
+        """
+        The function tests that list responses served from `values_list()` rows are byte for byte the
+        same as the serializer's, including decimals, nulls, sparse fields and the pagination links.
+        """
+        self.assertSameAsSerializer(UnitViewSet, reverse('unit-list'), {'page_size': 5})
+        self.assertSameAsSerializer(FeeViewSet, reverse('fee-list'), {})
+        self.assertSameAsSerializer(CourseViewSet, reverse('course-list'), {'fields': 'title,program'})
+        self.assertSameAsSerializer(UnitViewSet, reverse('unit-list'), {'expand': 'course'})
+
+    def test_row_serializer_skips_unsupported_serializers(self):
+        """
+        The function tests that serializers with nested fields are left to the regular path.
+        """
+        self.assertIsNotNone(RowSerializer.compile(UnitSerializer()))
+        self.assertIsNone(RowSerializer.compile(UnitSerializer(expand={'course'})))
+        self.assertIsNone(RowSerializer.compile(InstitutionTreeSerializer()))
+
+
+class CatalogAdminTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass', student_id='ADMIN1')
+        self.client.force_login(user)
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:academics_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_changelists_use_a_fixed_number_of_queries(self):
+        """
+        The function tests that the catalog changelists take the same number of queries however many
+        rows are on the page, so related objects shown in a row are joined rather than fetched per row.
+        """
+        create_catalog(institutions=1, programs=1, courses=1, units=1, prefix="ADM")
+        small = {model: self.changelist_queries(model) for model in ('program', 'course', 'unit', 'fee')}
+        create_catalog(institutions=2, programs=3, courses=3, units=3, prefix="MORE")
+        large = {model: self.changelist_queries(model) for model in ('program', 'course', 'unit', 'fee')}
+        self.assertEqual(small, large)
+
+    @skipUnless(connection.vendor == 'postgresql', "Row estimates come from PostgreSQL's pg_class")
+    def test_estimated_count_paginator(self):
+        """
+        The function tests that an unfiltered queryset is counted from the planner's estimate while a
+        filtered one is counted exactly.
+        """
+        create_catalog(institutions=1, programs=2, courses=2, units=3)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Unit._meta.db_table}")
+
+        class Paginator(EstimatedCountPaginator):
+            estimate_threshold = 0
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Paginator(Unit.objects.order_by('id'), 5).count, 12)
+        self.assertIn('pg_class', queries[0]['sql'])
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertEqual(Paginator(Unit.objects.filter(code__startswith='U0').order_by('id'), 5).count, 6)
+
+
+@skipUnless(connection.vendor == 'postgresql', "Query plans are checked on PostgreSQL")
+class QueryPlanTest(QueryPlanAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        institutions = Institution.objects.bulk_create(
+            Institution(name=f"Plan University {i}", code=f"PLAN{i}") for i in range(10)
+        )
+        programs = Program.objects.bulk_create(
+            Program(institution=institutions[i % 10], name=f"Program {i}", duration_years=4) for i in range(500)
+        )
+        courses = Course.objects.bulk_create(
+            Course(program=program, title=f"Course {s}", semester=s) for program in programs for s in range(1, 11)
+        )
+        Unit.objects.bulk_create(
+            Unit(course=course, code=f"U{course.pk:05d}{u}", name=f"Unit {u}") for course in courses for u in range(4)
+        )
+        Fee.objects.bulk_create(
+            Fee(program=program, amount="100.00", fee_type=f"Fee {t}") for program in programs for t in range(10)
+        )
+        cls.analyze(Institution, Program, Course, Unit, Fee)
+        cls.program = programs[250]
+
+    def test_unit_code_lookups_use_the_code_index(self):
+        """
+        The function tests that exact and prefix lookups by unit code are served by the code index.
+        """
+        code = Unit.objects.order_by('id')[1000].code
+        self.assertIndexScan(Unit.objects.filter(code=code), 'unit_code_idx')
+        self.assertIndexScan(Unit.objects.filter(code__startswith=code[:5]), 'unit_code_idx')
+
+    def test_course_and_fee_lookups_use_indexes(self):
+        """
+        The function tests that course lookups by program and semester and fee lookups by program and
+        fee type, as run by the catalog views and import, avoid sequential scans.
+        """
+        self.assertIndexScan(Course.objects.filter(program=self.program, semester=3), 'course_program_semester_idx')
+        self.assertIndexScan(Fee.objects.filter(program=self.program, fee_type="Fee 3"), 'fee_program_type_idx')
+        self.assertIndexScan(Fee.objects.filter(program_id__in=[self.program.pk], fee_type__in=["Fee 1", "Fee 2"]))
+
+    def test_list_filters_use_indexes(self):
+        """
+        The function tests that every filter and ordering the course and unit lists accept is
+        answered without sequential scans.
+        """
+        course = self.program.course_set.order_by('id').first()
+        code = course.unit_set.order_by('id').first().code
+        cases = [
+            (CourseViewSet, {'program': self.program.pk, 'semester': 3, 'ordering': '-semester'}),
+            (CourseViewSet, {'institution': self.program.institution_id}),
+            (UnitViewSet, {'course': course.pk, 'ordering': 'code'}),
+            (UnitViewSet, {'program': self.program.pk}),
+            (UnitViewSet, {'institution': self.program.institution_id}),
+            (UnitViewSet, {'code': code[:4]}),
+        ]
+        for viewset, params in cases:
+            view = viewset(request=Request(APIRequestFactory().get('/', params)), action='list', format_kwarg=None)
+            queryset = view.filter_queryset(view.get_queryset())
+            ordering = view.paginator.get_ordering(view.request, queryset, view)
+            with self.subTest(viewset=viewset.__name__, **params):
+                self.assertIndexScan(queryset.order_by(*ordering)[:51])
+
+
+class CatalogExportTest(TestCase):
+    def setUp(self):
+        create_catalog(institutions=2, programs=2, courses=2, units=3, prefix="EXP")
+        Fee.objects.filter(program__name="Program 1").update(description="Payable, per year")
+
+    def catalog_rows(self):
+        return sorted(Unit.objects.values_list(
+            'course__program__institution__code', 'course__program__name', 'course__title', 'code', 'name'
+        )), sorted(Fee.objects.values_list('program__institution__code', 'program__name', 'fee_type', 'amount', 'description'))
+
+    def test_export_round_trips_through_import(self):
+        """
+        The function tests that both export formats can be read back by `import_catalog` into an empty
+        catalog with the same content.
+        """
+        expected = self.catalog_rows()
+        for fmt in ('csv', 'jsonl'):
+            handle, path = tempfile.mkstemp(suffix=f'.{fmt}')
+            os.close(handle)
+            self.addCleanup(os.remove, path)
+            call_command('export_catalog', path, '--chunk-size', '4', stdout=StringIO())
+            Institution.objects.all().delete()
+            call_command('import_catalog', path, stdout=StringIO())
+            self.assertEqual(self.catalog_rows(), expected)
+
+    def test_export_endpoint_streams_records(self):
+        """
+        The function tests that the export endpoint streams a CSV file with a header and one line per
+        record, and JSON Lines on request.
+        """
+        response = self.client.get(reverse('catalog-export'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 2 + 4 + 8 + 24 + 4)
+        self.assertEqual([row['type'] for row in rows[:3]], ['institution', 'institution', 'program'])
+
+        response = self.client.get(reverse('catalog-export'), {'output': 'jsonl'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(records[-1]['type'], 'fee')
+        self.assertEqual(self.client.get(reverse('catalog-export'), {'output': 'xml'}).status_code, 400)
+
+
+class CatalogSnapshotTest(TestCase):
+    def setUp(self):
+        create_catalog(institutions=2, programs=2, courses=2, units=2, prefix="SNAP")
+        Institution.objects.filter(code="SNAP0").update(website="https://snap.example.com")
+        Fee.objects.create(program=Program.objects.first(), amount="-12.05", currency="USD", fee_type="Refund", description="Négatif")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'catalog.snapshot')
+        settings_override = self.settings(CATALOG_SNAPSHOT_PATH=self.path)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def tree(self, **params):
+        caches['default'].clear()
+        return self.client.get(reverse('catalog-tree'), params).content
+
+    def test_snapshot_serves_the_same_tree_without_catalog_queries(self):
+        """
+        The function tests that the tree read from the snapshot is identical to the one read from the
+        database for every filter, and that serving it only reads the version table.
+        """
+        program = Program.objects.order_by('id').last()
+        variants = [{}, {'include_fees': 'true'}, {'institution': program.institution_id},
+                    {'program': program.pk, 'include_fees': 'true'}, {'program': program.pk, 'institution': 99999}]
+        expected = [self.tree(**params) for params in variants]
+
+        call_command('build_catalog_snapshot', stdout=StringIO())
+        for params, content in zip(variants, expected):
+            caches['default'].clear()
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('catalog-tree'), params)
+            self.assertEqual(response.content, content, params)
+
+    def test_stale_snapshot_falls_back_until_rebuilt(self):
+        """
+        The function tests that a catalog change makes the view read the database until the snapshot
+        is rebuilt, and that the rebuilt snapshot replaces the old one.
+        """
+        call_command('build_catalog_snapshot', stdout=StringIO())
+        Unit.objects.filter(code="U000").update(name="Changed")
+        Unit.objects.first().save()
+        self.assertIn(b'"Changed"', self.tree())
+        self.assertIsNotNone(load_snapshot())
+        self.assertNotEqual(load_snapshot().stamp, catalog_stamp(get_catalog_state()))
+
+        call_command('build_catalog_snapshot', stdout=StringIO())
+        self.assertEqual(load_snapshot().stamp, catalog_stamp(get_catalog_state()))
+        caches['default'].clear()
+        with self.assertNumQueries(1):
+            self.assertIn(b'"Changed"', self.client.get(reverse('catalog-tree')).content)
+
+
+class CatalogChangesTest(TestCase):
+    def setUp(self):
+        settings_override = self.settings(CATALOG_CHANGES_SETTLE_SECONDS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        create_catalog(institutions=1, programs=1, courses=1, units=2, prefix="SYNC")
+        self.token = self.changes()['next']
+
+    def changes(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        response = self.client.get(reverse('catalog-changes'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_feed_returns_only_changes_since_the_token(self):
+        """
+        The function tests that the feed returns each changed row once with its current data, deleted
+        rows as tombstones, and nothing once the client is up to date.
+        """
+        unit, other = Unit.objects.order_by('id')
+        unit.name = "First edit"
+        unit.save()
+        unit.name = "Second edit"
+        unit.save()
+        other_id = other.pk
+        other.delete()
+
+        body = self.changes(self.token)
+        self.assertEqual(body['changes'], [
+            {'type': 'unit', 'id': unit.pk, 'action': 'upsert', 'data': self.client.get(reverse('unit-detail', args=[unit.pk])).json()},
+            {'type': 'unit', 'id': other_id, 'action': 'delete'},
+        ])
+        self.assertEqual(body['changes'][0]['data']['name'], "Second edit")
+        self.assertFalse(body['has_more'])
+        self.assertEqual(self.changes(body['next'])['changes'], [])
+
+    def test_feed_pages_and_tracks_batch_writes(self):
+        """
+        The function tests that batch updates are logged and stamp `updated_at`, and that `limit`
+        pages through the log with `has_more`.
+        """
+        units = list(Unit.objects.order_by('id'))
+        before = units[0].updated_at
+        response = self.client.patch(
+            reverse('unit-batch'), [{'id': u.pk, 'name': f"Batch {u.pk}"} for u in units], content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        units[0].refresh_from_db()
+        self.assertGreater(units[0].updated_at, before)
+
+        first = self.changes(self.token, limit=1)
+        self.assertTrue(first['has_more'])
+        second = self.changes(first['next'], limit=1)
+        self.assertEqual([c['id'] for c in first['changes'] + second['changes']], [u.pk for u in units])
+
+    def test_unsettled_changes_are_held_back(self):
+        """
+        The function tests that changes younger than the settle window are not returned yet but
+        reported with `has_more`, and that a malformed token is rejected.
+        """
+        Unit.objects.first().save()
+        with self.settings(CATALOG_CHANGES_SETTLE_SECONDS=60):
+            body = self.changes(self.token)
+        self.assertEqual((body['changes'], body['next'], body['has_more']), ([], self.token, True))
+        body = self.changes(self.token)
+        self.assertEqual((len(body['changes']), body['has_more']), (1, False))
+        self.assertEqual(self.client.get(reverse('catalog-changes'), {'since': 'abc'}).status_code, 400)
+
+
+class CatalogBundleTest(TestCase):
+    def setUp(self):
+        create_catalog(institutions=1, programs=2, courses=1, units=2, prefix="BNDL")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = self.settings(
+            STATIC_ROOT=directory.name, CATALOG_CHANGES_SETTLE_SECONDS=0,
+            CATALOG_BUNDLE_MANIFEST=os.path.join(directory.name, 'catalog-bundle.json'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def build(self, **options):
+        call_command('build_catalog_bundle', stdout=StringIO(), **options)
+        response = self.client.get(reverse('catalog-bundle'))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_bundle_matches_the_list_endpoints_and_the_changes_feed(self):
+        """
+        The function tests that the bundle holds the same rows as the list endpoints, is served
+        compressed with immutable cache headers, and carries the sync token of the changes feed.
+        """
+        self.assertEqual(self.client.get(reverse('catalog-bundle')).status_code, 404)
+        manifest = self.build()
+
+        response = self.client.get(manifest['url'], HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        content = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        self.assertEqual(len(content), manifest['size'])
+        self.assertTrue(hashlib.sha256(content).hexdigest().startswith(manifest['hash']))
+
+        bundle = json.loads(content)
+        for section in ('institutions', 'programs', 'courses', 'units', 'fees'):
+            listed = self.client.get(reverse(f'{section[:-1]}-list'), {'page_size': 100}).json()['results']
+            self.assertEqual(bundle[section], listed)
+        self.assertEqual(bundle['sync_token'], manifest['sync_token'])
+        self.assertEqual(self.client.get(reverse('catalog-changes'), {'since': manifest['sync_token']}).json()['changes'], [])
+
+    def test_bundle_file_honours_refused_encodings(self):
+        """
+        The function tests that the fallback view for bundles WhiteNoise has not indexed sends the
+        gzipped bundle only when `Accept-Encoding` gives gzip a q-value above zero.
+        """
+        name = os.path.basename(self.build()['url'])
+        for header, encoding in (('gzip', 'gzip'), ('identity, gzip;q=0.5', 'gzip'), ('*', 'gzip'),
+                                 ('gzip;q=0', None), ('gzip; q=0.0, identity', None), ('*;q=0', None)):
+            request = APIRequestFactory().get('/', HTTP_ACCEPT_ENCODING=header)
+            response = catalog_bundle_file(request, name)
+            response.file_to_stream.close()
+            self.assertEqual(response.get('Content-Encoding'), encoding, header)
+
+    def test_bundle_name_follows_its_content(self):
+        """
+        The function tests that rebuilding an unchanged catalog keeps the hash, that a change moves
+        the manifest to a new bundle while older ones are kept up to `--keep`, and that the manifest
+        answers `If-None-Match` with a 304.
+        """
+        first = self.build()
+        self.assertEqual(self.build()['hash'], first['hash'])
+        response = self.client.get(reverse('catalog-bundle'), HTTP_IF_NONE_MATCH=f'"{first["hash"]}"')
+        self.assertEqual(response.status_code, 304)
+
+        unit = Unit.objects.first()
+        unit.name = "Renamed"
+        unit.save()
+        second = self.build(keep=2)
+        self.assertNotEqual(second['hash'], first['hash'])
+
+        unit.name = "Renamed again"
+        unit.save()
+        third = self.build(keep=2)
+        directory = os.path.join(settings.STATIC_ROOT, settings.CATALOG_BUNDLE_PREFIX)
+        self.assertEqual(
+            sorted(name for name in os.listdir(directory) if name.endswith('.json')),
+            sorted(f"catalog.{manifest['hash']}.json" for manifest in (second, third)),
+        )
+        self.assertTrue(os.path.exists(os.path.join(directory, f"catalog.{third['hash']}.json.gz")))
+
+
+class IndexedFilterTest(TestCase):
+    def setUp(self):
+        create_catalog(institutions=2, programs=2, courses=3, units=2, prefix="FLT")
+        self.program = Program.objects.order_by('id').last()
+
+    def ids(self, name, params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_filters_and_ordering(self):
+        """
+        The function tests that the course and unit lists are filtered by program, institution,
+        semester, course and code prefix, and paged in the requested order.
+        """
+        courses = Course.objects.filter(program=self.program)
+        self.assertEqual(self.ids('course-list', {'program': self.program.pk}), sorted(c.pk for c in courses))
+        self.assertEqual(self.ids('course-list', {'program': self.program.pk, 'semester': 2}), [courses.get(semester=2).pk])
+        self.assertEqual(
+            self.ids('course-list', {'institution': self.program.institution_id}),
+            sorted(Course.objects.filter(program__institution=self.program.institution_id).values_list('id', flat=True)),
+        )
+        self.assertEqual(
+            self.ids('course-list', {'program': self.program.pk, 'ordering': '-semester', 'page_size': 2}),
+            [c.pk for c in courses.order_by('-semester')[:2]],
+        )
+
+        course = courses.first()
+        units = Unit.objects.filter(course=course).order_by('-code')
+        self.assertEqual(self.ids('unit-list', {'course': course.pk, 'ordering': '-code'}), [u.pk for u in units])
+        self.assertEqual(
+            self.ids('unit-list', {'code': 'U10', 'institution': self.program.institution_id}),
+            sorted(Unit.objects.filter(code__startswith='U10', course__program__institution=self.program.institution_id).values_list('id', flat=True)),
+        )
+        self.assertEqual(len(self.ids('unit-list', {'program': self.program.pk})), 6)
+
+    def test_filters_through_relations_follow_moves(self):
+        """
+        The function tests that cached and conditional lists filtered through a relation change when
+        a course moves to another program or a program to another institution.
+        """
+        other = Program.objects.exclude(pk=self.program.pk).exclude(institution=self.program.institution_id).first()
+        course = Course.objects.filter(program=self.program).first()
+        url, params = reverse('unit-list'), {'program': self.program.pk}
+        first = self.client.get(url, params)
+        course.program = other
+        course.save()
+        second = self.client.get(url, params)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+        self.assertEqual(len(second.json()['results']), 4)
+
+        url, params = reverse('course-list'), {'institution': other.institution_id}
+        before = self.ids('course-list', params)
+        self.program.institution_id = other.institution_id
+        self.program.save()
+        self.assertEqual(self.ids('course-list', params), sorted(before + [c.pk for c in self.program.course_set.all()]))
+
+    def test_unbounded_requests_are_rejected(self):
+        """
+        The function tests that unknown parameters, filters and orderings without the filter their
+        index starts with, short code prefixes and malformed ids get a 400 response.
+        """
+        for name, params in [
+            ('course-list', {'title': 'Course 1'}),
+            ('course-list', {'semester': 2, 'institution': self.program.institution_id}),
+            ('course-list', {'ordering': 'semester'}),
+            ('course-list', {'ordering': 'title', 'program': self.program.pk}),
+            ('unit-list', {'code': 'U'}),
+            ('unit-list', {'course': 'abc'}),
+            ('unit-list', {'ordering': 'code', 'program': self.program.pk}),
+        ]:
+            with self.subTest(name=name, **params):
+                self.assertEqual(self.client.get(reverse(name), params).status_code, 400)
+
+
+class CatalogAutocompleteTest(TestCase):
+    def setUp(self):
+        create_catalog(institutions=1, programs=2, courses=2, units=3, prefix="AUTO")
+        Course.objects.filter(title="Course 1").update(title="Introduction  to Biology")
+        bump_catalog_version(Course)
+        autocomplete_index.invalidate()
+
+    def autocomplete(self, **params):
+        response = self.client.get(reverse('catalog-autocomplete'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['results']
+
+    def test_prefix_matches_without_queries(self):
+        """
+        The function tests that unit codes and course titles are matched by prefix, ignoring case and
+        spacing, in sorted order up to `limit`, and that warm requests do not query the database.
+        """
+        self.assertEqual([unit['code'] for unit in self.autocomplete(q='u10')], ['U100', 'U101', 'U102'])
+        self.assertEqual(len(self.autocomplete(q='U', limit=4)), 4)
+        with self.assertNumQueries(0):
+            courses = self.autocomplete(q='introduction to', type='course')
+        self.assertEqual([course['title'] for course in courses], ["Introduction  to Biology"] * 2)
+        self.assertEqual(courses[0]['program']['name'], "Program 0")
+        self.assertEqual(self.autocomplete(q='zz'), [])
+        self.assertEqual(self.client.get(reverse('catalog-autocomplete')).status_code, 400)
+
+    def test_index_follows_catalog_changes(self):
+        """
+        The function tests that a write in this process shows up on the next request, and a write
+        from another process once the version check interval has passed.
+        """
+        unit = Unit.objects.get(code='U100')
+        unit.code = 'X100'
+        unit.save()
+        self.assertEqual([u['id'] for u in self.autocomplete(q='x1')], [unit.pk])
+
+        # Another process: the rows and version change without this process's signals.
+        Unit.objects.filter(pk=unit.pk).update(code='Y100')
+        bump_catalog_version(Unit)
+        with self.settings(CATALOG_AUTOCOMPLETE_CHECK_SECONDS=60):
+            self.assertEqual(self.autocomplete(q='y1'), [])
+        with self.settings(CATALOG_AUTOCOMPLETE_CHECK_SECONDS=0):
+            self.assertEqual([u['id'] for u in self.autocomplete(q='y1')], [unit.pk])
+
+
+def reachable_closure():
+    """
+    Computes the prerequisite closure from the edges with a plain graph walk, for comparison.
+    """
+    direct = {}
+    for course_id, prerequisite_id in CoursePrerequisite.objects.values_list('course_id', 'prerequisite_id'):
+        direct.setdefault(course_id, set()).add(prerequisite_id)
+    closure = set()
+    for course_id in direct:
+        stack, seen = list(direct[course_id]), set()
+        while stack:
+            pk = stack.pop()
+            if pk not in seen:
+                seen.add(pk)
+                stack.extend(direct.get(pk, ()))
+        closure.update((course_id, pk) for pk in seen)
+    return closure
+
+
+class CoursePrerequisiteTest(TestCase):
+    def setUp(self):
+        create_catalog(institutions=1, programs=1, courses=6, units=0, prefix="PRQ")
+        self.a, self.b, self.c, self.d, self.e, self.f = Course.objects.order_by('id').values_list('id', flat=True)
+
+    def add(self, course, prerequisite):
+        return self.client.post(reverse('course-prerequisites', args=[course]), {'prerequisite': prerequisite})
+
+    def assertClosure(self):
+        stored = set(CoursePrerequisiteClosure.objects.values_list('course_id', 'prerequisite_id'))
+        self.assertEqual(stored, reachable_closure())
+
+    def test_eligibility_unlocks_and_cycles(self):
+        """
+        The function tests that prerequisites are followed transitively by the eligibility and unlocks
+        endpoints, and that self references and cycles are refused.
+        """
+        for course, prerequisite in ((self.a, self.b), (self.b, self.c), (self.a, self.d)):
+            self.assertEqual(self.add(course, prerequisite).status_code, 201)
+        self.assertClosure()
+
+        url = reverse('course-eligibility', args=[self.a])
+        self.assertEqual(self.client.get(url, {'completed': f'{self.b},{self.d}'}).json(),
+                         {'course': self.a, 'eligible': False, 'missing': [self.c]})
+        with self.assertNumQueries(2):
+            body = self.client.get(url, {'completed': f'{self.b},{self.c},{self.d}'}).json()
+        self.assertTrue(body['eligible'])
+        self.assertTrue(self.client.get(reverse('course-eligibility', args=[self.e])).json()['eligible'])
+
+        unlocks = self.client.get(reverse('course-unlocks', args=[self.c])).json()
+        self.assertEqual(([course['id'] for course in unlocks['unlocks']], unlocks['direct']), ([self.a, self.b], [self.b]))
+        prerequisites = self.client.get(reverse('course-prerequisites', args=[self.a])).json()
+        self.assertEqual(prerequisites['all_prerequisites'], [self.b, self.c, self.d])
+
+        for course, prerequisite in ((self.c, self.a), (self.a, self.a), (self.a, self.b)):
+            self.assertEqual(self.add(course, prerequisite).status_code, 400)
+        self.assertClosure()
+
+        # Saving the model directly, outside `add_prerequisite`, rolls a cyclic edge back as well.
+        with self.assertRaises(ValidationError):
+            CoursePrerequisite.objects.create(course_id=self.c, prerequisite_id=self.a)
+        self.assertFalse(CoursePrerequisite.objects.filter(course_id=self.c, prerequisite_id=self.a).exists())
+        self.assertClosure()
+
+    def test_closure_follows_removals(self):
+        """
+        The function tests that the closure stays equal to the graph's reachability through random
+        edge additions and removals and through course deletions.
+        """
+        rng = random.Random(7)
+        courses = [self.a, self.b, self.c, self.d, self.e, self.f]
+        for _ in range(40):
+            course, prerequisite = rng.sample(courses, 2)
+            edge = CoursePrerequisite.objects.filter(course_id=course, prerequisite_id=prerequisite).first()
+            if edge is not None:
+                response = self.client.delete(reverse('course-remove-prerequisite', args=[course, prerequisite]))
+                self.assertEqual(response.status_code, 204)
+            else:
+                self.assertIn(self.add(course, prerequisite).status_code, (201, 400))
+            self.assertClosure()
+
+        for course in (self.c, self.e):
+            Course.objects.get(pk=course).delete()
+            self.assertClosure()
@@ -1,13 +1,20 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import InstitutionViewSet, ProgramViewSet, CourseViewSet, UnitViewSet
+from .views import InstitutionViewSet, ProgramViewSet, CourseViewSet, UnitViewSet, FeeViewSet, CatalogTreeView, CatalogSearchView, CatalogExportView, CatalogChangesView, CatalogBundleView, CatalogAutocompleteView
 
 router = DefaultRouter()
 router.register('institutions', InstitutionViewSet)
 router.register('programs', ProgramViewSet)
 router.register('courses', CourseViewSet)
 router.register('units', UnitViewSet)
+router.register('fees', FeeViewSet)
 
 urlpatterns = [
+    path('tree/', CatalogTreeView.as_view(), name='catalog-tree'),
+    path('search/', CatalogSearchView.as_view(), name='catalog-search'),
+    path('autocomplete/', CatalogAutocompleteView.as_view(), name='catalog-autocomplete'),
+    path('export/', CatalogExportView.as_view(), name='catalog-export'),
+    path('bundle/', CatalogBundleView.as_view(), name='catalog-bundle'),
+    path('changes/', CatalogChangesView.as_view(), name='catalog-changes'),
     path('', include(router.urls)),
 ]
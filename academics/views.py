@@ -1,32 +1,498 @@
+import os
+from decimal import Decimal
+from itertools import groupby
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import F, OuterRef, Prefetch, Subquery, Sum
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import viewsets, permissions
+from django.utils.cache import get_conditional_response, quote_etag
+from rest_framework import viewsets, permissions, status
+from rest_framework import generics, serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import viewsets
-from .models import Institution, Program, Course, Unit
-from .serializers import InstitutionSerializer, ProgramSerializer, CourseSerializer, UnitSerializer
+from rest_framework.exceptions import NotFound, ValidationError
+from whitenoise.base import WhiteNoise
+from edu_hub.filters import IndexedFilter, IndexedFilterBackend
+from edu_hub.mixins import FastListMixin, SparseQuerysetMixin, query_list
+from edu_hub.pagination import KeysetPagination
+from .autocomplete import autocomplete_index
+from .bundle import BUNDLE_NAME_RE, bundle_dir, load_manifest
+from .catalog import CATALOG_MODELS, get_catalog_state, catalog_stamp
+from .changes import changes_since
+from .export import EXPORT_CONTENT_TYPES, export_lines
+from .mixins import CatalogConditionalMixin, CatalogCacheMixin, CatalogSnapshotMixin, BatchWriteMixin
+from .search import get_search_backend
+from .statistics import normalize_program_name
+from .models import Institution, Program, Course, Unit, Fee, ProgramFeeSummary, ProgramStatistics
+from .models import CoursePrerequisite, CoursePrerequisiteClosure
+from .prerequisites import add_prerequisite
+from .serializers import InstitutionSerializer, ProgramSerializer, CourseSerializer, UnitSerializer, FeeSerializer
+from .serializers import InstitutionTreeSerializer, ProgramFeeSummarySerializer, CoursePrerequisiteSerializer
+
+TRUE_VALUES = ('1', 'true', 'yes')
+
+MONEY = serializers.DecimalField(max_digits=None, decimal_places=2)
+
+# The metrics programs can be ranked by in `programs/compare/`, mapped to `ProgramStatistics` fields.
+COMPARE_ORDERINGS = {
+    'duration': 'program__duration_years',
+    'courses': 'course_count',
+    'units': 'unit_count',
+    'fees': 'total_fees',
+}
+
+
+def int_query_param(request, name):
+    """
+    Returns the integer value of the query parameter `name`, or None when it is absent. A value that
+    is not a positive integer raises a `ValidationError`, which DRF turns into a 400 response.
+    """
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return None
+    if not value.isdigit() or int(value) == 0:
+        raise ValidationError({name: 'Must be a positive integer.'})
+    return int(value)
+
 
 # This class defines a view set for handling CRUD operations on Institution objects using a specified
 # serializer.
-class InstitutionViewSet(viewsets.ModelViewSet):
+class InstitutionViewSet(CatalogConditionalMixin, CatalogCacheMixin, SparseQuerysetMixin, FastListMixin, BatchWriteMixin, viewsets.ModelViewSet):
     queryset = Institution.objects.all()
     serializer_class = InstitutionSerializer
+    pagination_class = KeysetPagination
 
 
 # This class defines a view set for the Program model with a specified queryset and serializer class.
-class ProgramViewSet(viewsets.ModelViewSet):
+class ProgramViewSet(CatalogConditionalMixin, CatalogCacheMixin, SparseQuerysetMixin, FastListMixin, BatchWriteMixin, viewsets.ModelViewSet):
     queryset = Program.objects.all()
     serializer_class = ProgramSerializer
+    pagination_class = KeysetPagination
+
+    @action(detail=True, methods=['get'])
+    def cost(self, request, pk=None):
+        """
+        Returns the program's fee totals per currency, broken down by fee type, read from the
+        precomputed `ProgramFeeSummary` rows. `estimated_total` multiplies the total by the program's
+        duration and assumes the listed fees are charged once per year.
+        """
+        program = self.get_object()
+        currencies = []
+        summaries = program.fee_summaries.order_by('currency', 'fee_type')
+        for currency, rows in groupby(summaries, key=attrgetter('currency')):
+            rows = list(rows)
+            total = sum((row.total for row in rows), Decimal('0'))
+            currencies.append({
+                'currency': currency,
+                'total': MONEY.to_representation(total),
+                'estimated_total': MONEY.to_representation(total * program.duration_years),
+                'fee_types': ProgramFeeSummarySerializer(rows, many=True).data,
+            })
+        return Response({'program': program.pk, 'duration_years': program.duration_years, 'currencies': currencies})
+
+    @action(detail=False, methods=['get'])
+    def compare(self, request):
+        """
+        Compares the programs with a given name across institutions, reading the precomputed
+        `ProgramStatistics` and `ProgramFeeSummary` rows with a single query.
+
+        Query parameters:
+        - `name`: the program name to compare (required). Case and spacing are ignored.
+        - `order`: `duration`, `courses`, `units` or `fees` (the default), prefixed with `-` for
+          descending order. Programs without fees in the currency are ranked last.
+        - `currency`: the currency fees are totalled in (default `KSH`).
+        - `limit`: maximum number of programs to return (default 50, at most 200).
+        """
+        name = normalize_program_name(request.query_params.get('name', ''))
+        if not name:
+            raise ValidationError({'name': 'This query parameter is required.'})
+        order = request.query_params.get('order', 'fees')
+        if order.lstrip('-') not in COMPARE_ORDERINGS:
+            raise ValidationError({'order': f"Must be one of {', '.join(COMPARE_ORDERINGS)}, optionally prefixed with '-'."})
+        currency = request.query_params.get('currency', 'KSH')
+        limit = min(int_query_param(request, 'limit') or 50, 200)
+
+        fees = (
+            ProgramFeeSummary.objects.filter(program=OuterRef('program'), currency=currency)
+            .values('program').annotate(total=Sum('total')).values('total')
+        )
+        expression = F(COMPARE_ORDERINGS[order.lstrip('-')])
+        expression = expression.desc(nulls_last=True) if order.startswith('-') else expression.asc(nulls_last=True)
+        rows = (
+            ProgramStatistics.objects.filter(name_key=name)
+            .select_related('program__institution')
+            .annotate(total_fees=Subquery(fees))
+            .order_by(expression, 'program_id')[:limit]
+        )
+        results = [
+            {
+                'rank': rank,
+                'program': {'id': row.program_id, 'name': row.program.name},
+                'institution': {
+                    'id': row.program.institution_id,
+                    'name': row.program.institution.name,
+                    'code': row.program.institution.code,
+                },
+                'duration_years': row.program.duration_years,
+                'course_count': row.course_count,
+                'unit_count': row.unit_count,
+                'total_fees': None if row.total_fees is None else MONEY.to_representation(row.total_fees),
+                'estimated_total': None if row.total_fees is None else MONEY.to_representation(
+                    row.total_fees * row.program.duration_years
+                ),
+            }
+            for rank, row in enumerate(rows, start=1)
+        ]
+        return Response({'name': name, 'order': order, 'currency': currency, 'results': results})
 
 
 # This class defines a view set for the Course model in Django, with a queryset that retrieves all
 # Course objects and a serializer class for Course objects.
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(CatalogConditionalMixin, CatalogCacheMixin, SparseQuerysetMixin, FastListMixin, BatchWriteMixin, viewsets.ModelViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    pagination_class = KeysetPagination
+    filter_backends = (IndexedFilterBackend,)
+    # Served by `course_program_semester_idx`, reached through the program index for `institution`.
+    indexed_filters = {
+        'program': IndexedFilter('program_id'),
+        'institution': IndexedFilter('program__institution_id', models=(Program,)),
+        'semester': IndexedFilter('semester', requires=('program',)),
+    }
+    indexed_orderings = {'semester': ('program',)}
+
+    @action(detail=True, methods=['get', 'post'])
+    def prerequisites(self, request, pk=None):
+        """
+        `GET` lists the course's direct prerequisites and the ids of every course it requires, directly
+        or not. `POST` takes `{"prerequisite": <id>}` and adds a prerequisite, unless it would create
+        a cycle.
+        """
+        course = self.get_object()
+        if request.method == 'POST':
+            serializer = CoursePrerequisiteSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            try:
+                edge = add_prerequisite(course.pk, serializer.validated_data['prerequisite'].pk)
+            except DjangoValidationError as e:
+                raise ValidationError(e.message_dict)
+            return Response(CoursePrerequisiteSerializer(edge).data, status=status.HTTP_201_CREATED)
+        direct = Course.objects.filter(dependent_links__course=course).order_by('semester', 'id')
+        required = CoursePrerequisiteClosure.objects.filter(course=course).order_by('prerequisite_id')
+        return Response({
+            'course': course.pk,
+            'prerequisites': CourseSerializer(direct, many=True).data,
+            'all_prerequisites': list(required.values_list('prerequisite_id', flat=True)),
+        })
+
+    @action(detail=True, methods=['delete'], url_path=r'prerequisites/(?P<prerequisite_id>\d+)')
+    def remove_prerequisite(self, request, pk=None, prerequisite_id=None):
+        course = self.get_object()
+        deleted, _ = CoursePrerequisite.objects.filter(course=course, prerequisite_id=prerequisite_id).delete()
+        if not deleted:
+            raise NotFound("This course does not require that course.")
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['get'])
+    def eligibility(self, request, pk=None):
+        """
+        Tells whether a student who completed the courses in `?completed=<id>,<id>,...` can take this
+        course, i.e. has completed every course it requires, directly or not. `missing` lists the
+        required courses not completed yet. Reads the precomputed prerequisite closure with one
+        indexed lookup.
+        """
+        course = self.get_object()
+        completed = query_list(request, 'completed')
+        if not all(pk.isdigit() for pk in completed):
+            raise ValidationError({'completed': 'Must be a comma separated list of course ids.'})
+        required = CoursePrerequisiteClosure.objects.filter(course=course).values_list('prerequisite_id', flat=True)
+        missing = sorted(set(required) - {int(pk) for pk in completed})
+        return Response({'course': course.pk, 'eligible': not missing, 'missing': missing})
+
+    @action(detail=True, methods=['get'])
+    def unlocks(self, request, pk=None):
+        """
+        Lists the courses that require this course, directly or not, read from the precomputed
+        prerequisite closure. `direct` holds the ids of the courses that list it as a direct
+        prerequisite.
+        """
+        course = self.get_object()
+        unlocked = Course.objects.filter(
+            pk__in=CoursePrerequisiteClosure.objects.filter(prerequisite=course).values('course_id')
+        ).order_by('semester', 'id')
+        direct = course.dependent_links.order_by('course_id').values_list('course_id', flat=True)
+        return Response({
+            'course': course.pk,
+            'unlocks': CourseSerializer(unlocked, many=True).data,
+            'direct': list(direct),
+        })
 
 
 # This class represents a view set for the Unit model in Django, with a queryset of all Unit objects
 # and using the UnitSerializer for serialization.
-class UnitViewSet(viewsets.ModelViewSet):
+class UnitViewSet(CatalogConditionalMixin, CatalogCacheMixin, SparseQuerysetMixin, FastListMixin, BatchWriteMixin, viewsets.ModelViewSet):
     queryset = Unit.objects.all()
     serializer_class = UnitSerializer
+    pagination_class = KeysetPagination
+    filter_backends = (IndexedFilterBackend,)
+    # Served by `unit_course_code_idx`, reached through the course and program indexes for `program`
+    # and `institution`, and by `unit_code_idx` for `code` prefixes.
+    indexed_filters = {
+        'course': IndexedFilter('course_id'),
+        'program': IndexedFilter('course__program_id', models=(Course,)),
+        'institution': IndexedFilter('course__program__institution_id', models=(Course, Program)),
+        'code': IndexedFilter('code__startswith', parse=str, min_length=2),
+    }
+    indexed_orderings = {'code': ('course',)}
+
+
+# This class defines a view set for the Fee model, exposing program fees with the same caching, paging
+# and batch endpoints as the other catalog resources.
+class FeeViewSet(CatalogConditionalMixin, CatalogCacheMixin, SparseQuerysetMixin, FastListMixin, BatchWriteMixin, viewsets.ModelViewSet):
+    queryset = Fee.objects.all()
+    serializer_class = FeeSerializer
+    pagination_class = KeysetPagination
+
+
+class CatalogTreeView(CatalogConditionalMixin, CatalogCacheMixin, CatalogSnapshotMixin, generics.ListAPIView):
+    """
+    Read-only view returning the nested Institution -> Program -> Course -> Unit catalog in a single
+    response. When a current catalog snapshot is available the tree is read from it with no catalog
+    queries. Otherwise every level is loaded with one `Prefetch` query, so the query count stays the
+    same no matter how many institutions, programs, courses or units are returned.
+
+    Query parameters:
+    - `institution`: only return the institution with this id.
+    - `program`: only return this program (nested under its institution).
+    - `include_fees`: set to `true` to include each program's fees.
+    """
+    serializer_class = InstitutionTreeSerializer
+    pagination_class = None
+    catalog_models = CATALOG_MODELS
+
+    def include_fees(self):
+        return self.request.query_params.get('include_fees', '').lower() in TRUE_VALUES
+
+    def get_queryset(self):
+        institution_id = int_query_param(self.request, 'institution')
+        program_id = int_query_param(self.request, 'program')
+
+        units = Unit.objects.order_by('id')
+        courses = Course.objects.order_by('semester', 'id').prefetch_related(
+            Prefetch('unit_set', queryset=units)
+        )
+        programs = Program.objects.order_by('id').prefetch_related(
+            Prefetch('course_set', queryset=courses)
+        )
+        if self.include_fees():
+            programs = programs.prefetch_related(Prefetch('fee_set', queryset=Fee.objects.order_by('id')))
+
+        institutions = Institution.objects.order_by('id')
+        if institution_id is not None:
+            institutions = institutions.filter(pk=institution_id)
+        if program_id is not None:
+            institutions = institutions.filter(program__pk=program_id)
+            programs = programs.filter(pk=program_id)
+        return institutions.prefetch_related(Prefetch('program_set', queryset=programs))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_fees'] = self.include_fees()
+        return context
+
+    def snapshot_data(self, snapshot):
+        return snapshot.tree(
+            institution_id=int_query_param(self.request, 'institution'),
+            program_id=int_query_param(self.request, 'program'),
+            include_fees=self.include_fees(),
+        )
+
+
+class CatalogSearchView(APIView):
+    """
+    Ranked full-text search over units, matching the unit code, name and description and the titles
+    of the unit's course and program. Each hit includes the unit's course, program and institution.
+
+    Query parameters:
+    - `q`: the search terms (required). Supports quoted phrases, `or` and `-term` exclusions. On
+      databases other than PostgreSQL, the words of a quoted phrase need not be next to each other.
+    - `limit`: maximum number of hits to return (default 20, at most 100).
+    """
+    default_limit = 20
+    max_limit = 100
+
+    def get(self, request):
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        limit = min(int_query_param(request, 'limit') or self.default_limit, self.max_limit)
+        return Response({'query': q, 'results': get_search_backend().search(q, limit)})
+
+
+class CatalogAutocompleteView(APIView):
+    """
+    Autocomplete for unit codes and course titles, answered from a per-process sorted index (see
+    `academics.autocomplete`) without querying the database, so it can be called on every keystroke.
+    Matching ignores case and repeated spaces, and results are sorted by code or title.
+
+    Query parameters:
+    - `q`: the prefix typed so far (required).
+    - `type`: `unit` (the default, matching unit codes) or `course` (matching course titles).
+    - `limit`: maximum number of results (default 10, at most 50).
+    """
+    default_limit = 10
+    max_limit = 50
+    types = ('unit', 'course')
+
+    def get(self, request):
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        kind = request.query_params.get('type', 'unit')
+        if kind not in self.types:
+            raise ValidationError({'type': f"Must be one of {', '.join(self.types)}."})
+        limit = min(int_query_param(request, 'limit') or self.default_limit, self.max_limit)
+        return Response({'results': autocomplete_index.search(kind, q, limit)})
+
+
+class CatalogExportView(APIView):
+    """
+    Streams the whole catalog as a flat file in the record format read by the `import_catalog`
+    command. Rows are read in chunks with a server-side cursor and sent as they are read, so the
+    response starts immediately and memory use does not depend on the size of the catalog.
+
+    Query parameters:
+    - `output`: `csv` (the default) or `jsonl` (newline-delimited JSON).
+    """
+
+    def get(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in EXPORT_CONTENT_TYPES:
+            raise ValidationError({'output': f"Must be one of {', '.join(EXPORT_CONTENT_TYPES)}."})
+        stamp = catalog_stamp(get_catalog_state())
+        response = StreamingHttpResponse(export_lines(output), content_type=EXPORT_CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="catalog-{stamp}.{output}"'
+        return response
+
+
+class CatalogBundleView(APIView):
+    """
+    Manifest of the offline catalog bundle built by the `build_catalog_bundle` command. The bundle
+    holds every institution, program, course, unit and fee and is named by the hash of its content,
+    so clients download it once per `hash` and cache it forever. It is served as a static file with
+    immutable cache headers. After loading it, clients pass its `sync_token` to the changes feed to
+    catch up.
+
+    The manifest is read from a file and not from the database, and carries an `ETag` of the bundle
+    hash so that clients can poll it cheaply with `If-None-Match`.
+    """
+
+    def get(self, request):
+        manifest = load_manifest()
+        if manifest is None:
+            raise NotFound("No catalog bundle has been built.")
+        etag = quote_etag(manifest['hash'])
+        response = get_conditional_response(request, etag=etag) or Response(manifest)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+def accepts_encoding(header, encoding):
+    """
+    Tells whether an `Accept-Encoding` header accepts a content coding: listed, or covered by `*`,
+    with a q-value above zero. An unreadable q-value does not accept the coding.
+    """
+    qualities = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    return qualities.get(encoding, qualities.get('*', 0.0)) > 0
+
+
+def catalog_bundle_file(request, name):
+    """
+    Serves a bundle that WhiteNoise does not know about yet. WhiteNoise indexes the static files when
+    a worker starts, so bundles built afterwards reach this view until the workers are restarted. The
+    response has the same immutable cache headers and uses a compressed variant when the client
+    accepts it.
+    """
+    directory = bundle_dir()
+    if not BUNDLE_NAME_RE.match(name) or not os.path.exists(os.path.join(directory, name)):
+        raise Http404("Unknown catalog bundle.")
+    accepted = request.headers.get('Accept-Encoding', '')
+    path, encoding = os.path.join(directory, name), None
+    for suffix, candidate in (('.br', 'br'), ('.gz', 'gzip')):
+        if accepts_encoding(accepted, candidate) and os.path.exists(path + suffix):
+            path, encoding = path + suffix, candidate
+            break
+    response = FileResponse(open(path, 'rb'), content_type='application/json')
+    if encoding is not None:
+        response['Content-Encoding'] = encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = f'max-age={WhiteNoise.FOREVER}, public, immutable'
+    return response
+
+
+class CatalogChangesView(APIView):
+    """
+    Incremental sync feed for clients that keep a copy of the catalog. Returns the institutions,
+    programs, courses, units and fees created, updated or deleted since a sync token, read from the
+    `CatalogChange` log, so a client that is up to date downloads only what changed.
+
+    Each change has the record `type`, its `id` and an `action`: `upsert` changes carry the current
+    `data` of the row and `delete` changes are tombstones. Clients store `next` and send it back as
+    `since`; while `has_more` is true, more changes are waiting. Changes written in the last
+    `CATALOG_CHANGES_SETTLE_SECONDS` are held back, so a page can be empty with `has_more` true: poll
+    again after a short wait.
+
+    Query parameters:
+    - `since`: the sync token from the previous response. Omit it, or pass 0, to get the whole catalog.
+    - `limit`: maximum number of log entries to read (default 500, at most 5000).
+    """
+    default_limit = 500
+    max_limit = 5000
+    serializer_classes = {
+        'institution': InstitutionSerializer,
+        'program': ProgramSerializer,
+        'course': CourseSerializer,
+        'unit': UnitSerializer,
+        'fee': FeeSerializer,
+    }
+
+    def get(self, request):
+        since = request.query_params.get('since') or '0'
+        if not since.isdigit():
+            raise ValidationError({'since': 'Must be a sync token returned by this endpoint.'})
+        limit = min(int_query_param(request, 'limit') or self.default_limit, self.max_limit)
+        entries, token, has_more = changes_since(int(since), limit)
+
+        rows = {}
+        for kind, serializer_class in self.serializer_classes.items():
+            pks = [object_id for model, object_id, deleted in entries if model == kind and not deleted]
+            if pks:
+                objects = serializer_class.Meta.model.objects.filter(pk__in=pks)
+                rows[kind] = {data['id']: data for data in serializer_class(objects, many=True).data}
 
+        changes = []
+        for kind, object_id, deleted in entries:
+            data = None if deleted else rows.get(kind, {}).get(object_id)
+            if data is None:
+                # Deleted, or deleted after this change was logged; the tombstone is in a later entry.
+                changes.append({'type': kind, 'id': object_id, 'action': 'delete'})
+            else:
+                changes.append({'type': kind, 'id': object_id, 'action': 'upsert', 'data': data})
+        return Response({'changes': changes, 'next': str(token), 'has_more': has_more})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CareerAssessment, CareerRecommendation
+from .models import CareerAssessment, CareerRecommendation, RecommendationJob, RecommendationCacheEntry
 
 # This class defines the admin interface for managing career assessment data with specified list
 # display fields, search fields, and ordering.
@@ -15,5 +15,21 @@ class CareerRecommendationAdmin(admin.ModelAdmin):
     search_fields = ('student__username', 'recommendation_text')
     ordering = ('-created_at',)
 
+# This class defines the admin interface for the queue of recommendation jobs, showing their status,
+# attempts and last error.
+class RecommendationJobAdmin(admin.ModelAdmin):
+    list_display = ('assessment', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('assessment__student__username', 'last_error')
+    ordering = ('-created_at',)
+
+# This class defines the admin interface for the cached recommendations, most recently used first.
+class RecommendationCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'hits', 'created_at', 'last_used_at')
+    search_fields = ('key', 'profile')
+    ordering = ('-last_used_at',)
+
 admin.site.register(CareerAssessment, CareerAssessmentAdmin)
 admin.site.register(CareerRecommendation, CareerRecommendationAdmin)
+admin.site.register(RecommendationJob, RecommendationJobAdmin)
+admin.site.register(RecommendationCacheEntry, RecommendationCacheEntryAdmin)
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from edu_hub.ratelimit import TokenBucket
+from .cache import PROFILE_FIELDS, cached_recommendation, store_recommendation
+from .models import CareerAssessment, CareerRecommendation
+from .recommendations import request_recommendation
+
+logger = logging.getLogger(__name__)
+
+
+def load_checkpoint(path):
+    """
+    Returns the checkpoint of a backfill: the id of the last assessment it went through and the ids
+    of the assessments whose recommendation could not be generated. A missing file starts from the
+    first assessment.
+    """
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {'last_id': 0, 'failed': []}
+
+
+def save_checkpoint(path, checkpoint):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.checkpoint-')
+    with os.fdopen(fd, 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(tmp_path, path)
+
+
+def regenerate_recommendations(checkpoint_path, requests_per_second, burst=1, concurrency=8, batch_size=100,
+                               limit=None, retry_failed=False, generate=request_recommendation, progress=None):
+    """
+    Generates a new recommendation for every assessment after the checkpoint, in id order, or with
+    `retry_failed` for the assessments that failed before.
+
+    Assessments are streamed with `iterator()`. Their LLM calls run on `concurrency` threads, which
+    share a token bucket of `requests_per_second`, so the backfill stays within the Azure quota. Only
+    a few calls per thread are queued ahead of the results being written. Profiles already in the
+    recommendation cache cost no call, and new recommendations are cached, so repeated profiles
+    are generated once.
+
+    Results are written in id order with `bulk_create`, `batch_size` at a time, and the checkpoint is
+    saved after every batch. A run that stops is resumed by running it again: at most the batch
+    being written when it stopped is generated twice. `progress` is called with the counts after
+    every batch. Returns the final counts.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    failed = set(checkpoint['failed'])
+    if retry_failed:
+        queryset = CareerAssessment.objects.filter(pk__in=checkpoint['failed'])
+    else:
+        queryset = CareerAssessment.objects.filter(pk__gt=checkpoint['last_id'])
+    queryset = queryset.order_by('pk').only('id', 'student_id', *PROFILE_FIELDS)
+    if limit is not None:
+        queryset = queryset[:limit]
+
+    bucket = TokenBucket(requests_per_second, burst)
+    counts = {'written': 0, 'generated': 0, 'cached': 0, 'failed': 0}
+    started = time.monotonic()
+    window, batch = deque(), []
+
+    def call(assessment):
+        bucket.acquire()
+        return generate(assessment)
+
+    def flush(last_id):
+        CareerRecommendation.objects.bulk_create(batch)
+        counts['written'] += len(batch)
+        batch.clear()
+        if not retry_failed:
+            checkpoint['last_id'] = last_id
+        checkpoint['failed'] = sorted(failed)
+        save_checkpoint(checkpoint_path, checkpoint)
+        if progress is not None:
+            progress(dict(counts, elapsed=time.monotonic() - started))
+
+    def collect():
+        assessment, future, cached = window.popleft()
+        try:
+            text = future.result()
+        except Exception as e:
+            logger.warning("Could not regenerate the recommendation of assessment %s: %s", assessment.pk, e)
+            failed.add(assessment.pk)
+            counts['failed'] += 1
+        else:
+            if not cached:
+                store_recommendation(assessment, text)
+            failed.discard(assessment.pk)
+            counts['cached' if cached else 'generated'] += 1
+            batch.append(CareerRecommendation(student_id=assessment.student_id, recommendation_text=text))
+        if len(batch) >= batch_size:
+            flush(assessment.pk)
+        return assessment.pk
+
+    last_id = None
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            for assessment in queryset.iterator(chunk_size=max(batch_size, 100)):
+                text = cached_recommendation(assessment)
+                if text is None:
+                    window.append((assessment, executor.submit(call, assessment), False))
+                else:
+                    future = Future()
+                    future.set_result(text)
+                    window.append((assessment, future, True))
+                while len(window) > concurrency * 4:
+                    last_id = collect()
+            while window:
+                last_id = collect()
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    if last_id is not None:
+        flush(last_id)
+    return dict(counts, elapsed=time.monotonic() - started)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import RecommendationCacheCounter, RecommendationCacheEntry
+
+PROFILE_FIELDS = ('interests', 'skills', 'academic_strengths')
+
+# Part of every cache key. Bump it when the prompt of `request_recommendation` changes, so that
+# recommendations generated with the previous prompt are no longer served.
+PROMPT_VERSION = 1
+
+HITS = 'hits'
+MISSES = 'misses'
+
+
+def normalize_items(value):
+    """
+    Turns a comma-separated field into the sorted list of its distinct items, compared without case
+    and with runs of whitespace collapsed, so that "Science, math" and "math,science,Math" match.
+    """
+    items = {' '.join(item.casefold().split()) for item in value.split(',')}
+    items.discard('')
+    return sorted(items)
+
+
+def profile_key(assessment):
+    """
+    Returns the cache key of an assessment, the SHA-256 of its normalized profile, along with the
+    profile itself. The deployment name is part of the profile, so that switching models does not
+    serve the previous model's answers.
+    """
+    profile = {field: normalize_items(getattr(assessment, field)) for field in PROFILE_FIELDS}
+    profile.update(prompt=PROMPT_VERSION, model=settings.AZURE_OPENAI_DEPLOYMENT_NAME)
+    profile = json.dumps(profile, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(profile.encode()).hexdigest(), profile
+
+
+def increment_counter(name):
+    updated = RecommendationCacheCounter.objects.filter(name=name).update(value=F('value') + 1)
+    if not updated:
+        counter, created = RecommendationCacheCounter.objects.get_or_create(name=name, defaults={'value': 1})
+        if not created:
+            RecommendationCacheCounter.objects.filter(name=name).update(value=F('value') + 1)
+
+
+def cached_recommendation(assessment):
+    """
+    Returns the cached recommendation for the assessment's profile, or None if there is none or it
+    expired. A hit marks the entry as recently used and is counted once the current transaction
+    commits (see `record_hit`).
+    """
+    key, _ = profile_key(assessment)
+    now = timezone.now()
+    ttl = timedelta(seconds=settings.CAREER_RECOMMENDATION_CACHE_TTL)
+    entry = RecommendationCacheEntry.objects.filter(key=key, created_at__gte=now - ttl).values_list(
+        'pk', 'recommendation_text'
+    ).first()
+    if entry is None:
+        return None
+    pk, text = entry
+    transaction.on_commit(lambda: record_hit(pk, now))
+    return text
+
+
+def record_hit(pk, now):
+    """
+    Marks an entry as used and counts the hit. Hits of the same profiles arrive in bursts, and the
+    first check runs in the transaction of the `/assess/` request: updating the entry and the shared
+    counter row there would hold their locks until the request commits and queue concurrent
+    submissions behind each other. Run after the commit instead, each update holds its lock for one
+    statement only.
+    """
+    RecommendationCacheEntry.objects.filter(pk=pk).update(hits=F('hits') + 1, last_used_at=now)
+    increment_counter(HITS)
+
+
+def store_recommendation(assessment, text):
+    """
+    Caches a recommendation the LLM generated for the assessment's profile, replacing an expired
+    entry, counts the miss and evicts entries beyond the cache's size.
+    """
+    key, profile = profile_key(assessment)
+    now = timezone.now()
+    RecommendationCacheEntry.objects.bulk_create(
+        [RecommendationCacheEntry(key=key, profile=profile, recommendation_text=text, created_at=now, last_used_at=now)],
+        update_conflicts=True, unique_fields=['key'],
+        update_fields=['profile', 'recommendation_text', 'hits', 'created_at', 'last_used_at'],
+    )
+    increment_counter(MISSES)
+    evict_entries()
+
+
+def evict_entries():
+    """
+    Deletes expired entries, then the least recently used ones until at most
+    `CAREER_RECOMMENDATION_CACHE_MAX_ENTRIES` are left. Returns the number of entries deleted.
+    """
+    ttl = timedelta(seconds=settings.CAREER_RECOMMENDATION_CACHE_TTL)
+    deleted, _ = RecommendationCacheEntry.objects.filter(created_at__lt=timezone.now() - ttl).delete()
+    size = settings.CAREER_RECOMMENDATION_CACHE_MAX_ENTRIES
+    # The first entry past the limit, in most recently used order, read from the last_used_at index.
+    cutoff = RecommendationCacheEntry.objects.order_by('-last_used_at').values_list('last_used_at', flat=True)[size:size + 1]
+    cutoff = next(iter(cutoff), None)
+    if cutoff is not None:
+        deleted += RecommendationCacheEntry.objects.filter(last_used_at__lte=cutoff).delete()[0]
+    return deleted
+
+
+def cache_stats():
+    counters = dict(RecommendationCacheCounter.objects.values_list('name', 'value'))
+    hits, misses = counters.get(HITS, 0), counters.get(MISSES, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        'entries': RecommendationCacheEntry.objects.count(),
+        'max_entries': settings.CAREER_RECOMMENDATION_CACHE_MAX_ENTRIES,
+        'ttl': settings.CAREER_RECOMMENDATION_CACHE_TTL,
+    }
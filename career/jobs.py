@@ -0,0 +1,165 @@
+import logging
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .cache import cached_recommendation, store_recommendation
+from .local_recommender import local_recommendation
+from .models import CareerRecommendation, RecommendationJob
+from .recommendations import FALLBACK_RECOMMENDATION, request_recommendation
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_recommendation(assessment):
+    """
+    Queues the generation of an assessment's recommendation. Called in the transaction that saves
+    the assessment, so that workers never see a job without its assessment. When the recommendation
+    of the same profile is cached, it is stored right away and the job is created done. Otherwise,
+    with `CAREER_LOCAL_FIRST_PASS`, the catalog suggestions of `local_recommendation` are stored as
+    a first answer, which the job replaces with the LLM's recommendation.
+    """
+    text = cached_recommendation(assessment)
+    if text is None:
+        first_pass = local_recommendation(assessment) if settings.CAREER_LOCAL_FIRST_PASS else None
+        if first_pass is None:
+            return RecommendationJob.objects.create(assessment=assessment)
+        recommendation = CareerRecommendation.objects.create(
+            student_id=assessment.student_id, recommendation_text=first_pass
+        )
+        return RecommendationJob.objects.create(assessment=assessment, recommendation=recommendation)
+    recommendation = CareerRecommendation.objects.create(student_id=assessment.student_id, recommendation_text=text)
+    return RecommendationJob.objects.create(
+        assessment=assessment, status=RecommendationJob.DONE, recommendation=recommendation
+    )
+
+
+def retry_delay(attempts):
+    """
+    Seconds to wait before retrying a job that failed `attempts` times: `CAREER_JOB_RETRY_SECONDS`,
+    doubled after every failure up to `CAREER_JOB_RETRY_MAX_SECONDS`, with 20% jitter so that jobs
+    failed by the same outage are not all retried at once.
+    """
+    delay = min(settings.CAREER_JOB_RETRY_SECONDS * 2 ** (attempts - 1), settings.CAREER_JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_jobs(limit=1):
+    """
+    Claims up to `limit` due jobs, oldest first, and returns them. The rows are read with
+    `SELECT ... FOR UPDATE SKIP LOCKED`, so concurrent workers claim different jobs without waiting
+    for each other, and marked running with a lease of `CAREER_JOB_LEASE_SECONDS` in the same short
+    transaction. The LLM is called after it commits, so no lock is held during the call. A job whose
+    worker died is claimed again once its lease ends.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            RecommendationJob.objects.select_related('assessment')
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(status__in=[RecommendationJob.PENDING, RecommendationJob.RUNNING], run_after__lte=now)
+            .order_by('run_after')[:limit]
+        )
+        if not jobs:
+            return []
+        lease_end = now + timedelta(seconds=settings.CAREER_JOB_LEASE_SECONDS)
+        RecommendationJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=RecommendationJob.RUNNING, attempts=F('attempts') + 1, run_after=lease_end, updated_at=now,
+        )
+    for job in jobs:
+        job.status = RecommendationJob.RUNNING
+        job.attempts += 1
+        job.run_after = lease_end
+    return jobs
+
+
+def update_claimed(job, **fields):
+    """
+    Updates a job this worker claimed, unless its lease ended and another worker claimed it since,
+    which the attempt count tells. Returns whether the job was updated.
+    """
+    fields['updated_at'] = timezone.now()
+    updated = RecommendationJob.objects.filter(
+        pk=job.pk, status=RecommendationJob.RUNNING, attempts=job.attempts
+    ).update(**fields)
+    if updated:
+        for name, value in fields.items():
+            setattr(job, name, value)
+    return bool(updated)
+
+
+def finish_job(job, status, text, error=''):
+    """
+    Stores the recommendation of a job, replacing its first pass if it has one, and marks it done or
+    failed, in one transaction that is rolled back if the job was claimed by another worker meanwhile.
+    """
+    with transaction.atomic():
+        recommendation_id = job.recommendation_id
+        if recommendation_id is None:
+            recommendation_id = CareerRecommendation.objects.create(
+                student_id=job.assessment.student_id, recommendation_text=text
+            ).pk
+        else:
+            CareerRecommendation.objects.filter(pk=recommendation_id).update(recommendation_text=text)
+        if not update_claimed(job, status=status, recommendation_id=recommendation_id, last_error=error):
+            transaction.set_rollback(True)
+
+
+def fallback_recommendation(assessment):
+    """
+    Returns the recommendation stored when the LLM could not be reached: the catalog suggestions of
+    `local_recommendation`, or `FALLBACK_RECOMMENDATION` when nothing in the catalog matches.
+    """
+    return local_recommendation(assessment) or FALLBACK_RECOMMENDATION
+
+
+def run_job(job, generate=request_recommendation):
+    """
+    Runs a claimed job: generates the recommendation with `generate`, unless the same profile was
+    cached since the job was queued, and stores it. A failed attempt is retried after `retry_delay`;
+    after `CAREER_JOB_MAX_ATTEMPTS` attempts the job fails and the student gets the fallback
+    recommendation instead (see `fallback_recommendation`).
+    """
+    max_attempts = settings.CAREER_JOB_MAX_ATTEMPTS
+    if job.attempts > max_attempts:
+        # Only happens when the workers running the previous attempts died before recording them.
+        finish_job(job, RecommendationJob.FAILED, fallback_recommendation(job.assessment), job.last_error or "Lease expired.")
+        return job
+    try:
+        text = cached_recommendation(job.assessment)
+        if text is None:
+            text = generate(job.assessment)
+            store_recommendation(job.assessment, text)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logger.warning("Recommendation job %s failed (attempt %s of %s): %s", job.pk, job.attempts, max_attempts, error)
+        if job.attempts >= max_attempts:
+            finish_job(job, RecommendationJob.FAILED, fallback_recommendation(job.assessment), error)
+        else:
+            update_claimed(
+                job, status=RecommendationJob.PENDING, last_error=error,
+                run_after=timezone.now() + timedelta(seconds=retry_delay(job.attempts)),
+            )
+        return job
+    finish_job(job, RecommendationJob.DONE, text)
+    return job
+
+
+def process_jobs(limit=None, batch=1, generate=request_recommendation):
+    """
+    Claims and runs due jobs until none are left, or `limit` jobs were run. Returns the number of
+    jobs run.
+    """
+    count = 0
+    while limit is None or count < limit:
+        jobs = claim_jobs(batch if limit is None else min(batch, limit - count))
+        if not jobs:
+            break
+        for job in jobs:
+            run_job(job, generate)
+        count += len(jobs)
+    return count
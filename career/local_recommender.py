@@ -0,0 +1,207 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+from academics.catalog import get_catalog_state, catalog_stamp
+from academics.models import Program, Course, Unit
+from .cache import PROFILE_FIELDS, normalize_items
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOP_WORDS = frozenset(
+    'a an and are as at be by for from in into is it of on or the to with'.split()
+)
+
+
+def tokenize(text):
+    """
+    Splits text into lowercase words, without stop words and single characters. A plural `s` is
+    dropped, so that "science" matches "Sciences".
+    """
+    tokens = []
+    for token in TOKEN_RE.findall(text.casefold()):
+        if len(token) < 2 or token in STOP_WORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class TfidfMatrix:
+    """
+    TF-IDF weights of a set of documents, with each document's vector normalized to unit length and
+    stored by column: for every term, the documents containing it and their weights. Scoring a query
+    then only reads the columns of the query's terms, and the dot product of two unit vectors is
+    their cosine similarity.
+    """
+
+    def __init__(self, documents):
+        vocabulary = {}
+        rows, columns, counts = [], [], []
+        for row, tokens in enumerate(documents):
+            for term, count in Counter(tokens).items():
+                rows.append(row)
+                columns.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+        self.size = len(documents)
+        self.vocabulary = vocabulary
+        rows = np.array(rows, dtype=np.int32)
+        columns = np.array(columns, dtype=np.int32)
+        document_frequency = np.bincount(columns, minlength=len(vocabulary))
+        self.idf = (np.log((self.size + 1) / (document_frequency + 1)) + 1).astype(np.float32)
+        weights = (1 + np.log(np.array(counts, dtype=np.float32))) * self.idf[columns]
+        norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=self.size)).astype(np.float32)
+        weights /= norms[rows]
+        order = np.argsort(columns, kind='stable')
+        self.rows = rows[order]
+        self.weights = weights[order]
+        self.indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=self.indptr[1:])
+
+    def query_vector(self, tokens):
+        counts = Counter(token for token in tokens if token in self.vocabulary)
+        if not counts:
+            return {}
+        weights = {term: (1 + np.log(count)) * self.idf[self.vocabulary[term]] for term, count in counts.items()}
+        norm = np.sqrt(sum(weight * weight for weight in weights.values()))
+        return {term: weight / norm for term, weight in weights.items()}
+
+    def top(self, tokens, limit):
+        """
+        Returns the rows of the `limit` documents most similar to the tokens, best first, with their
+        cosine similarity. Documents sharing no term with the tokens are left out.
+        """
+        query = self.query_vector(tokens)
+        if not query:
+            return []
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term, weight in query.items():
+            column = self.vocabulary[term]
+            start, end = self.indptr[column], self.indptr[column + 1]
+            scores[self.rows[start:end]] += weight * self.weights[start:end]
+        limit = min(limit, self.size)
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(row), float(scores[row])) for row in best if scores[row] > 0]
+
+
+def build_matrices():
+    """
+    Builds the TF-IDF matrices of programs, described by their name and their courses' titles, and
+    of units, described by their code, name, description and course title. Returns them with the
+    primary keys of their rows.
+    """
+    program_texts = {pk: [name] for pk, name in Program.objects.values_list('id', 'name').order_by('id')}
+    course_titles = {}
+    for pk, title, program_id in Course.objects.values_list('id', 'title', 'program_id').iterator(chunk_size=5000):
+        course_titles[pk] = title
+        if program_id in program_texts:
+            program_texts[program_id].append(title)
+    programs = (np.fromiter(program_texts, dtype=np.int64, count=len(program_texts)),
+                TfidfMatrix([tokenize(' '.join(texts)) for texts in program_texts.values()]))
+    unit_ids, unit_documents = [], []
+    for pk, code, name, description, course_id in Unit.objects.values_list(
+        'id', 'code', 'name', 'description', 'course_id'
+    ).order_by('id').iterator(chunk_size=5000):
+        unit_ids.append(pk)
+        unit_documents.append(tokenize(f"{code} {name} {description} {course_titles.get(course_id, '')}"))
+    units = (np.array(unit_ids, dtype=np.int64), TfidfMatrix(unit_documents))
+    return {'program': programs, 'unit': units}
+
+
+class LocalRecommender:
+    """
+    Per-process TF-IDF matrices of the academics catalog, used to suggest the programs and units
+    matching an assessment in a few milliseconds without calling the LLM. Like `AutocompleteIndex`,
+    the matrices are rebuilt when the catalog's `CatalogVersion` stamp changes, which is checked at
+    most once every `CAREER_LOCAL_RECOMMENDER_CHECK_SECONDS`.
+    """
+    catalog_models = (Program, Course, Unit)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._checked = None
+        self._matrices = None
+
+    def invalidate(self):
+        """
+        Makes the next suggestion rebuild the matrices.
+        """
+        self._stamp = None
+        self._checked = None
+
+    def ensure_current(self):
+        interval = settings.CAREER_LOCAL_RECOMMENDER_CHECK_SECONDS
+        checked = self._checked
+        if checked is not None and time.monotonic() - checked < interval:
+            return
+        with self._lock:
+            if self._checked is not checked:
+                return
+            now = time.monotonic()
+            stamp = catalog_stamp(get_catalog_state(*self.catalog_models))
+            if stamp != self._stamp:
+                self._matrices = build_matrices()
+                self._stamp = stamp
+            self._checked = now
+
+    def suggest(self, assessment, programs=3, units=5):
+        """
+        Returns the programs and units most similar to the assessment's interests, skills and
+        academic strengths, best first, each with its similarity `score`.
+        """
+        self.ensure_current()
+        tokens = [token for field in PROFILE_FIELDS for item in normalize_items(getattr(assessment, field))
+                  for token in tokenize(item)]
+        suggestions = {}
+        for kind, limit, model, fields in (
+            ('program', programs, Program, ('id', 'name', 'institution__name')),
+            ('unit', units, Unit, ('id', 'code', 'name', 'course__title')),
+        ):
+            ids, matrix = self._matrices[kind]
+            scores = {int(ids[row]): score for row, score in matrix.top(tokens, limit)}
+            rows = {row['id']: row for row in model.objects.filter(pk__in=scores).values(*fields)}
+            suggestions[kind] = [
+                dict(rows[pk], score=round(score, 4)) for pk, score in scores.items() if pk in rows
+            ]
+        return suggestions
+
+
+local_recommender = LocalRecommender()
+
+
+def format_suggestions(suggestions):
+    lines = ["Based on your interests, skills and academic strengths, these programs and units of the catalog match your profile."]
+    if suggestions['program']:
+        lines.append("\nPrograms:")
+        lines.extend(f"{index}. {program['name']} ({program['institution__name']})"
+                     for index, program in enumerate(suggestions['program'], 1))
+    if suggestions['unit']:
+        lines.append("\nUnits:")
+        lines.extend(f"{index}. {unit['code']} {unit['name']} (course: {unit['course__title']})"
+                     for index, unit in enumerate(suggestions['unit'], 1))
+    return '\n'.join(lines)
+
+
+def local_recommendation(assessment):
+    """
+    Returns the text of the catalog suggestions for an assessment, or None if nothing in the catalog
+    matches it or the suggestions could not be computed.
+    """
+    try:
+        suggestions = local_recommender.suggest(assessment)
+    except Exception as e:
+        logger.error("Local recommendation failed: %s", e)
+        return None
+    if not suggestions['program'] and not suggestions['unit']:
+        return None
+    return format_suggestions(suggestions)
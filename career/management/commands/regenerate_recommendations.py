@@ -0,0 +1,62 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from career.backfill import load_checkpoint, regenerate_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates a new career recommendation for every existing assessment, e.g. after a prompt "
+        "change. LLM calls run concurrently within the Azure quota, and progress is saved to a "
+        "checkpoint after every batch, so an interrupted run continues where it stopped when it is "
+        "started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkpoint', default=settings.CAREER_BACKFILL_CHECKPOINT, help=(
+            "Progress file. Defaults to the CAREER_BACKFILL_CHECKPOINT setting."
+        ))
+        parser.add_argument('--restart', action='store_true', help="Discard the checkpoint and start from the first assessment.")
+        parser.add_argument('--retry-failed', action='store_true', help="Only retry the assessments that failed in earlier runs.")
+        parser.add_argument('--rpm', type=float, default=settings.AZURE_OPENAI_REQUESTS_PER_MINUTE, help=(
+            "LLM requests per minute. Defaults to the AZURE_OPENAI_REQUESTS_PER_MINUTE setting."
+        ))
+        parser.add_argument('--burst', type=int, help="Requests that may be sent at once. Defaults to one second's worth.")
+        parser.add_argument('--concurrency', type=int, default=8, help="LLM requests in flight at most.")
+        parser.add_argument('--batch-size', type=int, default=100, help="Recommendations written per insert and checkpoint.")
+        parser.add_argument('--limit', type=int, help="Stop after this many assessments.")
+
+    def handle(self, *args, **options):
+        if options['rpm'] <= 0 or options['concurrency'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--rpm, --concurrency and --batch-size must be positive.")
+        if options['restart'] and options['retry_failed']:
+            raise CommandError("--restart and --retry-failed cannot be combined.")
+        path = options['checkpoint']
+        if options['restart'] and os.path.exists(path):
+            os.unlink(path)
+        checkpoint = load_checkpoint(path)
+        if options['retry_failed']:
+            self.stdout.write(f"Retrying {len(checkpoint['failed'])} failed assessments.")
+        elif checkpoint['last_id']:
+            self.stdout.write(f"Resuming after assessment {checkpoint['last_id']}.")
+
+        rate = options['rpm'] / 60
+        burst = options['burst'] or max(1, int(rate))
+        counts = regenerate_recommendations(
+            path, rate, burst=burst, concurrency=options['concurrency'], batch_size=options['batch_size'],
+            limit=options['limit'], retry_failed=options['retry_failed'], progress=self.report,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {counts['written']} recommendations ({counts['generated']} generated, {counts['cached']} "
+            f"from the cache) in {counts['elapsed']:.1f}s; {counts['failed']} failed."
+        ))
+        if counts['failed']:
+            self.stdout.write("Run again with --retry-failed to retry the failed assessments.")
+
+    def report(self, counts):
+        self.stdout.write(
+            f"{counts['written']} written, {counts['failed']} failed, {counts['elapsed']:.0f}s "
+            f"({counts['written'] / max(counts['elapsed'], 0.001):.1f}/s)"
+        )
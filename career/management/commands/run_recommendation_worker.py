@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from career.jobs import process_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs queued career recommendation jobs: claims due jobs, asks Azure OpenAI for each "
+        "recommendation and stores it, retrying failed jobs with backoff. Run as many workers as "
+        "needed; each job is claimed by one of them. Keeps polling for new jobs unless --once is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the jobs that are due, then exit.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to wait when no job is due.")
+        parser.add_argument('--batch', type=int, default=1, help=(
+            "Jobs claimed at once. Claimed jobs are run one after the other, so keep the batch small "
+            "enough to run within CAREER_JOB_LEASE_SECONDS."
+        ))
+        parser.add_argument('--max-jobs', type=int, help="Exit after running this many jobs.")
+
+    def handle(self, *args, **options):
+        if options['batch'] < 1:
+            raise CommandError("--batch must be at least 1.")
+        remaining = options['max_jobs']
+        while remaining is None or remaining > 0:
+            close_old_connections()
+            count = process_jobs(limit=remaining, batch=options['batch'])
+            if count:
+                self.stdout.write(f"Ran {count} recommendation job{'s' if count != 1 else ''}.")
+            if remaining is not None:
+                remaining -= count
+            if options['once']:
+                break
+            if not count:
+                time.sleep(options['interval'])
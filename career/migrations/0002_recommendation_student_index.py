@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('career', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='careerrecommendation',
+            index=models.Index(fields=['student', '-created_at'], name='careerrec_student_created_idx'),
+        ),
+        # Drop the single-column foreign key index only once the index replacing it exists.
+        migrations.AlterField(
+            model_name='careerrecommendation',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
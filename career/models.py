@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from users.models import Student
 
 # The `CareerAssessment` class represents a model with fields for a student, interests, skills,
@@ -16,9 +17,84 @@ class CareerAssessment(models.Model):
 # The `CareerRecommendation` class represents a career recommendation for a student with attributes
 # such as recommendation text and creation timestamp.
 class CareerRecommendation(models.Model):
-    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    # Indexed by `careerrec_student_created_idx` below, which starts with the student.
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, db_index=False)
     recommendation_text = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Backs `CareerRecommendationView`, which lists a student's recommendations newest first.
+            models.Index(fields=['student', '-created_at'], name='careerrec_student_created_idx'),
+        ]
     
     def __str__(self):
         return f"Career Recommendation for {self.student}"
+
+
+# The `RecommendationJob` class represents a queued request to generate the career recommendation of
+# an assessment. Jobs are created by `CareerAssessmentView` and run by the
+# `run_recommendation_worker` command (see `career/jobs.py`). `run_after` is when the job may be
+# claimed next: its creation time, the end of the backoff after a failed attempt, or the end of the
+# lease of the worker running it, after which another worker reclaims it.
+class RecommendationJob(models.Model):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    assessment = models.OneToOneField(CareerAssessment, on_delete=models.CASCADE, related_name='recommendation_job')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    recommendation = models.OneToOneField(
+        CareerRecommendation, on_delete=models.SET_NULL, null=True, blank=True, related_name='job'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the due jobs in `run_after` order; finished jobs are left out of the index.
+            models.Index(
+                fields=['run_after'], name='recjob_due_idx',
+                condition=models.Q(status__in=['pending', 'running']),
+            ),
+        ]
+
+    def __str__(self):
+        return f"Recommendation job for {self.assessment}"
+
+
+# The `RecommendationCacheEntry` class stores a generated recommendation under the hash of the
+# normalized assessment it was generated for (see `career/cache.py`), so that students submitting the
+# same interests, skills and academic strengths are answered without calling the LLM again. Entries
+# expire `CAREER_RECOMMENDATION_CACHE_TTL` seconds after they were generated, and the least recently
+# used ones are evicted beyond `CAREER_RECOMMENDATION_CACHE_MAX_ENTRIES`.
+class RecommendationCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    profile = models.TextField(help_text="Normalized assessment the key was computed from")
+    recommendation_text = models.TextField()
+    hits = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Cached recommendation {self.key[:12]}"
+
+
+# The `RecommendationCacheCounter` class holds the hit and miss counters of the recommendation cache,
+# one row per counter.
+class RecommendationCacheCounter(models.Model):
+    name = models.CharField(max_length=20, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
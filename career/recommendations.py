@@ -0,0 +1,71 @@
+import logging
+
+from django.conf import settings
+from openai import AzureOpenAI
+
+from edu_hub.singleflight import SingleFlight
+from .cache import profile_key
+
+logger = logging.getLogger(__name__)
+
+# Message stored as the recommendation when none could be generated.
+FALLBACK_RECOMMENDATION = "Could not generate recommendation at this time."
+
+# Coalesces concurrent requests for assessments with the same normalized profile.
+recommendation_flight = SingleFlight('career-recommendation')
+
+# Initialize Azure OpenAI client
+try:
+    client = AzureOpenAI(
+        azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+        api_version="2024-02-15-preview",
+        api_key=settings.AZURE_OPENAI_KEY
+    )
+except Exception as e:
+    logger.error("Failed to initialize AzureOpenAI client: %s", e)
+    raise
+
+
+def request_recommendation(assessment):
+    """
+    Asks Azure OpenAI for 3 career paths suited to the interests, skills and academic strengths of a
+    `CareerAssessment`, each with a brief explanation, and returns the text of the answer. Errors of
+    the API are raised, so that the caller can retry. Concurrent requests for assessments with the
+    same normalized profile (see `career.cache.profile_key`) share one API call.
+    """
+    key, _ = profile_key(assessment)
+    return recommendation_flight.do(key, lambda: complete_recommendation(assessment))
+
+
+def complete_recommendation(assessment):
+    prompt = f"""
+You are a career advisor. A student has submitted the following:
+- Interests: {assessment.interests}
+- Skills: {assessment.skills}
+- Academic strengths: {assessment.academic_strengths}
+
+Suggest 3 suitable career paths for the student. Include a brief explanation for each career, tailored to the given information.
+"""
+
+    response = client.chat.completions.create(
+        model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,  # e.g., "gpt-4o"
+        messages=[
+            {"role": "system", "content": "You are a helpful career guidance assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=500,
+        temperature=0.7,
+        timeout=settings.CAREER_RECOMMENDATION_TIMEOUT,
+    )
+    return response.choices[0].message.content.strip()
+
+
+def generate_recommendation(assessment):
+    """
+    Same as `request_recommendation`, but logs errors and returns None instead of raising them.
+    """
+    try:
+        return request_recommendation(assessment)
+    except Exception as e:
+        logger.error("Azure OpenAI API error: %s", e)
+        return None
@@ -1,16 +1,27 @@
 from rest_framework import serializers
-from .models import CareerAssessment, CareerRecommendation
+from edu_hub.serializers import SparseFieldsMixin
+from .models import CareerAssessment, CareerRecommendation, RecommendationJob
 
 # The `CareerAssessmentSerializer` class is a Django REST framework serializer for the
 # `CareerAssessment` model with all fields included.
-class CareerAssessmentSerializer(serializers.ModelSerializer):
+class CareerAssessmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CareerAssessment
         fields = '__all__'
 
 # The `CareerRecommendationSerializer` class is a Django REST framework serializer for the
 # `CareerRecommendation` model with all fields included.
-class CareerRecommendationSerializer(serializers.ModelSerializer):
+class CareerRecommendationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = CareerRecommendation
         fields = '__all__'
+
+# The `RecommendationJobSerializer` class is a Django REST framework serializer for the status of a
+# `RecommendationJob`, with its recommendation nested once the job is done.
+class RecommendationJobSerializer(serializers.ModelSerializer):
+    recommendation = CareerRecommendationSerializer(read_only=True)
+
+    class Meta:
+        model = RecommendationJob
+        fields = ('id', 'assessment', 'status', 'attempts', 'created_at', 'updated_at', 'recommendation')
+        read_only_fields = fields
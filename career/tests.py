@@ -1,11 +1,23 @@
+import os
+import tempfile
+import threading
 import unittest
+from datetime import timedelta
 from django.utils import timezone
-from django.db import IntegrityError, DataError
-from career.models import CareerAssessment, CareerRecommendation
+from django.db import IntegrityError, DataError, connection
+from career.backfill import load_checkpoint, regenerate_recommendations
+from career.cache import cache_stats, normalize_items, profile_key
+from career.jobs import claim_jobs, process_jobs, run_job
+from career.local_recommender import local_recommendation, local_recommender
+from career.models import CareerAssessment, CareerRecommendation, RecommendationJob, RecommendationCacheEntry
+from career.recommendations import FALLBACK_RECOMMENDATION
 from users.models import Student
 from django.urls import reverse
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
+from rest_framework.test import APIClient
 from django.contrib.auth import get_user_model
+from academics.models import Institution, Program, Course, Unit
+from edu_hub.testing import QueryPlanAssertionsMixin
 User = get_user_model()
 
 class CareerAssessmentModelTestCase(unittest.TestCase):
@@ -368,4 +380,341 @@ class CareerRecommendationModelTestCase(unittest.TestCase):
 #         with connection.cursor() as cursor:
 #             cursor.execute('DROP TABLE career_careerrecommendation')
 #         response = self.client.get(self.list_url)
-#         self.assertIn(response.status_code, (500, 503, 400))
\ No newline at end of file
+#         self.assertIn(response.status_code, (500, 503, 400))
+
+@unittest.skipUnless(connection.vendor == 'postgresql', "Query plans are checked on PostgreSQL")
+class CareerRecommendationQueryPlanTestCase(QueryPlanAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        students = Student.objects.bulk_create(
+            Student(username=f'planstudent{i}', student_id=f'PLAN{i}') for i in range(500)
+        )
+        CareerRecommendation.objects.bulk_create(
+            CareerRecommendation(student=student, recommendation_text="Engineering") for student in students for _ in range(20)
+        )
+        cls.analyze(Student, CareerRecommendation)
+        cls.student = students[100]
+
+    def test_student_recommendations_use_the_student_index(self):
+        """
+        The function tests that listing a student's recommendations newest first, as
+        `CareerRecommendationView` does, is served by the (student, created_at) index.
+        """
+        queryset = CareerRecommendation.objects.filter(student=self.student).order_by('-created_at')
+        self.assertIndexScan(queryset, 'careerrec_student_created_idx')
+
+class RecommendationJobTestCase(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create_user(username='jobstudent', password='password123', student_id='JOB1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def assess(self):
+        return self.client.post(reverse('career-assess'), {
+            'student': self.student.pk, 'interests': "math", 'skills': "python", 'academic_strengths': "physics",
+        })
+
+    def test_assessment_is_queued_and_recommended_by_the_worker(self):
+        """
+        The function tests that an assessment is answered with 202 and a pending job without calling
+        the LLM, and that the job's status shows the recommendation once a worker ran it.
+        """
+        response = self.assess()
+        self.assertEqual(response.status_code, 202)
+        job = response.json()['job']
+        self.assertEqual(job['status'], 'pending')
+        self.assertEqual(response['Location'], 'http://testserver' + reverse('career-job', args=[job['id']]))
+        self.assertFalse(CareerRecommendation.objects.exists())
+
+        self.assertEqual(process_jobs(generate=lambda assessment: f"Engineering, for {assessment.interests}"), 1)
+        self.assertEqual(process_jobs(generate=lambda assessment: "Again"), 0)
+        status = self.client.get(reverse('career-job', args=[job['id']])).json()
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['attempts'], 1)
+        self.assertEqual(status['recommendation']['recommendation_text'], "Engineering, for math")
+        self.assertEqual(status['recommendation']['student'], self.student.pk)
+
+        other = Student.objects.create_user(username='otherjobstudent', password='password123', student_id='JOB2')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(reverse('career-job', args=[job['id']])).status_code, 404)
+
+    @override_settings(CAREER_JOB_MAX_ATTEMPTS=3, CAREER_JOB_RETRY_SECONDS=60)
+    def test_failed_jobs_are_retried_with_backoff(self):
+        """
+        The function tests that a failed job waits for a growing delay before it is claimed again, and
+        that after the last attempt it fails with the fallback recommendation.
+        """
+        job_id = self.assess().json()['job']['id']
+
+        def fail(assessment):
+            raise ConnectionError("LLM unavailable")
+
+        delays = []
+        for attempt in range(1, 3):
+            before = timezone.now()
+            self.assertEqual(process_jobs(generate=fail), 1)
+            job = RecommendationJob.objects.get(pk=job_id)
+            self.assertEqual((job.status, job.attempts), ('pending', attempt))
+            self.assertIn("LLM unavailable", job.last_error)
+            delays.append((job.run_after - before).total_seconds())
+            self.assertEqual(process_jobs(generate=fail), 0)
+            RecommendationJob.objects.filter(pk=job_id).update(run_after=timezone.now())
+        self.assertTrue(48 <= delays[0] <= 72 and 96 <= delays[1] <= 144, delays)
+
+        self.assertEqual(process_jobs(generate=fail), 1)
+        job = RecommendationJob.objects.select_related('recommendation').get(pk=job_id)
+        self.assertEqual((job.status, job.attempts), ('failed', 3))
+        self.assertEqual(job.recommendation.recommendation_text, FALLBACK_RECOMMENDATION)
+
+    def test_expired_lease_is_claimed_again(self):
+        """
+        The function tests that a running job is not claimed by another worker until its lease ends,
+        and that the first worker's result is discarded when it finishes after the second one.
+        """
+        job_id = self.assess().json()['job']['id']
+        [first] = claim_jobs()
+        self.assertEqual(first.status, 'running')
+        self.assertEqual(claim_jobs(), [])
+
+        RecommendationJob.objects.filter(pk=job_id).update(run_after=timezone.now() - timedelta(seconds=1))
+        [second] = claim_jobs()
+        self.assertEqual(second.attempts, 2)
+        run_job(second, generate=lambda assessment: "On time")
+        run_job(first, generate=lambda assessment: "Late")
+        texts = list(CareerRecommendation.objects.values_list('recommendation_text', flat=True))
+        self.assertEqual(texts, ["On time"])
+
+class RecommendationCacheTestCase(TestCase):
+    def setUp(self):
+        self.student = Student.objects.create_user(username='cachestudent', password='password123', student_id='CACHE1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.calls = []
+
+    def generate(self, assessment):
+        self.calls.append(assessment.pk)
+        return f"Careers for {assessment.interests}"
+
+    def assess(self, interests, skills="python", strengths="physics"):
+        response = self.client.post(reverse('career-assess'), {
+            'student': self.student.pk, 'interests': interests, 'skills': skills, 'academic_strengths': strengths,
+        })
+        self.assertEqual(response.status_code, 202)
+        return response.json()['job']
+
+    def test_profiles_are_normalized(self):
+        """
+        The function tests that comma-separated fields are compared without case, spacing, order or
+        repeated items.
+        """
+        self.assertEqual(normalize_items(" Science,math ,, MATH, data   science"), ['data science', 'math', 'science'])
+        first = CareerAssessment(interests="math, science", skills="Python", academic_strengths="")
+        second = CareerAssessment(interests="Science,Math", skills="python,", academic_strengths=" ")
+        third = CareerAssessment(interests="math", skills="python", academic_strengths="science")
+        self.assertEqual(profile_key(first)[0], profile_key(second)[0])
+        self.assertNotEqual(profile_key(first)[0], profile_key(third)[0])
+
+    def test_repeated_profiles_are_answered_from_the_cache(self):
+        """
+        The function tests that an assessment with a cached profile gets its recommendation when it is
+        submitted, without calling the LLM, and that hits and misses are counted.
+        """
+        self.assess("math, science")
+        process_jobs(generate=self.generate)
+        # The hit is only recorded once the request's transaction commits, not under its locks.
+        with self.captureOnCommitCallbacks() as callbacks:
+            job = self.assess("Science,Math ")
+            self.assertEqual(cache_stats()['hits'], 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(cache_stats()['hits'], 1)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['recommendation']['recommendation_text'], "Careers for math, science")
+        self.assertEqual(len(self.calls), 1)
+
+        # Two identical profiles queued before either was generated share one LLM call.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assess("art")
+            self.assess("Art")
+            process_jobs(generate=self.generate)
+        self.assertEqual(len(self.calls), 2)
+
+        staff = Student.objects.create_user(username='cachestaff', password='password123', student_id='CACHE2', is_staff=True)
+        self.assertEqual(self.client.get(reverse('career-cache-stats')).status_code, 403)
+        self.client.force_authenticate(staff)
+        stats = self.client.get(reverse('career-cache-stats')).json()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries'], stats['hit_rate']), (2, 2, 2, 0.5))
+
+    @override_settings(CAREER_RECOMMENDATION_CACHE_MAX_ENTRIES=2, CAREER_RECOMMENDATION_CACHE_TTL=3600)
+    def test_expired_and_least_recently_used_entries_are_evicted(self):
+        """
+        The function tests that expired entries are not served and that the least recently used
+        entries are evicted beyond the cache's size.
+        """
+        for interests in ("a", "b"):
+            self.assess(interests)
+        process_jobs(generate=self.generate)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assess("a")  # "a" is now more recently used than "b"
+        self.assess("c")
+        process_jobs(generate=self.generate)
+        self.assertEqual(
+            sorted(RecommendationCacheEntry.objects.values_list('recommendation_text', flat=True)),
+            ["Careers for a", "Careers for c"],
+        )
+
+        RecommendationCacheEntry.objects.update(created_at=timezone.now() - timedelta(hours=2))
+        self.assess("a")
+        process_jobs(generate=self.generate)
+        self.assertEqual(len(self.calls), 4)
+        self.assertEqual(cache_stats()['entries'], 1)
+
+class LocalRecommenderTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        institution = Institution.objects.create(name="Test University", code="TU")
+        catalog = {
+            "Computer Science": {
+                "Programming": [("CS101", "Introduction to Python programming"), ("CS102", "Web programming")],
+                "Data Structures": [("CS201", "Algorithms and data structures")],
+            },
+            "Nursing": {"Anatomy": [("NUR101", "Human anatomy"), ("NUR102", "Physiology")]},
+            "Economics": {"Microeconomics": [("ECO101", "Principles of microeconomics")]},
+        }
+        for program_name, courses in catalog.items():
+            program = Program.objects.create(institution=institution, name=program_name, duration_years=4)
+            for title, units in courses.items():
+                course = Course.objects.create(program=program, title=title, semester=1)
+                for code, name in units:
+                    Unit.objects.create(course=course, code=code, name=name, description=f"{name} for {program_name} students")
+
+    def setUp(self):
+        local_recommender.invalidate()
+        self.student = Student.objects.create_user(username='localstudent', password='password123', student_id='LOCAL1')
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def assess(self, interests="computers, programming", skills="Python", strengths="algorithms"):
+        response = self.client.post(reverse('career-assess'), {
+            'student': self.student.pk, 'interests': interests, 'skills': skills, 'academic_strengths': strengths,
+        })
+        self.assertEqual(response.status_code, 202)
+        return response.json()['job']
+
+    def test_catalog_suggestions_are_ranked_by_similarity(self):
+        """
+        The function tests that the programs and units most similar to an assessment come first, and
+        that an assessment matching nothing in the catalog gets no suggestions.
+        """
+        suggestions = local_recommender.suggest(CareerAssessment(
+            interests="computers, programming", skills="Python", academic_strengths="algorithms"
+        ))
+        self.assertEqual(suggestions['program'][0]['name'], "Computer Science")
+        codes = [unit['code'] for unit in suggestions['unit']]
+        self.assertEqual(codes[0], "CS101")
+        self.assertEqual(set(codes[:3]), {"CS101", "CS102", "CS201"})
+        scores = [unit['score'] for unit in suggestions['unit']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertNotIn("Nursing", [program['name'] for program in suggestions['program']])
+
+        anatomy = local_recommender.suggest(CareerAssessment(interests="human anatomy", skills="", academic_strengths=""))
+        self.assertEqual(anatomy['unit'][0]['code'], "NUR101")
+        self.assertIsNone(local_recommendation(CareerAssessment(interests="sailing", skills="", academic_strengths="")))
+
+    @override_settings(CAREER_JOB_MAX_ATTEMPTS=1)
+    def test_failed_jobs_fall_back_to_catalog_suggestions(self):
+        """
+        The function tests that a job whose LLM calls all failed stores the catalog suggestions
+        instead of the generic fallback message.
+        """
+        job_id = self.assess()['id']
+
+        def fail(assessment):
+            raise ConnectionError("LLM unavailable")
+
+        process_jobs(generate=fail)
+        job = self.client.get(reverse('career-job', args=[job_id])).json()
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn("1. Computer Science (Test University)", job['recommendation']['recommendation_text'])
+        self.assertIn("CS101 Introduction to Python programming", job['recommendation']['recommendation_text'])
+
+    @override_settings(CAREER_LOCAL_FIRST_PASS=True)
+    def test_first_pass_is_replaced_by_the_llm_recommendation(self):
+        """
+        The function tests that with a first pass, the catalog suggestions are returned right away and
+        replaced in place by the LLM's recommendation once the job is done.
+        """
+        job = self.assess()
+        self.assertEqual(job['status'], 'pending')
+        self.assertIn("Computer Science", job['recommendation']['recommendation_text'])
+
+        process_jobs(generate=lambda assessment: "Software engineer")
+        done = self.client.get(reverse('career-job', args=[job['id']])).json()
+        self.assertEqual(done['status'], 'done')
+        self.assertEqual(done['recommendation']['id'], job['recommendation']['id'])
+        self.assertEqual(done['recommendation']['recommendation_text'], "Software engineer")
+        self.assertEqual(CareerRecommendation.objects.filter(student=self.student).count(), 1)
+
+class RegenerateRecommendationsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = Student.objects.create_user(username='backfillstudent', password='password123', student_id='BACK1')
+        cls.assessments = CareerAssessment.objects.bulk_create(
+            CareerAssessment(student=cls.student, interests=f"interest {i % 20}", skills="python", academic_strengths="math")
+            for i in range(30)
+        )
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = os.path.join(directory.name, 'checkpoint.json')
+        self.lock = threading.Lock()
+        self.calls = []
+        self.failing = set()
+
+    def generate(self, assessment):
+        with self.lock:
+            self.calls.append(assessment.pk)
+        if assessment.pk in self.failing:
+            raise ConnectionError("LLM unavailable")
+        return f"Careers for {assessment.interests}"
+
+    def regenerate(self, **kwargs):
+        return regenerate_recommendations(self.checkpoint, 1000, burst=100, concurrency=4, batch_size=7,
+                                          generate=self.generate, **kwargs)
+
+    def test_backfill_resumes_from_its_checkpoint(self):
+        """
+        The function tests that a backfill stopped part way continues after the last assessment it
+        wrote, and that repeated profiles are answered from the cache.
+        """
+        counts = self.regenerate(limit=12)
+        self.assertEqual(counts['written'], 12)
+        self.assertEqual(load_checkpoint(self.checkpoint)['last_id'], self.assessments[11].pk)
+
+        counts = self.regenerate()
+        self.assertEqual(counts['written'], 18)
+        self.assertEqual(load_checkpoint(self.checkpoint), {'last_id': self.assessments[-1].pk, 'failed': []})
+        self.assertEqual(self.regenerate()['written'], 0)
+
+        texts = sorted(CareerRecommendation.objects.values_list('recommendation_text', flat=True))
+        self.assertEqual(texts, sorted(f"Careers for {assessment.interests}" for assessment in self.assessments))
+        # Profiles 0-9 appear twice and 10-19 once; at least the second round of 0-9 comes from the cache.
+        self.assertEqual(len(set(self.calls)), len(self.calls))
+        self.assertLessEqual(len(self.calls), 26)
+
+    def test_failed_assessments_are_recorded_and_retried(self):
+        """
+        The function tests that assessments whose generation failed are skipped and recorded in the
+        checkpoint, and written when they are retried.
+        """
+        self.failing = {self.assessments[3].pk, self.assessments[15].pk}
+        counts = self.regenerate()
+        self.assertEqual((counts['written'], counts['failed']), (28, 2))
+        self.assertEqual(load_checkpoint(self.checkpoint)['failed'], sorted(self.failing))
+
+        self.failing = set()
+        counts = self.regenerate(retry_failed=True)
+        self.assertEqual((counts['written'], counts['failed']), (2, 0))
+        self.assertEqual(load_checkpoint(self.checkpoint), {'last_id': self.assessments[-1].pk, 'failed': []})
+        self.assertEqual(CareerRecommendation.objects.count(), 30)
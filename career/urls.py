@@ -1,7 +1,9 @@
 from django.urls import path
-from .views import CareerAssessmentView, CareerRecommendationView
+from .views import CareerAssessmentView, CareerRecommendationView, RecommendationJobView, RecommendationCacheStatsView
 
 urlpatterns = [
     path('assess/', CareerAssessmentView.as_view(), name='career-assess'),
     path('recommendations/', CareerRecommendationView.as_view(), name='career-recommendations'),
+    path('jobs/<int:pk>/', RecommendationJobView.as_view(), name='career-job'),
+    path('cache/', RecommendationCacheStatsView.as_view(), name='career-cache-stats'),
 ]
@@ -1,94 +1,61 @@
+from django.db import transaction
 from django.shortcuts import render
-from rest_framework import generics
-from .models import CareerAssessment, CareerRecommendation
-from .serializers import CareerAssessmentSerializer, CareerRecommendationSerializer
+from rest_framework import generics, status
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
+from edu_hub.mixins import SparseQuerysetMixin
+from .cache import cache_stats
+from .jobs import enqueue_recommendation
+from .models import CareerAssessment, CareerRecommendation, RecommendationJob
+from .serializers import CareerAssessmentSerializer, CareerRecommendationSerializer, RecommendationJobSerializer
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from django.conf import settings
-from openai import AzureOpenAI
-import os
-import logging  # For better error handling/logging
-
-# Set up logger
-logger = logging.getLogger(__name__)
-
-# Initialize Azure OpenAI client
-try:
-    client = AzureOpenAI(
-        azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
-        api_version="2024-02-15-preview",
-        api_key=settings.AZURE_OPENAI_KEY
-    )
-except Exception as e:
-    logger.error("Failed to initialize AzureOpenAI client: %s", e)
-    raise
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
+# The `CareerAssessmentView` class saves a student's career assessment and queues the generation of
+# its recommendation, which the `run_recommendation_worker` command runs outside the request. It
+# answers `202 Accepted` with the assessment and the queued job, whose status can be polled at the
+# URL in the `Location` header until the recommendation is ready.
 class CareerAssessmentView(generics.CreateAPIView):
-    """
-    The `generate_recommendation` function uses the Azure OpenAI API to generate career recommendations
-    based on a student's interests, skills, and academic strengths provided in a career assessment.
-    
-    :param assessment: The `assessment` parameter in the `generate_recommendation` function represents
-    an instance of the `CareerAssessment` model. It contains information about a student's interests,
-    skills, and academic strengths that have been submitted for career advice. This information is used
-    to generate suitable career recommendations for the student based
-    :return: The `generate_recommendation` function returns a string that represents the recommendation
-    generated for the student based on their career assessment information. This recommendation is
-    tailored to the student's interests, skills, and academic strengths, and it suggests 3 suitable
-    career paths along with a brief explanation for each career path. If an error occurs during the
-    generation of the recommendation using the Azure OpenAI API, the function returns `
-    """
     queryset = CareerAssessment.objects.all()
     serializer_class = CareerAssessmentSerializer
     permission_classes = [IsAuthenticated]
 
-    def perform_create(self, serializer):
-        instance = serializer.save(student=self.request.user)
-        recommendation = generate_recommendation(instance)
-
-        if recommendation:
-            CareerRecommendation.objects.create(
-                student=self.request.user,
-                recommendation_text=recommendation
-            )
-        else:
-            CareerRecommendation.objects.create(
-                student=self.request.user,
-                recommendation_text="Could not generate recommendation at this time."
-            )
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = self.perform_create(serializer)
+        data = dict(serializer.data)
+        data['job'] = RecommendationJobSerializer(job, context=self.get_serializer_context()).data
+        location = reverse('career-job', args=[job.pk], request=request)
+        return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': location})
 
-def generate_recommendation(assessment):
-    prompt = f"""
-You are a career advisor. A student has submitted the following:
-- Interests: {assessment.interests}
-- Skills: {assessment.skills}
-- Academic strengths: {assessment.academic_strengths}
-
-Suggest 3 suitable career paths for the student. Include a brief explanation for each career, tailored to the given information.
-"""
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            instance = serializer.save(student=self.request.user)
+            return enqueue_recommendation(instance)
+
+# The `RecommendationJobView` class returns the status of one of the authenticated student's
+# recommendation jobs, with the recommendation once it is done.
+class RecommendationJobView(generics.RetrieveAPIView):
+    serializer_class = RecommendationJobSerializer
+    permission_classes = [IsAuthenticated]
 
-    try:
-        response = client.chat.completions.create(
-            model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,  # e.g., "gpt-4o"
-            messages=[
-                {"role": "system", "content": "You are a helpful career guidance assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.7
-        )
+    def get_queryset(self):
+        return RecommendationJob.objects.filter(assessment__student=self.request.user).select_related('recommendation')
 
-        return response.choices[0].message.content.strip()
+# The `RecommendationCacheStatsView` class reports the hit and miss counters and the size of the
+# recommendation cache to staff users.
+class RecommendationCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
 
-    except Exception as e:
-        logger.error("Azure OpenAI API error: %s", e)
-        return None
+    def get(self, request):
+        return Response(cache_stats())
 
 # This class represents a view in a Django REST framework API that lists career recommendations for
 # the authenticated user.
-class CareerRecommendationView(generics.ListAPIView):
+class CareerRecommendationView(SparseQuerysetMixin, generics.ListAPIView):
     serializer_class = CareerRecommendationSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return CareerRecommendation.objects.filter(student=self.request.user)
\ No newline at end of file
+        return CareerRecommendation.objects.filter(student=self.request.user).order_by('-created_at')
\ No newline at end of file
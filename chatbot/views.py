@@ -59,6 +59,7 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 from openai import AzureOpenAI
 from edu_hub.settings import AZURE_OPENAI_KEY, AZURE_OPENAI_ENDPOINT
+from edu_hub.singleflight import SingleFlight
 
 # Initialize the AzureOpenAI client with API key and endpoint
 # This client will handle all the communication with the Azure-hosted GPT model
@@ -81,6 +82,25 @@ chat_history = [
     }
 ]
 
+# Coalesces concurrent requests that send the same conversation, e.g. the same first question asked
+# by a whole class at once, into one API call
+chat_flight = SingleFlight('chat')
+
+def complete_chat(messages):
+    """
+    Sends a conversation to the Azure OpenAI API and returns the text of the AI's response.
+    Concurrent calls with the same messages share one API call.
+    """
+    def request():
+        response = client.chat.completions.create(
+            model="gpt-4o",  # Specify the model deployed in Azure
+            messages=messages
+        )
+        # Extract the AI's response text from the API response
+        return response.choices[0].message.content
+
+    return chat_flight.do(json.dumps(messages, sort_keys=True), request)
+
 @csrf_exempt  # Disable CSRF protection (since this endpoint is typically used by external clients like mobile apps)
 def chat_api(request):
     """
@@ -101,13 +121,7 @@ def chat_api(request):
         chat_history.append({"role": "user", "content": user_message})
 
         # Send the full chat history to the Azure OpenAI API to generate a response
-        response = client.chat.completions.create(
-            model="gpt-4o",  # Specify the model deployed in Azure
-            messages=chat_history
-        )
-
-        # Extract the AI's response text from the API response
-        ai_response = response.choices[0].message.content
+        ai_response = complete_chat(list(chat_history))
 
         # Add the AI's response to the chat history for future context
         chat_history.append({"role": "assistant", "content": ai_response})
@@ -0,0 +1,109 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+
+def positive_int(value):
+    if not value.isdigit() or int(value) == 0:
+        raise ValueError('Must be a positive integer.')
+    return int(value)
+
+
+# `IndexedFilter` declares one query parameter of an `IndexedFilterBackend`. `lookup` is the queryset
+# lookup the value is passed to, `parse` turns the raw string into that value (raising ValueError for
+# bad input) and `requires` lists other filters of which at least one must be given too, for lookups
+# that are only index-backed together with them. `min_length` rejects short values, e.g. prefixes that
+# would match most of a table. `models` lists the models other than the view's that the lookup goes
+# through, whose changes can change the rows it matches.
+class IndexedFilter:
+    def __init__(self, lookup, parse=positive_int, requires=(), min_length=1, models=()):
+        self.lookup = lookup
+        self.parse = parse
+        self.requires = tuple(requires)
+        self.min_length = min_length
+        self.models = tuple(models)
+
+
+# `IndexedFilterBackend` filters and orders a list by the query parameters a view declares, and rejects
+# everything else, so that every request it accepts is answered with index seeks:
+#
+# - `indexed_filters` maps parameter names to `IndexedFilter`s. Only lookups served by an index should
+#   be declared.
+# - `indexed_orderings` maps the fields clients may pass to `?ordering=` (optionally prefixed with `-`)
+#   to the filters of which one must be given, since the index that returns rows in that order
+#   usually starts with the filtered column. `id` is always allowed. The primary key is appended to
+#   every ordering so that `KeysetPagination` cursors stay stable.
+#
+# Any other query parameter, besides the pagination, format and sparse field parameters, is rejected
+# with a 400 response instead of being silently ignored and returning every row. Only the list action
+# is filtered; detail actions look objects up by primary key and may take parameters of their own.
+class IndexedFilterBackend:
+    ordering_param = 'ordering'
+    known_params = ('fields', 'expand')
+
+    def allowed_params(self, view):
+        allowed = {self.ordering_param, api_settings.URL_FORMAT_OVERRIDE, *self.known_params}
+        allowed.update(getattr(view, 'indexed_filters', {}))
+        paginator = getattr(view, 'paginator', None)
+        for name in ('cursor_query_param', 'page_size_query_param'):
+            if getattr(paginator, name, None):
+                allowed.add(getattr(paginator, name))
+        return allowed
+
+    def get_filters(self, request, view):
+        if not hasattr(request, '_indexed_filters'):
+            request._indexed_filters = self.parse_filters(request, view)
+        return request._indexed_filters
+
+    def parse_filters(self, request, view):
+        filters = getattr(view, 'indexed_filters', {})
+        unknown = set(request.query_params) - self.allowed_params(view)
+        if unknown:
+            raise ValidationError({
+                'non_field_errors': [f"Unknown query parameters: {', '.join(sorted(unknown))}. "
+                                     f"Filter by: {', '.join(filters) or 'nothing'}."]
+            })
+        values, errors = {}, {}
+        for name, declared in filters.items():
+            raw = request.query_params.get(name, '').strip()
+            if not raw:
+                continue
+            if len(raw) < declared.min_length:
+                errors[name] = f'Must be at least {declared.min_length} characters long.'
+                continue
+            try:
+                values[name] = declared.parse(raw)
+            except ValueError as e:
+                errors[name] = str(e)
+        for name in values:
+            requires = filters[name].requires
+            if requires and not any(other in values for other in requires):
+                errors[name] = f"Can only be combined with {' or '.join(f'`{other}`' for other in requires)}."
+        if errors:
+            raise ValidationError(errors)
+        return values
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Returns the ordering requested with `?ordering=`, or None for the paginator's default. Called
+        by `CursorPagination`, which orders the page by it.
+        """
+        value = request.query_params.get(self.ordering_param, '').strip()
+        if not value:
+            return None
+        orderings = getattr(view, 'indexed_orderings', {})
+        name = value.lstrip('-')
+        if name != 'id' and name not in orderings:
+            raise ValidationError({self.ordering_param: f"Order by: {', '.join(('id', *orderings))}, optionally prefixed with `-`."})
+        requires = orderings.get(name, ())
+        if requires and not any(other in self.get_filters(request, view) for other in requires):
+            raise ValidationError({self.ordering_param: f"Ordering by `{name}` needs a `{'` or `'.join(requires)}` filter."})
+        if name == 'id':
+            return (value,)
+        return (value, '-id' if value.startswith('-') else 'id')
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', 'list') != 'list':
+            return queryset
+        filters = getattr(view, 'indexed_filters', {})
+        values = self.get_filters(request, view)
+        return queryset.filter(**{filters[name].lookup: value for name, value in values.items()})
@@ -0,0 +1,41 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+
+# `KeysetPagination` pages through a queryset by seeking past the last primary key seen instead of
+# using OFFSET, and never issues a COUNT(*). Fetching page 10,000 therefore costs the same as page 1.
+# Clients follow the opaque `next`/`previous` links and may pick a `page_size` up to `max_page_size`.
+class KeysetPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+# `EstimatedCountPaginator` is a Django paginator for admin changelists over large tables. For an
+# unfiltered queryset on PostgreSQL it takes the row count from the planner's estimate in `pg_class`
+# instead of running COUNT(*), which has to scan the whole table. Filtered querysets, other databases,
+# tables the planner has not analyzed and tables smaller than `estimate_threshold` rows are counted
+# exactly, so page numbers are only approximate where an exact count would be slow.
+class EstimatedCountPaginator(Paginator):
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where or query.distinct or query.is_sliced:
+            return super().count
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [connection.ops.quote_name(query.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < self.estimate_threshold:
+            return super().count
+        return row[0]
@@ -0,0 +1,143 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+
+def nested_fields(fields, name):
+    """
+    Returns the `relation.field` entries of `fields` that belong to the relation `name`, without the
+    prefix, or None when there are none.
+    """
+    if not fields:
+        return None
+    prefix = f'{name}.'
+    return {field[len(prefix):] for field in fields if field.startswith(prefix)} or None
+
+
+# `SparseFieldsMixin` lets a model serializer render a subset of its fields and expand foreign keys
+# into nested objects. `fields` is a collection of field names to keep, where `relation.field` names a
+# field of an expanded relation. `expand` names relations listed in `Meta.expandable_fields`, a dict
+# mapping a foreign key field to the serializer class that renders the related object in place of its
+# primary key. Expanded relations are always kept. `SparseQuerysetMixin` in `edu_hub.mixins` builds
+# both from the `?fields=` and `?expand=` query parameters and trims the queryset to match.
+class SparseFieldsMixin:
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sparse_fields = set(fields) if fields else None
+        self.expand = set(expand or ())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+        for name in self.expand:
+            fields[name] = expandable[name](
+                source=fields[name].source, read_only=True, fields=nested_fields(self.sparse_fields, name)
+            )
+        if self.sparse_fields:
+            keep = {field.split('.', 1)[0] for field in self.sparse_fields} | self.expand
+            fields = {name: field for name, field in fields.items() if name in keep}
+        return fields
+
+
+def field_columns(serializer, prefix=''):
+    """
+    Returns the model fields `serializer` reads, as `only()` arguments, or None when a field's source
+    is not a concrete model field and the columns it needs cannot be told.
+    """
+    model = serializer.Meta.model
+    columns = []
+    for field in serializer.fields.values():
+        source = field.source
+        if source == '*' or '.' in source:
+            return None
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        columns.append(prefix + source)
+        if isinstance(field, serializers.BaseSerializer):
+            nested = field_columns(field, prefix=f'{prefix}{source}__')
+            if nested is None:
+                return None
+            columns.extend(nested)
+    return columns
+
+
+# Serializer fields whose `to_representation` returns database values of the right type unchanged, so
+# the fast list path can copy them as they are. Exact types only: subclasses may format values.
+IDENTITY_FIELDS = (
+    serializers.CharField, serializers.EmailField, serializers.URLField, serializers.SlugField,
+    serializers.IntegerField, serializers.BooleanField, serializers.ReadOnlyField,
+)
+
+
+class RowSerializer:
+    """
+    Precompiled equivalent of a model serializer's `to_representation` for rows fetched with
+    `values_list()`. Each field is bound once to a column index and a mapper: None for fields that
+    pass database values through, otherwise the serializer field's own `to_representation`, so the
+    output is the same as the serializer's without building model instances.
+
+    Use `RowSerializer.compile()`, which returns None for serializers it cannot reproduce exactly:
+    nested serializers, method fields, dotted or `*` sources, and serializers that override
+    `to_representation`.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.columns = [source for _, source, _ in fields]
+        self.names = [name for name, _, _ in fields]
+        self.mapped = [(index, name, mapper) for index, (name, _, mapper) in enumerate(fields) if mapper is not None]
+
+    @classmethod
+    def compile(cls, serializer):
+        if type(serializer).to_representation is not serializers.Serializer.to_representation:
+            return None
+        model = serializer.Meta.model
+        fields = []
+        for field in serializer._readable_fields:
+            source = field.source
+            if source == '*' or '.' in source:
+                return None
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                return None
+            if not model_field.concrete or model_field.many_to_many:
+                return None
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                if field.pk_field is not None:
+                    return None
+                mapper = None
+            elif isinstance(field, (serializers.RelatedField, serializers.BaseSerializer)):
+                return None
+            elif type(field) in IDENTITY_FIELDS:
+                mapper = None
+            elif type(field) is getattr(serializers, 'BigIntegerField', None) and not getattr(
+                field, 'coerce_to_string', api_settings.COERCE_BIGINT_TO_STRING
+            ):
+                # Primary keys are 64-bit integers, rendered as numbers unless configured otherwise.
+                mapper = None
+            else:
+                mapper = field.to_representation
+            fields.append((field.field_name, source, mapper))
+        return cls(fields)
+
+    def values(self, queryset, extra=()):
+        """
+        Returns `queryset` as named rows holding the serialized fields' columns followed by any
+        `extra` columns not already among them, e.g. the ones a paginator reads.
+        """
+        columns = self.columns + [column for column in extra if column not in self.columns]
+        return queryset.values_list(*columns, named=True)
+
+    def __call__(self, row):
+        # `zip` stops at the serialized fields, leaving out any extra columns at the end of the row.
+        data = dict(zip(self.names, row))
+        for index, name, mapper in self.mapped:
+            value = row[index]
+            if value is not None:
+                data[name] = mapper(value)
+        return data
@@ -33,6 +33,8 @@ ALLOWED_HOSTS = ['*']
 AZURE_OPENAI_KEY = os.environ.get("AZURE_OPENAI_KEY")
 AZURE_OPENAI_ENDPOINT = "https://bostone-ai-hub.cognitiveservices.azure.com/"
 AZURE_OPENAI_DEPLOYMENT_NAME = os.environ.get("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o")
+# Requests per minute allowed by the deployment's quota, used by `regenerate_recommendations`.
+AZURE_OPENAI_REQUESTS_PER_MINUTE = config('AZURE_OPENAI_REQUESTS_PER_MINUTE', default=60, cast=int)
 
 # Application definition
 
@@ -119,6 +121,87 @@ DATABASES = {
 # }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; set REDIS_URL (e.g. redis://localhost:6379/0) to share the cache between
+# workers in production. The Redis backend needs the `redis` package.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cache used for academics list/detail responses and how long entries live, in seconds.
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 300
+
+# PostgreSQL text search configuration used to build and query the catalog search index. Existing
+# search documents keep the configuration they were built with: after changing it, rebuild them with
+# `academics.search.refresh_search_documents(program_ids=Program.objects.values_list('id', flat=True))`.
+CATALOG_SEARCH_CONFIG = 'english'
+
+# Binary catalog snapshot written by `python manage.py build_catalog_snapshot` and memory-mapped by
+# every worker to serve catalog tree reads. Leave empty to always read the tree from the database.
+CATALOG_SNAPSHOT_PATH = config('CATALOG_SNAPSHOT_PATH', default='')
+
+# How often, in seconds, each worker checks whether the catalog changed and its in-memory autocomplete
+# index must be rebuilt. Writes made by the worker itself are picked up on its next request.
+CATALOG_AUTOCOMPLETE_CHECK_SECONDS = 5
+
+# Age in seconds a catalog change log entry must reach before the sync feed returns it, so that
+# entries written by transactions that have not committed yet are not skipped by clients. Should be
+# longer than the longest catalog write transaction.
+CATALOG_CHANGES_SETTLE_SECONDS = 5
+
+# Career recommendations are generated by `python manage.py run_recommendation_worker` processes from
+# a queue of jobs. A failed job is retried after CAREER_JOB_RETRY_SECONDS, doubled after every failure
+# up to CAREER_JOB_RETRY_MAX_SECONDS, and gives up after CAREER_JOB_MAX_ATTEMPTS attempts. A worker
+# owns a job it claimed for CAREER_JOB_LEASE_SECONDS, after which another worker may claim it, so the
+# lease must be longer than CAREER_RECOMMENDATION_TIMEOUT, the time allowed for one Azure OpenAI call.
+CAREER_RECOMMENDATION_TIMEOUT = 60
+CAREER_JOB_LEASE_SECONDS = 300
+CAREER_JOB_MAX_ATTEMPTS = 5
+CAREER_JOB_RETRY_SECONDS = 30
+CAREER_JOB_RETRY_MAX_SECONDS = 1800
+
+# Generated recommendations are cached by normalized assessment (see `career/cache.py`) for
+# CAREER_RECOMMENDATION_CACHE_TTL seconds, keeping the CAREER_RECOMMENDATION_CACHE_MAX_ENTRIES most
+# recently used ones.
+CAREER_RECOMMENDATION_CACHE_TTL = 60 * 60 * 24 * 30
+CAREER_RECOMMENDATION_CACHE_MAX_ENTRIES = 10000
+
+# Programs and units of the catalog matching an assessment are suggested from per-process TF-IDF
+# matrices (see `career/local_recommender.py`) when the LLM cannot be reached, and, with
+# CAREER_LOCAL_FIRST_PASS, as a first answer while the LLM's recommendation is generated. The web
+# workers then build the matrices too, on their first assessment. Each process checks every
+# CAREER_LOCAL_RECOMMENDER_CHECK_SECONDS whether the catalog changed and the matrices must be rebuilt.
+CAREER_LOCAL_FIRST_PASS = config('CAREER_LOCAL_FIRST_PASS', default=False, cast=bool)
+CAREER_LOCAL_RECOMMENDER_CHECK_SECONDS = 60
+
+# Progress file of `regenerate_recommendations`, from which an interrupted run resumes.
+CAREER_BACKFILL_CHECKPOINT = config('CAREER_BACKFILL_CHECKPOINT', default=str(BASE_DIR / 'recommendation-backfill.json'))
+
+# Identical concurrent LLM requests are coalesced into one (see `edu_hub/singleflight.py`). Across
+# processes this goes through the SINGLEFLIGHT_CACHE_ALIAS cache, which must then be shared (Redis):
+# the process making a request holds a lock there for at most SINGLEFLIGHT_LOCK_SECONDS and leaves the
+# result for SINGLEFLIGHT_RESULT_SECONDS, while the others check every SINGLEFLIGHT_POLL_SECONDS.
+# Callers wait at most SINGLEFLIGHT_WAIT_SECONDS for another's request before making their own.
+SINGLEFLIGHT_CACHE_ALIAS = 'default'
+SINGLEFLIGHT_LOCK_SECONDS = 120
+SINGLEFLIGHT_RESULT_SECONDS = 10
+SINGLEFLIGHT_POLL_SECONDS = 0.1
+SINGLEFLIGHT_WAIT_SECONDS = 90
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -156,6 +239,15 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Offline catalog bundles written by `python manage.py build_catalog_bundle` into this directory of
+# STATIC_ROOT, and the manifest naming the current one. The manifest is kept outside STATIC_ROOT
+# because it changes in place, while bundles are named by the hash of their content and never do.
+CATALOG_BUNDLE_PREFIX = 'catalog'
+CATALOG_BUNDLE_MANIFEST = config('CATALOG_BUNDLE_MANIFEST', default=str(BASE_DIR / 'catalog-bundle.json'))
+
+# Bundles are served by WhiteNoise with far-future, immutable cache headers.
+WHITENOISE_IMMUTABLE_FILE_TEST = rf'^/{STATIC_URL}{CATALOG_BUNDLE_PREFIX}/catalog\.[0-9a-f]{{16}}\.json$'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
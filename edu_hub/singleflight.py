@@ -0,0 +1,127 @@
+import hashlib
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+_MISSING = object()
+
+# Deletes the lock only if it still holds the caller's token, in one step.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def release_lock(cache, lock_key, token):
+    """
+    Deletes a lock taken with `cache.add(lock_key, token)` unless it expired and another caller took
+    it since. With Redis the check and the delete run as one script. Other caches cannot compare and
+    delete atomically, so a lock expiring between the two can still be deleted; another caller then
+    only makes its call too early, and `SINGLEFLIGHT_LOCK_SECONDS` is set well above an LLM call's
+    duration for this to be rare.
+    """
+    if isinstance(cache, RedisCache):
+        key = cache.make_and_validate_key(lock_key)
+        client = cache._cache.get_client(key, write=True)
+        client.eval(RELEASE_LOCK_SCRIPT, 1, key, cache._cache._serializer.dumps(token))
+    elif cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one call of the underlying function, whose
+    result (or exception) every caller gets. Used around LLM requests, so that a burst of identical
+    prompts costs one upstream request and every caller waits for the first one only.
+
+    Within a process, callers that find a call with their key in flight wait for it. Across
+    processes, the process making the call holds a lock in the `SINGLEFLIGHT_CACHE_ALIAS` cache and
+    leaves the result there for `SINGLEFLIGHT_RESULT_SECONDS`; callers of other processes poll for it
+    while the lock is held. This needs a cache shared by the processes, e.g. Redis through
+    `REDIS_URL`; with the default local memory cache, calls are only coalesced within a process.
+
+    A result is therefore also returned to calls made shortly after it completed. A failed call is
+    retried by the next caller of another process, while callers of its own process get its error.
+    Callers wait at most `SINGLEFLIGHT_WAIT_SECONDS` before making the call themselves.
+    """
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._calls = {}
+        # Calls of the underlying function made by this process, and calls answered by another's.
+        self.calls = 0
+        self.shared = 0
+
+    def make_key(self, key):
+        return f"singleflight:{self.namespace}:{hashlib.sha256(key.encode()).hexdigest()}"
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def do(self, key, fn):
+        """
+        Returns `fn()`, or the result of a concurrent call with the same `key`. `key` must identify
+        everything the result depends on.
+        """
+        key = self.make_key(key)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.done.wait(settings.SINGLEFLIGHT_WAIT_SECONDS):
+                self._count('calls')
+                return fn()
+            self._count('shared')
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = self._do_shared(key, fn)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def _do_shared(self, key, fn):
+        cache = caches[settings.SINGLEFLIGHT_CACHE_ALIAS]
+        lock_key, result_key = f"{key}:lock", f"{key}:result"
+        deadline = time.monotonic() + settings.SINGLEFLIGHT_WAIT_SECONDS
+        while True:
+            result = cache.get(result_key, _MISSING)
+            if result is not _MISSING:
+                self._count('shared')
+                return result
+            token = uuid.uuid4().hex
+            if cache.add(lock_key, token, settings.SINGLEFLIGHT_LOCK_SECONDS):
+                try:
+                    self._count('calls')
+                    result = fn()
+                    cache.set(result_key, result, settings.SINGLEFLIGHT_RESULT_SECONDS)
+                    return result
+                finally:
+                    release_lock(cache, lock_key, token)
+            if time.monotonic() >= deadline:
+                self._count('calls')
+                return fn()
+            time.sleep(settings.SINGLEFLIGHT_POLL_SECONDS)
@@ -0,0 +1,40 @@
+import json
+
+from django.db import connection
+
+
+def plan_nodes(plan):
+    """
+    Yields every node of a PostgreSQL JSON query plan, depth first.
+    """
+    yield plan
+    for child in plan.get('Plans', ()):
+        yield from plan_nodes(child)
+
+
+# `QueryPlanAssertionsMixin` adds assertions on PostgreSQL query plans to a test case, for tests that
+# guard the indexes behind hot lookups. Seed enough rows for the planner to prefer an index, call
+# `analyze()` so its statistics match the seeded data, then check the querysets the views run with
+# `assertIndexScan()`.
+class QueryPlanAssertionsMixin:
+
+    @staticmethod
+    def analyze(*models):
+        with connection.cursor() as cursor:
+            for model in models:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+    def query_plan(self, queryset):
+        return json.loads(queryset.explain(format='json'))[0]['Plan']
+
+    def assertIndexScan(self, queryset, index=None):
+        """
+        Fails if the plan of `queryset` reads any table with a sequential scan or, when `index` is
+        given, if it does not use that index.
+        """
+        nodes = list(plan_nodes(self.query_plan(queryset)))
+        sequential = [node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan']
+        self.assertFalse(sequential, f"Sequential scan on {', '.join(sequential)} for: {queryset.query}")
+        if index is not None:
+            used = {node['Index Name'] for node in nodes if 'Index Name' in node}
+            self.assertIn(index, used, f"Expected {index} to be used for: {queryset.query}")
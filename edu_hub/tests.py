@@ -0,0 +1,99 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from edu_hub.ratelimit import TokenBucket
+from edu_hub.singleflight import SingleFlight, release_lock
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def slow_call(self, result="answer"):
+        self.calls += 1
+        time.sleep(0.2)
+        return result
+
+    def run_concurrently(self, flights, key, fn, count):
+        results = [None] * count
+
+        def run(index):
+            try:
+                results[index] = flights[index % len(flights)].do(key, fn)
+            except Exception as e:
+                results[index] = e
+
+        threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_identical_calls_share_one_call(self):
+        """
+        The function tests that concurrent calls with the same key, in one process or in several
+        sharing a cache, make a single call whose result they all get.
+        """
+        flight = SingleFlight('test')
+        self.assertEqual(self.run_concurrently([flight], "prompt", self.slow_call, 20), ["answer"] * 20)
+        self.assertEqual((self.calls, flight.calls, flight.shared), (1, 1, 19))
+
+        # Separate instances stand for separate processes, coalesced through the cache.
+        cache.clear()
+        self.calls = 0
+        flights = [SingleFlight('test'), SingleFlight('test')]
+        with override_settings(SINGLEFLIGHT_POLL_SECONDS=0.01):
+            self.assertEqual(self.run_concurrently(flights, "prompt", self.slow_call, 10), ["answer"] * 10)
+        self.assertEqual(self.calls, 1)
+
+        self.assertEqual(flight.do("other prompt", lambda: self.slow_call("other")), "other")
+        self.assertEqual(self.calls, 2)
+
+    def test_errors_are_shared_and_not_cached(self):
+        """
+        The function tests that concurrent callers get the error of the call they shared, and that
+        the next call is made again.
+        """
+        flight = SingleFlight('test')
+
+        def fail():
+            self.slow_call()
+            raise ConnectionError("LLM unavailable")
+
+        results = self.run_concurrently([flight], "prompt", fail, 5)
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(flight.do("prompt", self.slow_call), "answer")
+        self.assertEqual(self.calls, 2)
+
+    def test_lock_is_only_released_by_its_holder(self):
+        """
+        The function tests that releasing a lock that expired and was taken by another caller leaves
+        the other caller's lock in place.
+        """
+        self.assertTrue(cache.add("lock", "other", 60))
+        release_lock(cache, "lock", "mine")
+        self.assertEqual(cache.get("lock"), "other")
+        release_lock(cache, "lock", "other")
+        self.assertIsNone(cache.get("lock"))
+
+
+class TokenBucketTestCase(SimpleTestCase):
+    def test_token_bucket_limits_the_rate(self):
+        """
+        The function tests that callers sharing a token bucket are held to its rate after the first
+        burst.
+        """
+        bucket = TokenBucket(50, capacity=5)
+        started = time.monotonic()
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(15)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
@@ -14,12 +14,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from django.urls import re_path
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from academics.views import catalog_bundle_file
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -42,6 +44,7 @@ urlpatterns = [
     path('api/career/', include('career.urls')),
     path('api/exams/', include('ExamRegistration.urls')),
     path('api/chat/', include('chatbot.urls')),
+    path(f"{settings.STATIC_URL.lstrip('/')}{settings.CATALOG_BUNDLE_PREFIX}/<str:name>", catalog_bundle_file, name='catalog-bundle-file'),
     re_path(r'^swagger(?P<format>\\.json|\\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),